@@ -2,7 +2,9 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_READ_URL: str | None = None # Optional read replica for analytics endpoints
     BINANCE_WS_URL: str = "wss://fstream.binance.com"
+    BINANCE_API_URL: str = "https://fapi.binance.com"
     
     # Coinbase
     COINBASE_API_URL: str = "https://api.exchange.coinbase.com"
@@ -12,6 +14,85 @@ class Settings(BaseSettings):
     MARKET_FEE_RATE: float = 0.00045 # 0.045%
     LIMIT_FEE_RATE: float = 0.00018  # 0.018%
 
+    # Leader election (only the leader runs the matching engine / equity recorder)
+    LEADER_LOCK_KEY: int = 727001
+    LEADER_ELECTION_INTERVAL: float = 5.0 # Seconds between lock attempts / heartbeats
+
+    # Account PnL stream (pushed over /accounts/ws/{account_id})
+    PNL_PUSH_INTERVAL: float = 1.0 # Max one ACCOUNT_PNL push per account per interval
+    PNL_PUSH_MIN_CHANGE: float = 0.01 # Only push when equity/PnL/margin moved at least this much
+
+    # Account WebSocket fan-out
+    WS_SEND_QUEUE_SIZE: int = 100 # Pending messages per connection before collapsing into a resync
+    WS_SEND_TIMEOUT: float = 5.0 # Seconds a single send may take before the client is evicted
+
+    # Cross-process account notifications (Postgres LISTEN/NOTIFY)
+    ACCOUNT_NOTIFY_CHANNEL: str = "account_events"
+    ACCOUNT_NOTIFY_HEARTBEAT_INTERVAL: float = 5.0
+
+    # Price stream (/market/ws/prices)
+    PRICE_BROADCAST_INTERVAL: float = 0.1 # Seconds between diffs of the price caches
+    PRICE_STREAM_MAX_RATE: float = 2.0 # Default max messages per second per client
+
+    # Closed-candle cache per exchange / symbol / interval (FVG detection, indicators)
+    CANDLE_CACHE_MAX_SERIES: int = 200
+    CANDLE_CACHE_MAX_CANDLES: int = 5000 # Per series
+    CANDLE_CACHE_MAX_INDICATORS: int = 16 # Cached (indicator, params) per series
+
+    # Startup warm-up: /health/ready fails until it finished and prices are streaming
+    WARMUP_STEP_TIMEOUT: float = 15.0 # Seconds per step (price snapshot, database, klines)
+    WARMUP_KLINE_INTERVALS: str = "1m,5m,15m,1h,4h" # Prefetched into the candle cache per streamed symbol
+    WARMUP_KLINE_LIMIT: int = 1000 # Candles per prefetched series (Coinbase serves at most 300)
+    WARMUP_KLINE_CONCURRENCY: int = 4 # Parallel kline requests
+    HEALTH_CHECK_TIMEOUT: float = 2.0 # Seconds the readiness database ping may take
+
+    # Statistics: windows up to this many days are computed exactly from raw history,
+    # longer windows and all-time stats are read from the running aggregates
+    STATS_EXACT_WINDOW_DAYS: float = 2.0
+
+    # Order archive: terminal orders leave the hot orders table after this many seconds
+    ORDER_ARCHIVE_AFTER: float = 3600.0
+    ORDER_ARCHIVE_INTERVAL: float = 60.0
+    ORDER_ARCHIVE_BATCH_SIZE: int = 5000
+
+    # Equity recorder
+    EQUITY_RECORD_CHUNK_SIZE: int = 5000 # Accounts per select / insert batch
+    EQUITY_RECORD_MIN_CHANGE: float = 0.01 # Skip accounts whose equity moved less than this
+    EQUITY_RECORD_HEARTBEAT: float = 3600.0 # ...unless their last point is older than this (seconds)
+
+    # Equity rollups: raw points are compacted into 1h / 1d bars and pruned after retention
+    EQUITY_ROLLUP_INTERVAL: float = 300.0 # Seconds between rollup passes
+    EQUITY_RAW_RETENTION_DAYS: float = 7.0 # Must cover STATS_EXACT_WINDOW_DAYS
+    EQUITY_HOURLY_RETENTION_DAYS: float = 365.0 # Daily bars are kept forever
+    EQUITY_PRUNE_BATCH_SIZE: int = 10000 # Rows deleted per statement when pruning
+
+    # Database connection pool (Postgres) and query instrumentation (/metrics/db)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0 # Seconds to wait for a pooled connection
+    DB_SLOW_QUERY_MS: float = 200.0 # Statements slower than this are logged
+    DB_SLOW_QUERY_LOG_CHARS: int = 500 # Statement text included in the slow-query log
+    METRICS_ENABLED: bool = False # /metrics/db and /metrics/loop are 404 unless enabled
+    METRICS_TOKEN: str = "" # When set, they require a matching X-Metrics-Token header
+
+    # Event loop lag monitor (/metrics/loop) and sampling profiler (/metrics/profile)
+    LOOP_LAG_INTERVAL: float = 0.1 # Seconds between lag probes
+    LOOP_STALL_MS: float = 100.0 # Lag logged with the stack that blocked the loop
+    LOOP_STALL_HISTORY: int = 50 # Recent stalls kept for /metrics/loop
+    PROFILE_MAX_SECONDS: float = 30.0
+    PROFILER_ENABLED: bool = False # /metrics/profile is 404 unless enabled
+    PROFILER_TOKEN: str = "" # When set, /metrics/profile requires a matching X-Profiler-Token header
+
+    # Read replica: analytics reads fall back to the primary when it lags or is down
+    READ_REPLICA_MAX_LAG: float = 10.0 # Seconds of replication lag tolerated
+    READ_REPLICA_CHECK_INTERVAL: float = 5.0 # Seconds between lag checks
+    READ_REPLICA_CHECK_TIMEOUT: float = 2.0
+
+    # Monthly partitions of equity_history / position_history (Postgres)
+    PARTITION_MAINTENANCE_INTERVAL: float = 3600.0
+    PARTITION_PREMAKE_MONTHS: int = 3 # Months created ahead of the current one
+    POSITION_HISTORY_DETACH_AFTER_MONTHS: int = 0 # 0 keeps all position history attached
+
     class Config:
         env_file = ".env"
 
@@ -1,8 +1,43 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.config import settings
 from app.models import Base
+from app.services.db_metrics import db_metrics
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+logger = logging.getLogger(__name__)
+
+def _pool_options(url: str) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # In-memory SQLite (tests, benchmarks, replays): every connection
+            # would get its own empty database, so keep a single one. A pool of
+            # one hands it to one session at a time, from its first statement
+            # to commit / rollback; sharing it (StaticPool) would mix the
+            # sessions' transactions, so one rollback undoes another's writes.
+            return {
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": 1,
+                "max_overflow": 0,
+                "pool_timeout": settings.DB_POOL_TIMEOUT,
+                "connect_args": {"check_same_thread": False},
+            }
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+engine = create_async_engine(settings.DATABASE_URL, echo=False, **_pool_options(settings.DATABASE_URL))
+db_metrics.instrument(engine)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -11,13 +46,133 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+# Optional read replica for analytics reads (statistics, equity curve, history)
+read_engine = None
+ReadSessionLocal = None
+if settings.DATABASE_READ_URL:
+    read_engine = create_async_engine(settings.DATABASE_READ_URL, echo=False, **_pool_options(settings.DATABASE_READ_URL))
+    db_metrics.instrument(read_engine, "replica")
+    ReadSessionLocal = async_sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+
+class ReplicaHealth:
+    """
+    Cached answer to "may reads go to the replica?": it must be reachable
+    and no more than READ_REPLICA_MAX_LAG seconds behind the primary.
+    Rechecked at most every READ_REPLICA_CHECK_INTERVAL seconds.
+    """
+
+    # 0 when caught up (or not a standby at all), else seconds since the last replayed commit
+    LAG_QUERY = text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    )
+
+    def __init__(self):
+        self.usable = True
+        self.lag: float | None = None
+        self._checked_at = 0.0
+
+    async def check(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < settings.READ_REPLICA_CHECK_INTERVAL:
+            return self.usable
+        self._checked_at = now # Concurrent requests keep using the cached answer
+        if read_engine.dialect.name != "postgresql":
+            return self.usable # Lag is only measurable on Postgres standbys
+
+        usable = False
+        try:
+            async with read_engine.connect() as conn:
+                lag = await asyncio.wait_for(conn.scalar(self.LAG_QUERY), settings.READ_REPLICA_CHECK_TIMEOUT)
+            self.lag = float(lag or 0.0)
+            usable = self.lag <= settings.READ_REPLICA_MAX_LAG
+            if not usable:
+                logger.warning(f"Read replica is {self.lag:.1f}s behind, reading from the primary")
+        except Exception as e:
+            self.lag = None
+            logger.warning(f"Read replica unavailable, reading from the primary: {e}")
+
+        if usable and not self.usable:
+            logger.info("Read replica caught up, routing analytics reads to it again")
+        self.usable = usable
+        return usable
+
+replica_health = ReplicaHealth()
+
+async def get_read_db():
+    """
+    Session for read-only analytics endpoints: the replica when one is
+    configured and fresh enough, else the primary.
+    """
+    session_factory = AsyncSessionLocal
+    if ReadSessionLocal is not None and await replica_health.check():
+        session_factory = ReadSessionLocal
+    async with session_factory() as session:
+        yield session
+
+@asynccontextmanager
+async def primary_session(session: AsyncSession):
+    """
+    `session` itself if it is bound to the primary, else a new primary
+    session: for the occasional write (e.g. a lazy rebuild) on a read path.
+    """
+    if session.bind is engine:
+        yield session
+        return
+    async with AsyncSessionLocal() as primary:
+        yield primary
+
+def dialect_insert(session: AsyncSession):
+    """insert() of the session's dialect, for on_conflict_do_update upserts."""
+    return sqlite.insert if session.get_bind().dialect.name == "sqlite" else postgresql.insert
+
+# Columns added to tables that already existed: create_all only creates
+# missing tables, so databases created before them get them on startup
+ADDED_COLUMNS = {
+    "drawings": {
+        "revision": "INTEGER NOT NULL DEFAULT 0",
+        "deleted": "BOOLEAN NOT NULL DEFAULT false",
+    },
+    "accounts": {"change_seq": "BIGINT NOT NULL DEFAULT 0"},
+    "orders": {"change_seq": "BIGINT NOT NULL DEFAULT 0"},
+    "orders_archive": {"change_seq": "BIGINT NOT NULL DEFAULT 0"},
+    "position_history": {"change_seq": "BIGINT NOT NULL DEFAULT 0"},
+}
+
+def _upgrade_schema(conn):
+    inspector = inspect(conn)
+    for table_name, columns in ADDED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue # create_all creates it with every column
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {ddl}"))
+                logger.info(f"Added column {table_name}.{name}")
+
+    # Likewise for indexes declared on tables that already existed
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
 async def init_db():
     async with engine.begin() as conn:
         # In production, use Alembic for migrations
         # For dev, drop all to apply schema changes (User requested reset)
         # await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            # Partitioned parents accept no rows until their months exist
+            from app.services.partitions import create_current_partitions
+            await create_current_partitions(conn)
+        await conn.run_sync(_upgrade_schema)
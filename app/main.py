@@ -3,11 +3,20 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from app.database import init_db
-from app.routers import orders, accounts, market, positions, drawings
+from app.routers import orders, accounts, market, positions, drawings, metrics, health
 from app.services.binance_ws import binance_ws_service
 from app.services.coinbase_ws import coinbase_ws_service
-from app.services.matching_engine import matching_engine
-from app.services.equity_recorder import equity_recorder
+from app.services.leader_election import leader_election
+from app.services.pnl_stream import pnl_stream
+from app.services.notifications import notifier
+from app.services.price_broadcaster import price_broadcaster
+from app.services.db_metrics import QuerySourceMiddleware
+from app.services.warmup import warmup
+from app.services.loop_monitor import loop_monitor
+
+async def start_after_warmup(service):
+    await warmup.done.wait()
+    await service.start()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -15,18 +24,28 @@ async def lifespan(app: FastAPI):
     await init_db()
     
     # Start background tasks
+    loop_monitor_task = asyncio.create_task(loop_monitor.start())
     ws_task = asyncio.create_task(binance_ws_service.start())
     coinbase_ws_task = asyncio.create_task(coinbase_ws_service.start())
-    match_task = asyncio.create_task(matching_engine.start())
-    equity_task = asyncio.create_task(equity_recorder.start())
+    price_task = asyncio.create_task(price_broadcaster.start())
+    pnl_task = asyncio.create_task(pnl_stream.start())
+    notify_task = asyncio.create_task(notifier.start())
+    # Seed prices and caches in the background; /health/ready reports when done
+    warmup_task = asyncio.create_task(warmup.run())
+    # Matching engine and equity recorder run only in the elected leader process,
+    # once prices are seeded
+    leader_task = asyncio.create_task(start_after_warmup(leader_election))
     
     yield
     
     # Shutdown
+    loop_monitor.stop()
     binance_ws_service.stop()
     coinbase_ws_service.stop()
-    matching_engine.stop()
-    equity_recorder.stop()
+    price_broadcaster.stop()
+    pnl_stream.stop()
+    notifier.stop()
+    leader_election.stop()
     # Wait for tasks to finish if needed, or let them be cancelled
     # ws_task.cancel()
     # match_task.cancel()
@@ -42,13 +61,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Since-Cursor", "X-Drawings-Revision", "ETag"], # Pagination cursors, drawing revisions
 )
+# Tag DB statements with the route that issued them (/metrics/db)
+app.add_middleware(QuerySourceMiddleware)
 
 app.include_router(orders.router)
 app.include_router(accounts.router)
 app.include_router(market.router)
 app.include_router(positions.router)
 app.include_router(drawings.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 @app.get("/")
 async def root():
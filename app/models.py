@@ -1,12 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, Date, ForeignKey, Enum, JSON, UniqueConstraint, Index, PrimaryKeyConstraint
+from sqlalchemy import event, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, object_session
 from sqlalchemy.sql import func
 import enum
-from datetime import datetime
+from datetime import datetime, date
 
 class Base(DeclarativeBase):
     pass
 
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _primary_key_with_partition_key(constraint, compiler, **kw):
+    # Postgres requires the partition key in a partitioned table's primary key
+    ddl = compiler.visit_primary_key_constraint(constraint, **kw)
+    partition_key = constraint.table.info.get("partition_key")
+    if partition_key and ddl.endswith(")"):
+        ddl = f"{ddl[:-1]}, {compiler.preparer.quote(partition_key)})"
+    return ddl
+
 class OrderSide(str, enum.Enum):
     BUY = "BUY"
     SELL = "SELL"
@@ -34,6 +45,8 @@ class Account(Base):
     chart_settings: Mapped[dict] = mapped_column(JSON, default={})
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    # Last change_seq stamped on the account's orders / position history (see _stamp_change_seq)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
 
     positions: Mapped[list["Position"]] = relationship(back_populates="account")
     orders: Mapped[list["Order"]] = relationship(back_populates="account")
@@ -50,24 +63,67 @@ class Drawing(Base):
     type: Mapped[str] = mapped_column(String)
     data: Mapped[dict] = mapped_column(JSON)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    revision: Mapped[int] = mapped_column(Integer, default=0) # DrawingRevision.revision of the last change
+    deleted: Mapped[bool] = mapped_column(Boolean, default=False) # Tombstone, reported by delta reads
 
     account: Mapped["Account"] = relationship(back_populates="drawings")
 
+    __table_args__ = (Index("ix_drawings_account_id_symbol_revision", "account_id", "symbol", "revision"),)
+    __mapper_args__ = {"eager_defaults": True}
+
+class DrawingRevision(Base):
+    """Change counter of an account's drawings on one symbol, bumped once per write."""
+    __tablename__ = "drawing_revisions"
+    __table_args__ = (UniqueConstraint("account_id", "symbol"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    symbol: Mapped[str] = mapped_column(String)
+    revision: Mapped[int] = mapped_column(Integer, default=0)
+
 class EquityHistory(Base):
+    """
+    Range-partitioned by month on timestamp in Postgres (see
+    app/services/partitions.py), where timestamp is added to the primary key.
+    """
     __tablename__ = "equity_history"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
     equity: Mapped[float] = mapped_column(Float)
     timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     account: Mapped["Account"] = relationship(back_populates="equity_history")
 
+    __table_args__ = (
+        Index("ix_equity_history_account_id_timestamp", "account_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)", "info": {"partition_key": "timestamp"}},
+    )
+
+class EquityRollup(Base):
+    """
+    OHLC bars of equity_history per account, compacted by the rollup service.
+    1h bars are built from raw points, 1d bars from 1h bars.
+    """
+    __tablename__ = "equity_rollups"
+    __table_args__ = (UniqueConstraint("account_id", "resolution", "bucket_start"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    resolution: Mapped[str] = mapped_column(String) # 1h or 1d
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True)) # UTC
+    open: Mapped[float] = mapped_column(Float)
+    high: Mapped[float] = mapped_column(Float)
+    low: Mapped[float] = mapped_column(Float)
+    close: Mapped[float] = mapped_column(Float)
+    close_at: Mapped[datetime] = mapped_column(DateTime(timezone=True)) # Timestamp of the closing point
+
 class PositionHistory(Base):
+    """Range-partitioned by month on closed_at in Postgres, like EquityHistory."""
     __tablename__ = "position_history"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
     symbol: Mapped[str] = mapped_column(String, index=True)
     side: Mapped[str] = mapped_column(String) # LONG or SHORT
     quantity: Mapped[float] = mapped_column(Float)
@@ -80,14 +136,37 @@ class PositionHistory(Base):
     
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True)) # When position was opened
     closed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now()) # When position was closed
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
 
     account: Mapped["Account"] = relationship(back_populates="position_history")
 
+    __table_args__ = (
+        # Keyset pagination by (closed_at, id), polling by change_seq
+        Index("ix_position_history_account_id_closed_at_id", "account_id", "closed_at", "id"),
+        Index("ix_position_history_account_id_change_seq", "account_id", "change_seq"),
+        {"postgresql_partition_by": "RANGE (closed_at)", "info": {"partition_key": "closed_at"}},
+    )
+
+class PnlBucket(Base):
+    """
+    Net PNL (realized_pnl - total_fee) of positions closed per account and
+    15-minute UTC bucket. Every UTC offset in use is a multiple of 15 minutes,
+    so calendar days in any timezone are exact unions of buckets.
+    """
+    __tablename__ = "pnl_buckets"
+    __table_args__ = (UniqueConstraint("account_id", "bucket_start"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True)) # UTC
+    pnl: Mapped[float] = mapped_column(Float, default=0.0)
+    trade_count: Mapped[int] = mapped_column(Integer, default=0)
+
 class Position(Base):
     __tablename__ = "positions"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
     symbol: Mapped[str] = mapped_column(String, index=True)
     quantity: Mapped[float] = mapped_column(Float, default=0.0) # Positive = Long, Negative = Short
     entry_price: Mapped[float] = mapped_column(Float, default=0.0)
@@ -106,10 +185,12 @@ class Position(Base):
     
     account: Mapped["Account"] = relationship(back_populates="positions")
 
-class Order(Base):
-    __tablename__ = "orders"
+    # Fetch server-generated timestamps on flush so deltas can be serialized after commit
+    __mapper_args__ = {"eager_defaults": True}
+
+class OrderFieldsMixin:
+    """Columns shared by live orders and orders_archive."""
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
     account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
     symbol: Mapped[str] = mapped_column(String, index=True)
     side: Mapped[OrderSide] = mapped_column(String)
@@ -127,15 +208,42 @@ class Order(Base):
     status: Mapped[OrderStatus] = mapped_column(String, default=OrderStatus.NEW)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
+
+class Order(OrderFieldsMixin, Base):
+    """
+    Hot table: open orders plus recently finished ones. Terminal orders are
+    moved to orders_archive by the order archiver, so the matching engine's
+    open-order scan does not grow with history.
+    """
+    __tablename__ = "orders"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
     account: Mapped["Account"] = relationship(back_populates="orders")
     trades: Mapped[list["Trade"]] = relationship(back_populates="order")
 
-class Trade(Base):
-    __tablename__ = "trades"
+    # Keyset pagination by id, polling by change_seq
+    __table_args__ = (
+        Index("ix_orders_account_id_id", "account_id", "id"),
+        Index("ix_orders_account_id_change_seq", "account_id", "change_seq"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
+class OrderArchive(OrderFieldsMixin, Base):
+    """FILLED / CANCELED / REJECTED orders, moved here with their original id."""
+    __tablename__ = "orders_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+
+    __table_args__ = (
+        Index("ix_orders_archive_account_id_id", "account_id", "id"),
+        Index("ix_orders_archive_account_id_change_seq", "account_id", "change_seq"),
+    )
+
+class TradeFieldsMixin:
+    """Columns shared by trades and trades_archive."""
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"))
     symbol: Mapped[str] = mapped_column(String, index=True)
     side: Mapped[OrderSide] = mapped_column(String)
     price: Mapped[float] = mapped_column(Float)
@@ -143,4 +251,107 @@ class Trade(Base):
     commission: Mapped[float] = mapped_column(Float, default=0.0)
     executed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+class Trade(TradeFieldsMixin, Base):
+    __tablename__ = "trades"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"))
+
     order: Mapped["Order"] = relationship(back_populates="trades")
+
+    __mapper_args__ = {"eager_defaults": True}
+
+class TradeArchive(TradeFieldsMixin, Base):
+    """Fills of archived orders, moved together with them."""
+    __tablename__ = "trades_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders_archive.id"), index=True)
+
+class StatsAggregateMixin:
+    """
+    Mergeable running aggregates behind /accounts/{id}/statistics.
+
+    Trade fields are kept per side (ALL / LONG / SHORT). Equity fields are
+    only maintained on side == "ALL" rows. Streaks are stored as
+    prefix/suffix/max run lengths so consecutive buckets can be combined.
+    """
+
+    # Closed positions (net PNL = realized_pnl - total_fee)
+    trade_count: Mapped[int] = mapped_column(Integer, default=0)
+    win_count: Mapped[int] = mapped_column(Integer, default=0)
+    loss_count: Mapped[int] = mapped_column(Integer, default=0) # net PNL <= 0
+    gross_profit: Mapped[float] = mapped_column(Float, default=0.0)
+    gross_loss: Mapped[float] = mapped_column(Float, default=0.0) # Positive
+    r_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    r_count: Mapped[int] = mapped_column(Integer, default=0)
+    win_prefix: Mapped[int] = mapped_column(Integer, default=0)
+    win_suffix: Mapped[int] = mapped_column(Integer, default=0)
+    win_max: Mapped[int] = mapped_column(Integer, default=0)
+    loss_prefix: Mapped[int] = mapped_column(Integer, default=0)
+    loss_suffix: Mapped[int] = mapped_column(Integer, default=0)
+    loss_max: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Equity curve
+    equity_count: Mapped[int] = mapped_column(Integer, default=0)
+    equity_first: Mapped[float] = mapped_column(Float, nullable=True)
+    equity_first_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    equity_last: Mapped[float] = mapped_column(Float, nullable=True)
+    equity_last_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    equity_peak: Mapped[float] = mapped_column(Float, nullable=True)
+    equity_trough: Mapped[float] = mapped_column(Float, nullable=True)
+    max_drawdown: Mapped[float] = mapped_column(Float, default=0.0)
+    max_drawdown_pct: Mapped[float] = mapped_column(Float, default=0.0)
+
+    # Daily returns (close-to-close) for Sharpe / Sortino
+    return_count: Mapped[int] = mapped_column(Integer, default=0)
+    return_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    return_sq_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    return_downside_sq_sum: Mapped[float] = mapped_column(Float, default=0.0) # Sum of min(r, 0)^2
+
+class AccountStats(StatsAggregateMixin, Base):
+    __tablename__ = "account_stats"
+    __table_args__ = (UniqueConstraint("account_id", "side"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    side: Mapped[str] = mapped_column(String) # ALL, LONG or SHORT
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+
+class AccountStatsDaily(StatsAggregateMixin, Base):
+    __tablename__ = "account_stats_daily"
+    __table_args__ = (UniqueConstraint("account_id", "side", "day"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
+    side: Mapped[str] = mapped_column(String)
+    day: Mapped[date] = mapped_column(Date) # UTC day
+    prev_close: Mapped[float] = mapped_column(Float, nullable=True) # Last equity of the previous bucket
+    daily_return: Mapped[float] = mapped_column(Float, nullable=True) # equity_last / prev_close - 1
+
+
+def _next_change_seq(connection, account_id: int) -> int:
+    accounts = Account.__table__
+    return connection.execute(
+        update(accounts).where(accounts.c.id == account_id)
+        .values(change_seq=accounts.c.change_seq + 1)
+        .returning(accounts.c.change_seq)
+    ).scalar_one()
+
+@event.listens_for(Order, "before_insert")
+@event.listens_for(PositionHistory, "before_insert")
+def _stamp_change_seq(mapper, connection, target):
+    """
+    Stamp every order write and closed position with the account's next
+    change_seq, for since-polling. Bumping the counter locks the account row
+    until commit, so per account the sequence follows commit order: a poller
+    never sees a higher change_seq before a lower one commits, which a
+    timestamp or a database sequence cannot guarantee.
+    """
+    target.change_seq = _next_change_seq(connection, target.account_id)
+
+@event.listens_for(Order, "before_update")
+def _stamp_order_update(mapper, connection, target):
+    # Skip flushes without a net change (e.g. a field set to its current value)
+    if object_session(target).is_modified(target, include_collections=False):
+        _stamp_change_seq(mapper, connection, target)
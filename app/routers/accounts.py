@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+import calendar
+import math
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, extract
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import selectinload
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Account, Position, EquityHistory, PositionHistory
 from app.schemas import AccountResponse, EquityHistoryResponse, PositionHistoryResponse, AccountStatistics, AccountUpdate
-import math
-import statistics
-
 from app.services.binance_ws import get_current_price
+from app.services.account_stats import read_account_statistics
+from app.services.analytics import compute_account_statistics
+from app.services.equity_downsample import downsample_equity, METHODS as EQUITY_DOWNSAMPLE_METHODS
+from app.services.equity_rollup import pick_resolution
+from app.services.daily_pnl import read_daily_pnl
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, SINCE_CURSOR_HEADER, NEXT, SINCE, encode_cursor, decode_cursor,
+)
+from app.config import settings
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
@@ -49,44 +58,69 @@ async def get_account(account_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Account not found")
     return await calculate_account_metrics(account)
 @router.get("/{account_id}/equity-history", response_model=list[EquityHistoryResponse])
-async def get_equity_history(account_id: int, hours: int = None, limit: int = 1000, db: AsyncSession = Depends(get_db)):
-    stmt = select(EquityHistory).where(EquityHistory.account_id == account_id)
-    
-    if hours:
-        since = datetime.utcnow() - timedelta(hours=hours)
-        stmt = stmt.where(EquityHistory.timestamp >= since)
-        
-    stmt = stmt.order_by(EquityHistory.timestamp.asc())
-    result = await db.execute(stmt)
-    data = result.scalars().all()
-    
-    # Downsampling in Python to reduce payload size and frontend load
-    if limit > 0 and len(data) > limit:
-        sampled_data = []
-        # Algorithm: Uniformly sample 'limit' points
-        # Always include the first and last point
-        
-        sampled_data.append(data[0])
-        
-        # We need limit-2 intermediate points
-        if limit > 2:
-            step = (len(data) - 1) / (limit - 1)
-            for i in range(1, limit - 1):
-                index = int(i * step)
-                sampled_data.append(data[index])
-        
-        if len(data) > 1:
-            sampled_data.append(data[-1])
-            
-        return sampled_data
-        
-    return data
+async def get_equity_history(account_id: int, hours: int = None, limit: int = 1000, method: str = "minmax", db: AsyncSession = Depends(get_read_db)):
+    if method not in EQUITY_DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(EQUITY_DOWNSAMPLE_METHODS)}")
+    if 0 < limit < 3:
+        raise HTTPException(status_code=400, detail="limit must be 0 (no downsampling) or at least 3")
+
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    start = since or await db.scalar(select(Account.created_at).where(Account.id == account_id))
+    if start is None:
+        return []
+
+    # Coarsest of raw / 1h / 1d that still fills `limit` points over the range
+    resolution = pick_resolution(start, limit if limit > 0 else math.inf)
+    # Downsampled in the database: at most `limit` rows are fetched
+    return await downsample_equity(db, account_id, since, limit, method, resolution)
 
 @router.get("/{account_id}/position-history", response_model=list[PositionHistoryResponse])
-async def get_position_history(account_id: int, db: AsyncSession = Depends(get_db)):
-    stmt = select(PositionHistory).where(PositionHistory.account_id == account_id).order_by(PositionHistory.closed_at.desc())
-    result = await db.execute(stmt)
-    return result.scalars().all()
+async def get_position_history(
+    account_id: int,
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Most recently closed first, `limit` per page; pass X-Next-Cursor back as
+    `cursor` for the next page and X-Since-Cursor as `since` to poll for
+    positions closed after it (oldest first).
+    """
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        cursor_key = decode_cursor(NEXT, cursor) if cursor else None
+        since_key = decode_cursor(SINCE, since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cursor_key and cursor_key[0] is None:
+        # An id-only cursor (e.g. from /orders) would compare to NULL and end the listing
+        raise HTTPException(status_code=400, detail="Not a position history cursor")
+
+    key = tuple_(PositionHistory.closed_at, PositionHistory.id)
+    stmt = select(PositionHistory).where(PositionHistory.account_id == account_id)
+
+    if since_key:
+        stmt = stmt.where(PositionHistory.change_seq > since_key[1])
+        stmt = stmt.order_by(PositionHistory.change_seq.asc()).limit(limit)
+        rows = (await db.execute(stmt)).scalars().all()
+        response.headers[SINCE_CURSOR_HEADER] = encode_cursor(SINCE, rows[-1].change_seq) if rows else since
+        return rows
+
+    if cursor_key:
+        stmt = stmt.where(key < tuple_(*cursor_key))
+    else:
+        # Read before the page: positions closed meanwhile are polled again, never missed
+        change_seq = await db.scalar(select(Account.change_seq).where(Account.id == account_id))
+        if change_seq is not None:
+            response.headers[SINCE_CURSOR_HEADER] = encode_cursor(SINCE, change_seq)
+    stmt = stmt.order_by(PositionHistory.closed_at.desc(), PositionHistory.id.desc()).limit(limit)
+    rows = (await db.execute(stmt)).scalars().all()
+    if len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(NEXT, rows[-1].id, rows[-1].closed_at)
+    return rows
 
 @router.get("/{account_id}/daily-pnl")
 async def get_daily_pnl(
@@ -95,267 +129,44 @@ async def get_daily_pnl(
     month: Optional[int] = None, 
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    tz: str = "UTC",
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Group by day and sum (realized_pnl - total_fee)
-    date_expr = func.date_trunc('day', PositionHistory.closed_at)
-    
-    stmt = select(
-        date_expr.label('date'),
-        func.sum(PositionHistory.realized_pnl - PositionHistory.total_fee).label('pnl')
-    ).where(
-        PositionHistory.account_id == account_id
-    )
+    # Days are calendar days in `tz` (IANA name, e.g. "Asia/Taipei")
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
 
+    first_day = last_day = None
     if start_date and end_date:
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1) # Include the end date
-        stmt = stmt.where(PositionHistory.closed_at >= start_dt, PositionHistory.closed_at < end_dt)
+        try:
+            first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+            last_day = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
     elif year and month:
-        stmt = stmt.where(
-            extract('year', PositionHistory.closed_at) == year,
-            extract('month', PositionHistory.closed_at) == month
-        )
-    
-    stmt = stmt.group_by(
-        date_expr
-    ).order_by(
-        date_expr
-    )
-    
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    # Debug logging
-    print(f"Querying PNL for {year}-{month}, Account: {account_id}")
-    print(f"Found {len(rows)} rows")
-    for row in rows:
-        print(f"Date: {row.date}, PNL: {row.pnl}")
+        first_day = date(year, month, 1)
+        last_day = date(year, month, calendar.monthrange(year, month)[1])
 
-    data = []
-    for row in rows:
-        date_str = row.date.strftime("%Y-%m-%d") if hasattr(row.date, 'strftime') else str(row.date)[:10]
-        data.append({"date": date_str, "pnl": row.pnl})
-    return data
+    return await read_daily_pnl(db, account_id, zone, first_day, last_day)
 
 @router.get("/{account_id}/statistics", response_model=AccountStatistics)
-async def get_account_statistics(account_id: int, days: float = None, db: AsyncSession = Depends(get_db)):
-    # Calculate start date if days provided
-    start_date = None
-    if days:
-        start_date = datetime.utcnow() - timedelta(days=days)
-
-    # Fetch Position History
-    stmt = select(PositionHistory).where(PositionHistory.account_id == account_id)
-    if start_date:
-        stmt = stmt.where(PositionHistory.closed_at >= start_date)
-    stmt = stmt.order_by(PositionHistory.closed_at.asc())
-    
-    result = await db.execute(stmt)
-    trades = result.scalars().all()
-
-    # Fetch Equity History
-    stmt = select(EquityHistory).where(EquityHistory.account_id == account_id)
-    if start_date:
-        stmt = stmt.where(EquityHistory.timestamp >= start_date)
-    stmt = stmt.order_by(EquityHistory.timestamp.asc())
-    
-    result = await db.execute(stmt)
-    equity_curve = result.scalars().all()
-
-    # Fetch Account for current balance
-    stmt = select(Account).where(Account.id == account_id)
-    result = await db.execute(stmt)
-    account = result.scalar_one_or_none()
-    
-    if not account:
+async def get_account_statistics(account_id: int, days: float = None, db: AsyncSession = Depends(get_read_db)):
+    if not days or days > settings.STATS_EXACT_WINDOW_DAYS:
+        # Served from running aggregates: all-time is a single read,
+        # windows merge the daily buckets they cover
+        stats = await read_account_statistics(db, account_id, days)
+        if stats is None:
+            raise HTTPException(status_code=404, detail="Account not found")
+        return stats
+
+    # Short windows: exact computation over the raw history, vectorized
+    start_date = datetime.utcnow() - timedelta(days=days)
+    stats = await compute_account_statistics(db, account_id, start_date)
+    if stats is None:
         raise HTTPException(status_code=404, detail="Account not found")
-
-    # --- Calculations ---
-    
-    # 1. Trade Statistics
-    total_trades = len(trades)
-    
-    # Calculate Net PNL (Realized PNL - Fees)
-    net_pnls = [(t.realized_pnl - t.total_fee) for t in trades]
-    
-    wins = [pnl for pnl in net_pnls if pnl > 0]
-    losses = [pnl for pnl in net_pnls if pnl <= 0]
-    
-    win_rate = len(wins) / total_trades if total_trades > 0 else 0.0
-    
-    avg_win = statistics.mean(wins) if wins else 0.0
-    avg_loss = statistics.mean(losses) if losses else 0.0
-    
-    gross_profit = sum(wins)
-    gross_loss = abs(sum(losses))
-    
-    if gross_loss > 0:
-        profit_factor = gross_profit / gross_loss
-    else:
-        profit_factor = 0.0 # Avoid infinite value for JSON serialization
-    
-    # Long Profit Factor
-    long_trades = [t for t in trades if t.side == 'LONG']
-    long_net_pnls = [(t.realized_pnl - t.total_fee) for t in long_trades]
-    long_wins = [pnl for pnl in long_net_pnls if pnl > 0]
-    long_losses = [pnl for pnl in long_net_pnls if pnl <= 0]
-    long_gross_profit = sum(long_wins)
-    long_gross_loss = abs(sum(long_losses))
-    
-    if long_gross_loss > 0:
-        long_profit_factor = long_gross_profit / long_gross_loss
-    else:
-        long_profit_factor = 0.0
-
-    # Short Profit Factor
-    short_trades = [t for t in trades if t.side == 'SHORT']
-    short_net_pnls = [(t.realized_pnl - t.total_fee) for t in short_trades]
-    short_wins = [pnl for pnl in short_net_pnls if pnl > 0]
-    short_losses = [pnl for pnl in short_net_pnls if pnl <= 0]
-    short_gross_profit = sum(short_wins)
-    short_gross_loss = abs(sum(short_losses))
-    
-    if short_gross_loss > 0:
-        short_profit_factor = short_gross_profit / short_gross_loss
-    else:
-        short_profit_factor = 0.0
-
-    # Expectancy = (Win Rate * Avg Win) + (Loss Rate * Avg Loss)  <-- Avg Loss is usually negative
-    loss_rate = 1.0 - win_rate
-    expectancy = (win_rate * avg_win) + (loss_rate * avg_loss)
-
-    # Avg R-Multiple
-    # R = Realized PNL / Initial Risk
-    # Initial Risk = abs(Entry - Initial SL) * Quantity
-    # Note: We need to calculate R for each trade and then average them
-    r_multiples = []
-    for t in trades:
-        if t.initial_stop_loss_price:
-            risk_per_unit = abs(t.entry_price - t.initial_stop_loss_price)
-            if risk_per_unit > 0:
-                total_risk = risk_per_unit * t.quantity
-                if total_risk > 0:
-                    net_pnl = t.realized_pnl - t.total_fee
-                    r = net_pnl / total_risk
-                    r_multiples.append(r)
-    
-    if r_multiples:
-        reward_to_risk_ratio = statistics.mean(r_multiples)
-    else:
-        # Fallback to Avg Win / Avg Loss if no SL data
-        if abs(avg_loss) > 0:
-            reward_to_risk_ratio = avg_win / abs(avg_loss)
-        else:
-            reward_to_risk_ratio = 0.0
-
-    # 2. Equity Statistics (Drawdown, Sharpe, CAGR)
-    max_drawdown = 0.0
-    max_drawdown_pct = 0.0
-    peak_equity = 0.0
-    
-    # If no equity history, try to reconstruct from trades + initial balance? 
-    # For now, rely on equity_history. If empty, use current balance as single point.
-    
-    equity_values = [e.equity for e in equity_curve]
-    if not equity_values and account:
-        equity_values = [account.balance] # Fallback
-        
-    if equity_values:
-        peak_equity = equity_values[0]
-        for eq in equity_values:
-            if eq > peak_equity:
-                peak_equity = eq
-            
-            dd = peak_equity - eq
-            dd_pct = (dd / peak_equity) if peak_equity > 0 else 0.0
-            
-            if dd > max_drawdown:
-                max_drawdown = dd
-            if dd_pct > max_drawdown_pct:
-                max_drawdown_pct = dd_pct
-
-    # Sharpe Ratio
-    # Need daily returns. 
-    # We can approximate by grouping equity history by day, or just using the points we have if they are daily.
-    # Assuming equity_history is recorded frequently, we should resample to daily.
-    # For simplicity here, we'll calculate returns based on the available data points if they span enough time.
-    
-    sharpe_ratio = 0.0
-    if len(equity_values) > 1:
-        returns = []
-        for i in range(1, len(equity_values)):
-            prev = equity_values[i-1]
-            curr = equity_values[i]
-            if prev > 0:
-                ret = (curr - prev) / prev
-                returns.append(ret)
-        
-        if returns and len(returns) > 1:
-            mean_ret = statistics.mean(returns)
-            stdev_ret = statistics.stdev(returns)
-            if stdev_ret > 0:
-                # Annualize (assuming daily data points roughly)
-                # If data is not daily, this needs adjustment. 
-                # Let's assume the equity recorder runs daily or we just take the sequence as "periods"
-                sharpe_ratio = (mean_ret / stdev_ret) * math.sqrt(365) 
-
-    # CAGR
-    cagr = 0.0
-    if equity_curve:
-        start_date = equity_curve[0].timestamp
-        end_date = equity_curve[-1].timestamp
-        start_val = equity_curve[0].equity
-        end_val = equity_curve[-1].equity
-        
-        days = (end_date - start_date).days
-        if days > 0 and start_val > 0:
-            years = days / 365.0
-            try:
-                cagr = (end_val / start_val) ** (1 / years) - 1
-            except:
-                cagr = 0.0
-    
-    # Win/Loss Streak
-    max_win_streak = 0
-    max_loss_streak = 0
-    current_win_streak = 0
-    current_loss_streak = 0
-    
-    for pnl in net_pnls:
-        if pnl > 0:
-            current_win_streak += 1
-            current_loss_streak = 0
-            if current_win_streak > max_win_streak:
-                max_win_streak = current_win_streak
-        elif pnl < 0:
-            current_loss_streak += 1
-            current_win_streak = 0
-            if current_loss_streak > max_loss_streak:
-                max_loss_streak = current_loss_streak
-        else:
-            # Break even resets both? Or treat as neutral? 
-            # Usually break even resets streaks
-            current_win_streak = 0
-            current_loss_streak = 0
-
-    return AccountStatistics(
-        max_drawdown=max_drawdown,
-        max_drawdown_pct=max_drawdown_pct,
-        expectancy=expectancy,
-        profit_factor=profit_factor,
-        long_profit_factor=long_profit_factor,
-        short_profit_factor=short_profit_factor,
-        reward_to_risk_ratio=reward_to_risk_ratio,
-        sharpe_ratio=sharpe_ratio,
-        cagr=cagr,
-        win_rate=win_rate,
-        total_trades=total_trades,
-        average_win=avg_win,
-        average_loss=avg_loss,
-        max_win_streak=max_win_streak,
-        max_loss_streak=max_loss_streak
-    )
+    return stats
 
 @router.patch("/{account_id}", response_model=AccountResponse)
 async def update_account(account_id: int, update_data: AccountUpdate, db: AsyncSession = Depends(get_db)):
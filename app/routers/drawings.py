@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, dialect_insert
 from app import models, schemas
 
 router = APIRouter(
@@ -12,52 +12,157 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+REVISION_HEADER = "X-Drawings-Revision"
+
+
+def _etag(revision: int) -> str:
+    return f'"{revision}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored, any listed tag (or *) matches."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in tags)
+
+
+async def _bump_revision(db: AsyncSession, account_id: int, symbol: str) -> int:
+    """
+    Next revision of (account_id, symbol). The upsert locks the counter row
+    until commit, so concurrent writers to the same chart are serialized.
+    """
+    stmt = dialect_insert(db)(models.DrawingRevision).values(account_id=account_id, symbol=symbol, revision=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["account_id", "symbol"],
+        set_={"revision": models.DrawingRevision.revision + 1},
+    ).returning(models.DrawingRevision.revision)
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def _live_drawing(db: AsyncSession, drawing_id: int) -> models.Drawing:
+    result = await db.execute(select(models.Drawing).filter(models.Drawing.id == drawing_id, models.Drawing.deleted.is_(False)))
+    db_drawing = result.scalar_one_or_none()
+    if not db_drawing:
+        raise HTTPException(status_code=404, detail="Drawing not found")
+    return db_drawing
+
+
 @router.post("/", response_model=schemas.DrawingResponse)
 async def create_drawing(drawing: schemas.DrawingCreate, db: AsyncSession = Depends(get_db)):
-    db_drawing = models.Drawing(**drawing.dict())
+    revision = await _bump_revision(db, drawing.account_id, drawing.symbol)
+    db_drawing = models.Drawing(**drawing.dict(), revision=revision)
     db.add(db_drawing)
     await db.commit()
-    await db.refresh(db_drawing)
     return db_drawing
 
 @router.get("/", response_model=List[schemas.DrawingResponse])
-async def read_drawings(account_id: int, symbol: str, db: AsyncSession = Depends(get_db)):
+async def read_drawings(
+    account_id: int,
+    symbol: str,
+    request: Request,
+    response: Response,
+    since_revision: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Drawings of an account on a symbol. With `since_revision`, only drawings
+    changed after that revision, including deleted ones (`deleted: true`).
+    The current revision is returned as ETag / X-Drawings-Revision; a
+    matching If-None-Match gets 304 Not Modified.
+    """
     try:
-        result = await db.execute(
-            select(models.Drawing).filter(
-                models.Drawing.account_id == account_id,
-                models.Drawing.symbol == symbol
+        revision = await db.scalar(
+            select(models.DrawingRevision.revision).filter(
+                models.DrawingRevision.account_id == account_id,
+                models.DrawingRevision.symbol == symbol
             )
+        ) or 0
+        headers = {"ETag": _etag(revision), REVISION_HEADER: str(revision), "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        stmt = select(models.Drawing).filter(
+            models.Drawing.account_id == account_id,
+            models.Drawing.symbol == symbol
         )
+        if since_revision is not None:
+            stmt = stmt.filter(models.Drawing.revision > since_revision)
+        else:
+            stmt = stmt.filter(models.Drawing.deleted.is_(False))
+        result = await db.execute(stmt)
         drawings = result.scalars().all()
+        response.headers.update(headers)
         return drawings
     except Exception as e:
         print(f"Error reading drawings: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/bulk", response_model=schemas.DrawingBatchResponse)
+async def sync_drawings(batch: schemas.DrawingBatch, db: AsyncSession = Depends(get_db)):
+    """Apply creates, updates and deletes of one chart's drawings in a single transaction."""
+    if any(item.id is None and not item.type for item in batch.upserts):
+        raise HTTPException(status_code=400, detail="New drawings need a type")
+
+    revision = await _bump_revision(db, batch.account_id, batch.symbol)
+    if batch.base_revision is not None and revision - 1 != batch.base_revision:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Drawings changed since revision {batch.base_revision}")
+
+    ids = {item.id for item in batch.upserts if item.id is not None} | set(batch.deletes)
+    existing = {}
+    if ids:
+        result = await db.execute(
+            select(models.Drawing).filter(
+                models.Drawing.id.in_(ids),
+                models.Drawing.account_id == batch.account_id,
+                models.Drawing.symbol == batch.symbol,
+                models.Drawing.deleted.is_(False)
+            )
+        )
+        existing = {d.id: d for d in result.scalars().all()}
+    missing = ids - set(existing)
+    if missing:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail=f"Drawings not found: {sorted(missing)}")
+
+    upserted = []
+    for item in batch.upserts:
+        if item.id is None:
+            db_drawing = models.Drawing(account_id=batch.account_id, symbol=batch.symbol, type=item.type, data=item.data)
+            db.add(db_drawing)
+        else:
+            db_drawing = existing[item.id]
+            db_drawing.data = item.data
+            if item.type:
+                db_drawing.type = item.type
+        db_drawing.revision = revision
+        upserted.append(db_drawing)
+
+    for drawing_id in batch.deletes:
+        existing[drawing_id].deleted = True
+        existing[drawing_id].revision = revision
+
+    await db.commit()
+    return {"revision": revision, "drawings": upserted}
+
 @router.delete("/{drawing_id}")
 async def delete_drawing(drawing_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Drawing).filter(models.Drawing.id == drawing_id))
-    db_drawing = result.scalar_one_or_none()
-    
-    if not db_drawing:
-        raise HTTPException(status_code=404, detail="Drawing not found")
-    
-    await db.delete(db_drawing)
+    db_drawing = await _live_drawing(db, drawing_id)
+
+    # Kept as a tombstone so since_revision readers see the deletion
+    db_drawing.deleted = True
+    db_drawing.revision = await _bump_revision(db, db_drawing.account_id, db_drawing.symbol)
     await db.commit()
     return {"ok": True}
 
 @router.put("/{drawing_id}", response_model=schemas.DrawingResponse)
 async def update_drawing(drawing_id: int, drawing_update: schemas.DrawingUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Drawing).filter(models.Drawing.id == drawing_id))
-    db_drawing = result.scalar_one_or_none()
-    
-    if not db_drawing:
-        raise HTTPException(status_code=404, detail="Drawing not found")
-    
+    db_drawing = await _live_drawing(db, drawing_id)
+
     if drawing_update.data:
         db_drawing.data = drawing_update.data
-    
+        db_drawing.revision = await _bump_revision(db, db_drawing.account_id, db_drawing.symbol)
+
     await db.commit()
-    await db.refresh(db_drawing)
     return db_drawing
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from app.services.warmup import warmup
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live")
+async def live():
+    """The process is up and serving requests (restart it if this fails)."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def ready():
+    """503 until warmed up, with the database reachable and prices streaming (route traffic only when 200)."""
+    status = await warmup.readiness()
+    if not status["ready"]:
+        raise HTTPException(status_code=503, detail=status)
+    return status
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
 from app.services.binance_ws import get_all_prices as get_binance_prices
 from app.services.coinbase_ws import get_all_coinbase_prices
+from app.services.price_broadcaster import price_broadcaster
+from app.services.candle_cache import candle_cache
+from app.services.indicators import parse_indicators
 from app.config import settings
 import aiohttp
 import websockets
@@ -38,8 +41,63 @@ COINBASE_INTERVAL_MAP = {
     "1d": "ONE_DAY"
 }
 
+def _indicators_param(indicators: Optional[str]) -> list:
+    try:
+        return parse_indicators(indicators) if indicators else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _warm_candle_cache(symbol: str, interval: str, exchange: str, limit: int = 300, open_time: Optional[int] = None):
+    # Load the latest page into a cold cache, or into one that stops short of
+    # the candle before open_time (candles were missed): the page joins the
+    # cached candles, or replaces them if it does not reach them
+    series = candle_cache.get(exchange, symbol, interval)
+    if series is None or not series.candles or (open_time is not None and not series.follows(open_time)):
+        klines = await fetch_klines(symbol, interval, limit, None, exchange)
+        candle_cache.merge_klines(exchange, symbol, interval, klines)
+
+# Minimum time between backfills of a kline proxy's forming candle
+BACKFILL_RETRY_SECONDS = 5.0
+
+async def _backfill_candle_cache(symbol: str, interval: str, exchange: str, limit: int, open_time: int) -> bool:
+    """_warm_candle_cache for stream proxies: failures are logged, the stream keeps going."""
+    try:
+        await _warm_candle_cache(symbol, interval, exchange, limit, open_time)
+        return True
+    except Exception as e:
+        print(f"Candle cache backfill failed for {exchange} {symbol} {interval}: {e}")
+        return False
+
 @router.get("/klines")
-async def get_klines(symbol: str, interval: str, limit: int = 300, endTime: Optional[int] = None, exchange: str = Query("BINANCE")):
+async def get_klines(symbol: str, interval: str, limit: int = 300, endTime: Optional[int] = None, exchange: str = Query("BINANCE"), include: Optional[str] = None, indicators: Optional[str] = None):
+    # include=fvg returns {"klines": [...], "fvg": [...]} with the fair value gaps
+    # (detected server-side, shared by all viewers) starting within these klines.
+    # indicators=ema:20,rsi,bb:20:2 adds "indicators": {"ema:20": {"value": [...]}, ...}
+    # with each output aligned with the klines (null while warming up)
+    extras = set(include.split(",")) if include else set()
+    specs = _indicators_param(indicators)
+    klines = await fetch_klines(symbol, interval, limit, endTime, exchange)
+    if not extras and not specs:
+        return klines
+
+    if exchange.upper() == "COINBASE" and symbol.endswith("-PERP"):
+        symbol = symbol.replace("-PERP", "-USD")
+    result = {"klines": klines}
+    if "fvg" in extras:
+        result["fvg"] = candle_cache.fvgs_for_klines(exchange, symbol, interval, klines)
+    if specs:
+        result["indicators"] = candle_cache.indicators_for_klines(exchange, symbol, interval, klines, specs)
+    return result
+
+@router.get("/fvg")
+async def get_fvgs(symbol: str, interval: str, exchange: str = Query("BINANCE"), start_time: Optional[int] = None, end_time: Optional[int] = None):
+    """Fair value gaps from the candle cache (open time in ms, filled_time set once filled)."""
+    if exchange.upper() == "COINBASE" and symbol.endswith("-PERP"):
+        symbol = symbol.replace("-PERP", "-USD")
+    await _warm_candle_cache(symbol, interval, exchange)
+    return candle_cache.series(exchange, symbol, interval).fvg.between(start_time, end_time)
+
+async def fetch_klines(symbol: str, interval: str, limit: int = 300, endTime: Optional[int] = None, exchange: str = "BINANCE"):
     session = await get_client_session()
     
     if exchange.upper() == "COINBASE":
@@ -126,7 +184,7 @@ async def get_klines(symbol: str, interval: str, limit: int = 300, endTime: Opti
             
     else:
         # Use Binance Futures API
-        url = "https://fapi.binance.com/fapi/v1/klines"
+        url = f"{settings.BINANCE_API_URL}/fapi/v1/klines"
         params = {
             "symbol": symbol,
             "interval": interval,
@@ -148,9 +206,16 @@ async def get_klines(symbol: str, interval: str, limit: int = 300, endTime: Opti
             raise HTTPException(status_code=500, detail=str(e))
 
 @router.websocket("/ws/klines/{symbol}/{interval}")
-async def websocket_endpoint(websocket: WebSocket, symbol: str, interval: str, exchange: str = "BINANCE"):
+async def websocket_endpoint(websocket: WebSocket, symbol: str, interval: str, exchange: str = "BINANCE", indicators: Optional[str] = None):
+    # indicators=ema:20,rsi adds "indicators": {"ema:20": {"value": ...}, ...} for
+    # the candle of each message
     await websocket.accept()
-    
+    try:
+        specs = parse_indicators(indicators) if indicators else []
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
     if exchange.upper() == "COINBASE":
         # Auto-map PERP to USD for legacy/public API compatibility
         if symbol.endswith("-PERP"):
@@ -164,7 +229,10 @@ async def websocket_endpoint(websocket: WebSocket, symbol: str, interval: str, e
         }
         sleep_time = 2 if seconds_map.get(interval, 60) > 2 else 1
         
+        backfill_after = 0.0
         try:
+            if specs:
+                await _warm_candle_cache(symbol, interval, "COINBASE")
             while True:
                 # Fetch last 2 candles to be sure we get the latest update
                 # We reuse the logic but call helper or just simple request
@@ -208,6 +276,19 @@ async def websocket_endpoint(websocket: WebSocket, symbol: str, interval: str, e
                                     "v": latest[5]
                                 }
                                 msg = { "k": k_obj }
+
+                                if len(data) > 1:
+                                    # The candle before the latest has closed
+                                    prev = data[1]
+                                    prev_k = {"t": int(prev[0]) * 1000, "o": prev[3], "h": prev[2], "l": prev[1], "c": prev[4], "v": prev[5]}
+                                    if not candle_cache.merge_closed_kline("COINBASE", symbol, interval, prev_k):
+                                        # Candles were missed: the latest page contains this one
+                                        await _backfill_candle_cache(symbol, interval, "COINBASE", 300, prev_k["t"])
+                                if specs:
+                                    if not candle_cache.series("COINBASE", symbol, interval).follows(k_obj["t"]) and time.monotonic() >= backfill_after:
+                                        backfill_after = time.monotonic() + BACKFILL_RETRY_SECONDS
+                                        await _backfill_candle_cache(symbol, interval, "COINBASE", 300, k_obj["t"])
+                                    msg["indicators"] = candle_cache.indicators_for_kline("COINBASE", symbol, interval, k_obj, specs)
                                 await websocket.send_json(msg)
                 except Exception as e:
                     err_str = str(e)
@@ -223,13 +304,32 @@ async def websocket_endpoint(websocket: WebSocket, symbol: str, interval: str, e
     else:
         # Use Binance Futures WebSocket
         ws_symbol = symbol.lower()
-        binance_ws_url = f"wss://fstream.binance.com/ws/{ws_symbol}@kline_{interval}"
+        binance_ws_url = f"{settings.BINANCE_WS_URL}/ws/{ws_symbol}@kline_{interval}"
         
+        backfill_after = 0.0
         try:
+            if specs:
+                await _warm_candle_cache(symbol, interval, "BINANCE", 1000)
             async with websockets.connect(binance_ws_url) as binance_ws:
                 async for message in binance_ws:
+                    data = json.loads(message)
+                    closed = data["k"]["x"]
+                    if closed:
+                        # Closed candle: extend the shared candle cache (FVGs, indicators)
+                        if not candle_cache.merge_closed_kline("BINANCE", symbol, interval, data["k"]):
+                            # Candles were missed: the latest page contains this one
+                            await _backfill_candle_cache(symbol, interval, "BINANCE", 1000, int(data["k"]["t"]))
+                    elif specs and not candle_cache.series("BINANCE", symbol, interval).follows(int(data["k"]["t"])) \
+                            and time.monotonic() >= backfill_after:
+                        # The forming candle is not right after the cached ones (a close was missed)
+                        backfill_after = time.monotonic() + BACKFILL_RETRY_SECONDS
+                        await _backfill_candle_cache(symbol, interval, "BINANCE", 1000, int(data["k"]["t"]))
                     try:
-                        await websocket.send_text(message)
+                        if specs:
+                            data["indicators"] = candle_cache.indicators_for_kline("BINANCE", symbol, interval, data["k"], specs)
+                            await websocket.send_json(data)
+                        else:
+                            await websocket.send_text(message)
                     except Exception:
                         break
         except Exception as e:
@@ -241,18 +341,37 @@ async def websocket_endpoint(websocket: WebSocket, symbol: str, interval: str, e
                 pass
 
 @router.websocket("/ws/prices")
-async def websocket_prices(websocket: WebSocket):
+async def websocket_prices(websocket: WebSocket, symbols: Optional[str] = None, max_rate: Optional[float] = None):
+    # Optional query params:
+    #   symbols=BTCUSDT,ETH-USD  only stream these symbols (default: all)
+    #   max_rate=2               max messages per second for this client
+    # Messages only contain prices that changed since the previous message.
+    # Subscriptions can be changed with {"op": "subscribe"|"unsubscribe", "symbols": [...]}
     await websocket.accept()
+    symbol_list = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else None
+    subscriber = price_broadcaster.subscribe(websocket, symbol_list, max_rate)
     try:
         while True:
-            binance = get_binance_prices()
-            coinbase = get_all_coinbase_prices()
-            merged = {**binance, **coinbase}
-            
-            if merged:
-                await websocket.send_json(merged)
-            await asyncio.sleep(0.5) # Update every 500ms
+            msg = await websocket.receive_json()
+            if not isinstance(msg, dict):
+                continue
+            op = msg.get("op")
+            requested = msg.get("symbols") or []
+            if not isinstance(requested, list):
+                continue
+            requested = [s for s in requested if isinstance(s, str)]
+            if op == "subscribe":
+                price_broadcaster.update_symbols(subscriber, add=requested)
+            elif op == "unsubscribe":
+                price_broadcaster.update_symbols(subscriber, remove=requested)
     except WebSocketDisconnect:
         pass
     except Exception as e:
         print(f"Price WebSocket error: {e}")
+        # Don't leave the client connected to a stream it is no longer part of
+        try:
+            await websocket.close()
+        except:
+            pass
+    finally:
+        price_broadcaster.unsubscribe(subscriber)
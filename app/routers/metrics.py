@@ -0,0 +1,55 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.config import settings
+from app.services.db_metrics import db_metrics
+from app.services.loop_monitor import loop_monitor
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+def require_metrics(x_metrics_token: Optional[str] = Header(default=None)):
+    """Disabled unless METRICS_ENABLED, and gated by METRICS_TOKEN when set."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        (x_metrics_token or "").encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
+
+@router.get("/db", dependencies=[Depends(require_metrics)])
+async def get_db_metrics():
+    """Statement timings per route / service, slow-query counts and pool usage."""
+    return db_metrics.snapshot()
+
+@router.get("/loop", dependencies=[Depends(require_metrics)])
+async def get_loop_metrics():
+    """Event loop lag and the recent stalls, with the stack that blocked the loop."""
+    return loop_monitor.snapshot()
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = 5.0,
+    interval_ms: float = 5.0,
+    x_profiler_token: Optional[str] = Header(default=None),
+):
+    """
+    Sampling profile of the event loop thread, in collapsed stack format
+    ("outer;...;inner count" per line) for flamegraph.pl or speedscope.
+    Disabled unless PROFILER_ENABLED, and gated by PROFILER_TOKEN when set.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.PROFILER_TOKEN and not secrets.compare_digest(
+        (x_profiler_token or "").encode(), settings.PROFILER_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid profiler token")
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {settings.PROFILE_MAX_SECONDS}")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if loop_monitor.profiling:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    folded = await loop_monitor.profile(seconds, interval_ms / 1000)
+    return "".join(f"{stack} {count}\n" for stack, count in folded.most_common())
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
-from app.models import Order, Account, OrderType, OrderStatus
+from app.models import Order, OrderArchive, Account, OrderType, OrderStatus
 from app.schemas import OrderCreate, OrderResponse, OrderUpdate
-from app.services.websocket_manager import manager
+from app.services.notifications import notifier
+from app.services.account_events import AccountDelta
+from app.services.order_archive import OPEN_STATUSES
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, SINCE_CURSOR_HEADER, NEXT, SINCE, encode_cursor, decode_cursor,
+)
 
 
 router = APIRouter(prefix="/orders", tags=["orders"])
@@ -37,7 +42,10 @@ async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(get_db)
     await db.refresh(new_order)
 
     # Notify
-    await manager.send_personal_message({"type": "ACCOUNT_UPDATE"}, order_in.account_id)
+    delta = AccountDelta(order_in.account_id)
+    delta.balance = account.balance
+    delta.orders.append(new_order)
+    await notifier.publish(delta.to_message(), order_in.account_id)
 
     # If Market Order, the matching engine will pick it up automatically
     # We do NOT execute it here to avoid race conditions and double execution
@@ -46,16 +54,84 @@ async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(get_db)
     return new_order
 
 @router.get("/", response_model=List[OrderResponse])
-async def list_orders(account_id: int, db: AsyncSession = Depends(get_db)):
-    stmt = select(Order).where(Order.account_id == account_id)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+async def list_orders(
+    account_id: int,
+    response: Response,
+    status: Optional[List[OrderStatus]] = Query(None),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Newest orders first, `limit` per page; pass X-Next-Cursor back as `cursor`
+    for the next page. Pollers pass X-Since-Cursor back as `since` to get only
+    orders created or updated after it, in change order.
+    """
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        cursor_key = decode_cursor(NEXT, cursor) if cursor else None
+        since_key = decode_cursor(SINCE, since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/{order_id}", response_model=OrderResponse)
-async def cancel_order(order_id: int, db: AsyncSession = Depends(get_db)):
+    # Open orders are never archived
+    models = [Order] if status and set(status) <= set(OPEN_STATUSES) else [Order, OrderArchive]
+
+    async def fetch(build, sort_key, reverse: bool):
+        # Same keyset query on the hot and archive tables, merged
+        rows = []
+        for model in models:
+            stmt = select(model).where(model.account_id == account_id)
+            if status:
+                stmt = stmt.where(model.status.in_(status))
+            rows.extend((await db.execute(build(model, stmt).limit(limit))).scalars().all())
+        return sorted(rows, key=sort_key, reverse=reverse)[:limit]
+
+    if since_key:
+        orders = await fetch(
+            lambda m, stmt: stmt.where(m.change_seq > since_key[1]).order_by(m.change_seq.asc()),
+            lambda o: o.change_seq, reverse=False,
+        )
+        response.headers[SINCE_CURSOR_HEADER] = encode_cursor(SINCE, orders[-1].change_seq) if orders else since
+        return orders
+
+    if not cursor_key:
+        # Read before the page: changes committed meanwhile are polled again, never missed
+        change_seq = await db.scalar(select(Account.change_seq).where(Account.id == account_id))
+        if change_seq is not None:
+            response.headers[SINCE_CURSOR_HEADER] = encode_cursor(SINCE, change_seq)
+
+    orders = await fetch(
+        lambda m, stmt: (stmt.where(m.id < cursor_key[1]) if cursor_key else stmt).order_by(m.id.desc()),
+        lambda o: o.id, reverse=True,
+    )
+    if len(orders) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(NEXT, orders[-1].id)
+    return orders
+
+async def get_live_order(db: AsyncSession, order_id: int) -> Order:
     order = await db.get(Order, order_id)
     if not order:
+        if await db.get(OrderArchive, order_id):
+            # Archived orders are always FILLED / CANCELED / REJECTED
+            raise HTTPException(status_code=400, detail="Order is closed")
         raise HTTPException(status_code=404, detail="Order not found")
+    # The matching engine may be filling this order right now: take the account
+    # lock first, as execute_trade does, then re-read the order under it so the
+    # status checked below is the one the write will commit against
+    await db.execute(select(Account.id).where(Account.id == order.account_id).with_for_update())
+    stmt = select(Order).where(Order.id == order_id).with_for_update().execution_options(populate_existing=True)
+    order = (await db.execute(stmt)).scalar_one_or_none()
+    if not order:
+        # Archived between the two reads, so it is no longer open
+        raise HTTPException(status_code=400, detail="Order is closed")
+    return order
+
+@router.delete("/{order_id}", response_model=OrderResponse)
+async def cancel_order(order_id: int, db: AsyncSession = Depends(get_db)):
+    order = await get_live_order(db, order_id)
     
     # Allow cancelling NEW and PARTIALLY_FILLED orders
     if order.status not in [OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED]:
@@ -66,15 +142,15 @@ async def cancel_order(order_id: int, db: AsyncSession = Depends(get_db)):
     await db.refresh(order)
     
     # Notify
-    await manager.send_personal_message({"type": "ACCOUNT_UPDATE"}, order.account_id)
+    delta = AccountDelta(order.account_id)
+    delta.orders.append(order)
+    await notifier.publish(delta.to_message(), order.account_id)
     
     return order
 
 @router.patch("/{order_id}", response_model=OrderResponse)
 async def update_order(order_id: int, order_update: OrderUpdate, db: AsyncSession = Depends(get_db)):
-    order = await db.get(Order, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    order = await get_live_order(db, order_id)
     
     # Allow updating NEW and PARTIALLY_FILLED orders
     if order.status not in [OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED]:
@@ -102,6 +178,8 @@ async def update_order(order_id: int, order_update: OrderUpdate, db: AsyncSessio
     await db.refresh(order)
     
     # Notify
-    await manager.send_personal_message({"type": "ACCOUNT_UPDATE"}, order.account_id)
+    delta = AccountDelta(order.account_id)
+    delta.orders.append(order)
+    await notifier.publish(delta.to_message(), order.account_id)
     
     return order
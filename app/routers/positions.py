@@ -5,7 +5,8 @@ from sqlalchemy import select
 from app.database import get_db
 from app.models import Position
 from app.schemas import PositionResponse, PositionUpdate
-from app.services.websocket_manager import manager
+from app.services.notifications import notifier
+from app.services.account_events import AccountDelta
 
 router = APIRouter(prefix="/positions", tags=["positions"])
 
@@ -39,6 +40,8 @@ async def update_position(position_id: int, position_in: PositionUpdate, db: Asy
     await db.refresh(position)
     
     # Notify
-    await manager.send_personal_message({"type": "ACCOUNT_UPDATE"}, position.account_id)
+    delta = AccountDelta(position.account_id)
+    delta.positions.append(position)
+    await notifier.publish(delta.to_message(), position.account_id)
     
     return position
@@ -35,6 +35,19 @@ class OrderResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TradeResponse(BaseModel):
+    id: int
+    order_id: int
+    symbol: str
+    side: OrderSide
+    price: float
+    quantity: float
+    commission: float
+    executed_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class EquityHistoryResponse(BaseModel):
     timestamp: datetime
     equity: float
@@ -107,6 +120,7 @@ class AccountStatistics(BaseModel):
     short_profit_factor: float
     reward_to_risk_ratio: float
     sharpe_ratio: float
+    sortino_ratio: float = 0.0
     cagr: float
     win_rate: float
     total_trades: int
@@ -134,10 +148,28 @@ class DrawingResponse(BaseModel):
     type: str
     data: dict
     created_at: datetime
+    revision: int
+    deleted: bool = False
 
     class Config:
         from_attributes = True
 
+class DrawingBatchItem(BaseModel):
+    id: Optional[int] = None # None creates a drawing (type required)
+    type: Optional[str] = None
+    data: dict
+
+class DrawingBatch(BaseModel):
+    account_id: int
+    symbol: str
+    upserts: List[DrawingBatchItem] = []
+    deletes: List[int] = []
+    base_revision: Optional[int] = None # If set, the batch is rejected (409) when drawings changed since
+
+class DrawingBatchResponse(BaseModel):
+    revision: int
+    drawings: List[DrawingResponse] # Upserted drawings, in request order
+
 class OrderUpdate(BaseModel):
     price: Optional[float] = None
     quantity: Optional[float] = None
@@ -0,0 +1,50 @@
+from app.models import Order, Trade, Position
+from app.schemas import OrderResponse, TradeResponse, PositionResponse
+from app.services.binance_ws import get_current_price
+
+
+class AccountDelta:
+    """
+    Collects the changes a single operation made to an account so they can be
+    pushed over the account WebSocket as one ACCOUNT_DELTA message, instead of
+    telling clients to refetch the account and every order.
+
+    ORM objects are collected as-is and only serialized in to_message(), i.e.
+    after the commit, so generated ids and timestamps are available.
+    """
+
+    def __init__(self, account_id: int):
+        self.account_id = account_id
+        self.balance: float | None = None
+        self.orders: list[Order] = []
+        self.fills: list[Trade] = []
+        self.positions: list[Position] = []
+        self.closed_positions: list[Position] = []
+
+    def to_message(self) -> dict:
+        return {
+            "type": "ACCOUNT_DELTA",
+            "account_id": self.account_id,
+            "balance": self.balance,
+            "orders": [serialize_order(o) for o in self.orders],
+            "fills": [serialize_trade(t) for t in self.fills],
+            "positions": [serialize_position(p) for p in self.positions],
+            "closed_positions": [p.id for p in self.closed_positions],
+        }
+
+
+def serialize_order(order: Order) -> dict:
+    return OrderResponse.model_validate(order).model_dump(mode="json")
+
+
+def serialize_trade(trade: Trade) -> dict:
+    return TradeResponse.model_validate(trade).model_dump(mode="json")
+
+
+def serialize_position(position: Position) -> dict:
+    data = PositionResponse.model_validate(position).model_dump(mode="json")
+    current_price = get_current_price(position.symbol)
+    if current_price:
+        # Same formula as calculate_account_metrics: quantity is negative for shorts
+        data["unrealized_pnl"] = (current_price - position.entry_price) * position.quantity
+    return data
@@ -0,0 +1,393 @@
+import logging
+import math
+from datetime import datetime, date, timedelta, timezone
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import primary_session, dialect_insert
+from app.models import Account, AccountStats, AccountStatsDaily, PositionHistory
+from app.schemas import AccountStatistics
+from app.services.equity_rollup import load_equity_replay
+
+logger = logging.getLogger(__name__)
+
+SIDES = ("ALL", "LONG", "SHORT")
+
+# Initial values of StatsAggregateMixin columns. Column defaults only apply at
+# INSERT, but rows are updated in Python before their first flush.
+AGGREGATE_DEFAULTS = {
+    "trade_count": 0, "win_count": 0, "loss_count": 0,
+    "gross_profit": 0.0, "gross_loss": 0.0, "r_sum": 0.0, "r_count": 0,
+    "win_prefix": 0, "win_suffix": 0, "win_max": 0,
+    "loss_prefix": 0, "loss_suffix": 0, "loss_max": 0,
+    "equity_count": 0, "equity_first": None, "equity_first_at": None,
+    "equity_last": None, "equity_last_at": None, "equity_peak": None, "equity_trough": None,
+    "max_drawdown": 0.0, "max_drawdown_pct": 0.0,
+    "return_count": 0, "return_sum": 0.0, "return_sq_sum": 0.0, "return_downside_sq_sum": 0.0,
+}
+
+
+def utc_day(timestamp: datetime) -> date:
+    # Naive timestamps (e.g. from SQLite) are already UTC
+    if timestamp.tzinfo is None:
+        return timestamp.date()
+    return timestamp.astimezone(timezone.utc).date()
+
+
+def new_aggregate(model, **keys):
+    row = model(**keys)
+    for name, value in AGGREGATE_DEFAULTS.items():
+        setattr(row, name, value)
+    return row
+
+
+def trade_net_pnl(history: PositionHistory) -> float:
+    return history.realized_pnl - history.total_fee
+
+
+def trade_r_multiple(history: PositionHistory) -> float | None:
+    # R = Net PNL / Initial Risk, Initial Risk = abs(Entry - Initial SL) * Quantity
+    if history.initial_stop_loss_price:
+        risk_per_unit = abs(history.entry_price - history.initial_stop_loss_price)
+        total_risk = risk_per_unit * history.quantity
+        if total_risk > 0:
+            return trade_net_pnl(history) / total_risk
+    return None
+
+
+# --- Aggregate updates ---
+
+def _extend_run(row, kind: str, hit: bool, count_before: int):
+    prefix = getattr(row, f"{kind}_prefix")
+    suffix = getattr(row, f"{kind}_suffix")
+    if hit:
+        if prefix == count_before: # Every trade so far was a hit
+            setattr(row, f"{kind}_prefix", prefix + 1)
+        suffix += 1
+        setattr(row, f"{kind}_suffix", suffix)
+        setattr(row, f"{kind}_max", max(getattr(row, f"{kind}_max"), suffix))
+    else:
+        setattr(row, f"{kind}_suffix", 0)
+
+
+def apply_trade(row, net_pnl: float, r_multiple: float | None):
+    count_before = row.trade_count
+    row.trade_count += 1
+
+    if net_pnl > 0:
+        row.win_count += 1
+        row.gross_profit += net_pnl
+    else:
+        row.loss_count += 1
+        row.gross_loss -= net_pnl
+
+    if r_multiple is not None:
+        row.r_sum += r_multiple
+        row.r_count += 1
+
+    # Break even resets both streaks
+    _extend_run(row, "win", net_pnl > 0, count_before)
+    _extend_run(row, "loss", net_pnl < 0, count_before)
+
+
+def apply_equity(row, equity: float, timestamp: datetime):
+    if row.equity_count == 0:
+        row.equity_first = equity
+        row.equity_first_at = timestamp
+        row.equity_peak = equity
+        row.equity_trough = equity
+
+    row.equity_count += 1
+    row.equity_last = equity
+    row.equity_last_at = timestamp
+    row.equity_peak = max(row.equity_peak, equity)
+    row.equity_trough = min(row.equity_trough, equity)
+
+    drawdown = row.equity_peak - equity
+    row.max_drawdown = max(row.max_drawdown, drawdown)
+    if row.equity_peak > 0:
+        row.max_drawdown_pct = max(row.max_drawdown_pct, drawdown / row.equity_peak)
+
+
+def _update_daily_return(day_row: AccountStatsDaily, total_row: AccountStats):
+    old = day_row.daily_return
+    new = None
+    if day_row.prev_close and day_row.prev_close > 0:
+        new = day_row.equity_last / day_row.prev_close - 1
+
+    for row in (day_row, total_row):
+        if old is not None:
+            row.return_count -= 1
+            row.return_sum -= old
+            row.return_sq_sum -= old * old
+            row.return_downside_sq_sum -= min(old, 0.0) ** 2
+        if new is not None:
+            row.return_count += 1
+            row.return_sum += new
+            row.return_sq_sum += new * new
+            row.return_downside_sq_sum += min(new, 0.0) ** 2
+    day_row.daily_return = new
+
+
+def merge_into(acc, row):
+    """Append bucket `row` (later in time) to aggregate `acc`."""
+    for kind in ("win", "loss"):
+        a_prefix, a_suffix, a_max = (getattr(acc, f"{kind}_{f}") for f in ("prefix", "suffix", "max"))
+        b_prefix, b_suffix, b_max = (getattr(row, f"{kind}_{f}") for f in ("prefix", "suffix", "max"))
+        setattr(acc, f"{kind}_prefix", a_prefix if a_prefix < acc.trade_count else acc.trade_count + b_prefix)
+        setattr(acc, f"{kind}_suffix", b_suffix if b_suffix < row.trade_count else row.trade_count + a_suffix)
+        setattr(acc, f"{kind}_max", max(a_max, b_max, a_suffix + b_prefix))
+
+    for name in ("trade_count", "win_count", "loss_count", "gross_profit", "gross_loss", "r_sum", "r_count",
+                 "return_count", "return_sum", "return_sq_sum", "return_downside_sq_sum"):
+        setattr(acc, name, getattr(acc, name) + getattr(row, name))
+
+    if row.equity_count:
+        if acc.equity_count == 0:
+            acc.equity_first = row.equity_first
+            acc.equity_first_at = row.equity_first_at
+            acc.equity_peak = row.equity_peak
+            acc.equity_trough = row.equity_trough
+            acc.max_drawdown = row.max_drawdown
+            acc.max_drawdown_pct = row.max_drawdown_pct
+        else:
+            # Drawdown from the earlier peak into this bucket's trough
+            cross = acc.equity_peak - row.equity_trough
+            cross_pct = cross / acc.equity_peak if acc.equity_peak > 0 else 0.0
+            acc.max_drawdown = max(acc.max_drawdown, row.max_drawdown, cross)
+            acc.max_drawdown_pct = max(acc.max_drawdown_pct, row.max_drawdown_pct, cross_pct)
+            acc.equity_peak = max(acc.equity_peak, row.equity_peak)
+            acc.equity_trough = min(acc.equity_trough, row.equity_trough)
+        acc.equity_count += row.equity_count
+        acc.equity_last = row.equity_last
+        acc.equity_last_at = row.equity_last_at
+
+
+class StatsAccumulator:
+    """Total and daily aggregate rows of one account, updated together."""
+
+    def __init__(self, account_id: int, totals: dict[str, AccountStats], days: dict[tuple[str, date], AccountStatsDaily], session: AsyncSession = None):
+        self.account_id = account_id
+        self.totals = totals
+        self.days = days
+        self.session = session
+
+    def _day_row(self, side: str, day: date) -> AccountStatsDaily:
+        row = self.days.get((side, day))
+        if row is None:
+            row = new_aggregate(AccountStatsDaily, account_id=self.account_id, side=side, day=day)
+            row.prev_close = self.totals["ALL"].equity_last if side == "ALL" else None
+            row.daily_return = None
+            self.days[(side, day)] = row
+            if self.session is not None:
+                self.session.add(row)
+        return row
+
+    def add_trade(self, side: str, net_pnl: float, r_multiple: float | None, closed_at: datetime):
+        day = utc_day(closed_at)
+        for s in ("ALL", side):
+            apply_trade(self.totals[s], net_pnl, r_multiple)
+            apply_trade(self._day_row(s, day), net_pnl, r_multiple)
+
+    def add_equity(self, equity: float, timestamp: datetime):
+        total = self.totals["ALL"]
+        day_row = self._day_row("ALL", utc_day(timestamp))
+        apply_equity(total, equity, timestamp)
+        apply_equity(day_row, equity, timestamp)
+        _update_daily_return(day_row, total)
+
+
+# --- Persistence ---
+
+async def _load_day_rows(session: AsyncSession, totals: dict[int, AccountStats], sides, day: date) -> dict[tuple[int, str], AccountStatsDaily]:
+    """
+    Daily rows of `sides` on `day` for the accounts in `totals` (their ALL
+    rows), created if missing. The matching engine (under the account lock)
+    and the equity recorder (without it) both create an account's row for a
+    new day, so it is inserted with ON CONFLICT DO NOTHING and read back.
+    """
+    def select_rows(account_ids):
+        return select(AccountStatsDaily).where(
+            AccountStatsDaily.account_id.in_(account_ids),
+            AccountStatsDaily.side.in_(sides),
+            AccountStatsDaily.day == day,
+        )
+
+    result = await session.execute(select_rows(list(totals)))
+    rows = {(row.account_id, row.side): row for row in result.scalars().all()}
+    missing = [
+        {**AGGREGATE_DEFAULTS, "account_id": account_id, "side": side, "day": day, "daily_return": None,
+         "prev_close": total.equity_last if side == "ALL" else None}
+        for account_id, total in totals.items() for side in sides if (account_id, side) not in rows
+    ]
+    if missing:
+        insert = dialect_insert(session)
+        await session.execute(
+            insert(AccountStatsDaily).values(missing).on_conflict_do_nothing(index_elements=["account_id", "side", "day"])
+        )
+        result = await session.execute(select_rows(list({row["account_id"] for row in missing})))
+        rows.update({(row.account_id, row.side): row for row in result.scalars().all()})
+    return rows
+
+
+async def _load_accumulator(session: AsyncSession, account_id: int, sides, day: date) -> StatsAccumulator | None:
+    stmt = select(AccountStats).where(AccountStats.account_id == account_id, AccountStats.side.in_(SIDES))
+    result = await session.execute(stmt)
+    totals = {row.side: row for row in result.scalars().all()}
+    if "ALL" not in totals:
+        # Not initialized yet; the first statistics read rebuilds from history
+        return None
+
+    day_rows = await _load_day_rows(session, {account_id: totals["ALL"]}, sides, day)
+    days = {(side, day): row for (_, side), row in day_rows.items()}
+    return StatsAccumulator(account_id, totals, days, session)
+
+
+async def record_closed_position(session: AsyncSession, history: PositionHistory, closed_at: datetime = None):
+    """Fold a new PositionHistory row into the account's aggregates (same transaction)."""
+    closed_at = closed_at or datetime.now(timezone.utc)
+    acc = await _load_accumulator(session, history.account_id, ("ALL", history.side), utc_day(closed_at))
+    if acc is None:
+        return
+    acc.add_trade(history.side, trade_net_pnl(history), trade_r_multiple(history), closed_at)
+
+
+async def record_equity_points(session: AsyncSession, points: list[tuple[int, float]], timestamp: datetime):
+    """Fold one equity point per account, all taken at `timestamp`, into the aggregates."""
+    if not points:
+        return
+    account_ids = [account_id for account_id, _ in points]
+    day = utc_day(timestamp)
+
+    stmt = select(AccountStats).where(AccountStats.account_id.in_(account_ids), AccountStats.side == "ALL")
+    result = await session.execute(stmt)
+    totals = {row.account_id: row for row in result.scalars().all()}
+
+    days = await _load_day_rows(session, totals, ("ALL",), day) if totals else {}
+
+    for account_id, equity in points:
+        total = totals.get(account_id)
+        if total is None:
+            continue
+        acc = StatsAccumulator(account_id, {"ALL": total}, {("ALL", day): days[(account_id, "ALL")]}, session)
+        acc.add_equity(equity, timestamp)
+
+
+async def rebuild_account_stats(session: AsyncSession, account_id: int):
+    """Recompute all aggregates of an account from its full history."""
+    # Same lock the matching engine takes before writing PositionHistory, so no
+    # trade can close between reading history and storing the aggregates
+    stmt = select(Account).where(Account.id == account_id).with_for_update()
+    await session.execute(stmt)
+
+    await session.execute(delete(AccountStatsDaily).where(AccountStatsDaily.account_id == account_id))
+    await session.execute(delete(AccountStats).where(AccountStats.account_id == account_id))
+
+    totals = {side: new_aggregate(AccountStats, account_id=account_id, side=side) for side in SIDES}
+    acc = StatsAccumulator(account_id, totals, {})
+
+    stmt = select(PositionHistory).where(PositionHistory.account_id == account_id).order_by(PositionHistory.closed_at.asc())
+    for history in (await session.execute(stmt)).scalars():
+        acc.add_trade(history.side, trade_net_pnl(history), trade_r_multiple(history), history.closed_at)
+
+    # Raw points past retention survive only as hourly / daily closes
+    for equity, timestamp in await load_equity_replay(session, account_id):
+        acc.add_equity(equity, timestamp)
+
+    session.add_all(list(totals.values()) + list(acc.days.values()))
+    await session.commit()
+    logger.info(f"Rebuilt statistics aggregates for Account {account_id}")
+
+
+# --- Reads ---
+
+def statistics_from_aggregates(totals: dict) -> AccountStatistics:
+    all_row, long_row, short_row = totals["ALL"], totals["LONG"], totals["SHORT"]
+
+    def profit_factor(row):
+        # Avoid infinite value for JSON serialization
+        return row.gross_profit / row.gross_loss if row.gross_loss > 0 else 0.0
+
+    total_trades = all_row.trade_count
+    win_rate = all_row.win_count / total_trades if total_trades > 0 else 0.0
+    avg_win = all_row.gross_profit / all_row.win_count if all_row.win_count else 0.0
+    avg_loss = -all_row.gross_loss / all_row.loss_count if all_row.loss_count else 0.0
+    expectancy = (win_rate * avg_win) + ((1.0 - win_rate) * avg_loss)
+
+    if all_row.r_count:
+        reward_to_risk_ratio = all_row.r_sum / all_row.r_count
+    elif abs(avg_loss) > 0:
+        # Fallback to Avg Win / Avg Loss if no SL data
+        reward_to_risk_ratio = avg_win / abs(avg_loss)
+    else:
+        reward_to_risk_ratio = 0.0
+
+    # Sharpe / Sortino on daily close-to-close returns, annualized with 365 trading days
+    # (same definitions as app.services.analytics)
+    sharpe_ratio = 0.0
+    sortino_ratio = 0.0
+    n = all_row.return_count
+    if n > 1:
+        mean_ret = all_row.return_sum / n
+        variance = (all_row.return_sq_sum - n * mean_ret * mean_ret) / (n - 1)
+        stdev_ret = math.sqrt(variance) if variance > 0 else 0.0
+        if stdev_ret > 0:
+            sharpe_ratio = (mean_ret / stdev_ret) * math.sqrt(365)
+        downside_dev = math.sqrt(max(all_row.return_downside_sq_sum, 0.0) / n)
+        if downside_dev > 0:
+            sortino_ratio = (mean_ret / downside_dev) * math.sqrt(365)
+
+    cagr = 0.0
+    if all_row.equity_count:
+        days = (all_row.equity_last_at - all_row.equity_first_at).days
+        if days > 0 and all_row.equity_first > 0 and all_row.equity_last >= 0:
+            try:
+                cagr = (all_row.equity_last / all_row.equity_first) ** (365.0 / days) - 1
+            except OverflowError:
+                cagr = 0.0
+
+    return AccountStatistics(
+        max_drawdown=all_row.max_drawdown,
+        max_drawdown_pct=all_row.max_drawdown_pct,
+        expectancy=expectancy,
+        profit_factor=profit_factor(all_row),
+        long_profit_factor=profit_factor(long_row),
+        short_profit_factor=profit_factor(short_row),
+        reward_to_risk_ratio=reward_to_risk_ratio,
+        sharpe_ratio=sharpe_ratio,
+        sortino_ratio=sortino_ratio,
+        cagr=cagr,
+        win_rate=win_rate,
+        total_trades=total_trades,
+        average_win=avg_win,
+        average_loss=avg_loss,
+        max_win_streak=all_row.win_max,
+        max_loss_streak=all_row.loss_max
+    )
+
+
+async def read_account_statistics(session: AsyncSession, account_id: int, days: float = None) -> AccountStatistics | None:
+    account = await session.get(Account, account_id)
+    if not account:
+        return None
+
+    stmt = select(AccountStats).where(AccountStats.account_id == account_id)
+    totals = {row.side: row for row in (await session.execute(stmt)).scalars().all()}
+    if set(totals) != set(SIDES):
+        # Rebuilding writes, so it (and the rest of this read) runs on the primary
+        async with primary_session(session) as primary:
+            await rebuild_account_stats(primary, account_id)
+            return await read_account_statistics(primary, account_id, days)
+
+    if days:
+        # Rolling window: merge the daily buckets that overlap it
+        start_day = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+        stmt = select(AccountStatsDaily).where(
+            AccountStatsDaily.account_id == account_id,
+            AccountStatsDaily.day >= start_day,
+        ).order_by(AccountStatsDaily.day.asc())
+        windowed = {side: new_aggregate(AccountStats, account_id=account_id, side=side) for side in SIDES}
+        for row in (await session.execute(stmt)).scalars().all():
+            merge_into(windowed[row.side], row)
+        totals = windowed
+
+    return statistics_from_aggregates(totals)
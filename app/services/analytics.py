@@ -0,0 +1,191 @@
+import math
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Account, PositionHistory
+from app.schemas import AccountStatistics
+from app.services.equity_rollup import equity_points, load_equity_replay, pick_resolution
+
+SECONDS_PER_DAY = 86400
+TRADING_DAYS_PER_YEAR = 365 # Crypto trades every day
+# Equity resolution for a window is the coarsest one giving at least this many points
+MIN_EQUITY_POINTS = 1000
+
+
+class TradeArrays:
+    """Closed positions as columns, ordered by closed_at."""
+
+    def __init__(self, net_pnl: np.ndarray, is_long: np.ndarray, r_multiple: np.ndarray):
+        self.net_pnl = net_pnl
+        self.is_long = is_long
+        # NaN where the trade had no usable initial stop loss
+        self.r_multiple = r_multiple
+
+
+class EquityArrays:
+    """Equity points as columns, ordered by time (epoch seconds)."""
+
+    def __init__(self, timestamps: np.ndarray, equity: np.ndarray):
+        self.timestamps = timestamps
+        self.equity = equity
+
+
+async def load_trade_arrays(session: AsyncSession, account_id: int, start_date: datetime = None) -> TradeArrays:
+    stmt = select(
+        PositionHistory.realized_pnl - PositionHistory.total_fee,
+        PositionHistory.side,
+        PositionHistory.entry_price,
+        PositionHistory.initial_stop_loss_price,
+        PositionHistory.quantity,
+    ).where(PositionHistory.account_id == account_id)
+    if start_date:
+        stmt = stmt.where(PositionHistory.closed_at >= start_date)
+    stmt = stmt.order_by(PositionHistory.closed_at.asc())
+    rows = (await session.execute(stmt)).all()
+
+    if not rows:
+        empty = np.empty(0)
+        return TradeArrays(empty, np.empty(0, dtype=bool), empty)
+
+    net_pnl, side, entry, initial_sl, quantity = zip(*rows)
+    net_pnl = np.asarray(net_pnl, dtype=np.float64)
+    entry = np.asarray(entry, dtype=np.float64)
+    initial_sl = np.asarray(initial_sl, dtype=np.float64) # None -> NaN
+    quantity = np.asarray(quantity, dtype=np.float64)
+
+    # R = Net PNL / Initial Risk, Initial Risk = abs(Entry - Initial SL) * Quantity
+    risk = np.abs(entry - initial_sl) * quantity
+    has_risk = (initial_sl != 0) & (risk > 0) # NaN compares False
+    r_multiple = np.full(net_pnl.shape, np.nan)
+    np.divide(net_pnl, risk, out=r_multiple, where=has_risk)
+
+    return TradeArrays(net_pnl, np.asarray(side) == "LONG", r_multiple)
+
+
+async def load_equity_arrays(session: AsyncSession, account_id: int, start_date: datetime = None) -> EquityArrays:
+    if start_date is None:
+        # All-time: finest data still retained for each period
+        replay = await load_equity_replay(session, account_id)
+        rows = [(timestamp.timestamp(), equity) for equity, timestamp in replay]
+    else:
+        resolution = pick_resolution(start_date, MIN_EQUITY_POINTS)
+        pts = equity_points(account_id, start_date, resolution).subquery()
+        stmt = select(pts.c.t, pts.c.equity).order_by(pts.c.timestamp.asc())
+        rows = (await session.execute(stmt)).all()
+
+    count = len(rows)
+    timestamps = np.fromiter((r[0] for r in rows), dtype=np.float64, count=count)
+    equity = np.fromiter((r[1] for r in rows), dtype=np.float64, count=count)
+    return EquityArrays(timestamps, equity)
+
+
+def max_run_length(mask: np.ndarray) -> int:
+    if not mask.any():
+        return 0
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[0::2]).max())
+
+
+def profit_factor(net_pnl: np.ndarray) -> float:
+    gross_profit = net_pnl[net_pnl > 0].sum()
+    gross_loss = abs(net_pnl[net_pnl <= 0].sum())
+    # Avoid infinite value for JSON serialization
+    return float(gross_profit / gross_loss) if gross_loss > 0 else 0.0
+
+
+def daily_returns(equity: EquityArrays) -> np.ndarray:
+    """Close-to-close returns of the last equity point of each UTC day."""
+    if equity.equity.size < 2:
+        return np.empty(0)
+    days = np.floor(equity.timestamps / SECONDS_PER_DAY).astype(np.int64)
+    day_ends = np.append(np.flatnonzero(np.diff(days)), days.size - 1)
+    closes = equity.equity[day_ends]
+    prev, curr = closes[:-1], closes[1:]
+    valid = prev > 0
+    return curr[valid] / prev[valid] - 1
+
+
+def compute_statistics(trades: TradeArrays, equity: EquityArrays, balance: float) -> AccountStatistics:
+    net_pnl = trades.net_pnl
+    total_trades = int(net_pnl.size)
+
+    wins = net_pnl[net_pnl > 0]
+    losses = net_pnl[net_pnl <= 0]
+    win_rate = wins.size / total_trades if total_trades > 0 else 0.0
+    avg_win = float(wins.mean()) if wins.size else 0.0
+    avg_loss = float(losses.mean()) if losses.size else 0.0
+
+    # Expectancy = (Win Rate * Avg Win) + (Loss Rate * Avg Loss)  <-- Avg Loss is negative
+    expectancy = (win_rate * avg_win) + ((1.0 - win_rate) * avg_loss)
+
+    r_multiples = trades.r_multiple[~np.isnan(trades.r_multiple)]
+    if r_multiples.size:
+        reward_to_risk_ratio = float(r_multiples.mean())
+    elif abs(avg_loss) > 0:
+        # Fallback to Avg Win / Avg Loss if no SL data
+        reward_to_risk_ratio = avg_win / abs(avg_loss)
+    else:
+        reward_to_risk_ratio = 0.0
+
+    # Drawdown against the running peak
+    values = equity.equity if equity.equity.size else np.array([balance], dtype=np.float64)
+    peaks = np.maximum.accumulate(values)
+    drawdowns = peaks - values
+    drawdown_pcts = np.divide(drawdowns, peaks, out=np.zeros_like(drawdowns), where=peaks > 0)
+
+    # Sharpe / Sortino on daily-resampled returns
+    returns = daily_returns(equity)
+    sharpe_ratio = 0.0
+    sortino_ratio = 0.0
+    if returns.size > 1:
+        mean_ret = returns.mean()
+        stdev_ret = returns.std(ddof=1)
+        if stdev_ret > 0:
+            sharpe_ratio = float(mean_ret / stdev_ret * math.sqrt(TRADING_DAYS_PER_YEAR))
+        downside_dev = math.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+        if downside_dev > 0:
+            sortino_ratio = float(mean_ret / downside_dev * math.sqrt(TRADING_DAYS_PER_YEAR))
+
+    cagr = 0.0
+    if equity.equity.size:
+        days = int((equity.timestamps[-1] - equity.timestamps[0]) // SECONDS_PER_DAY)
+        # Python floats: NumPy scalars return inf on overflow instead of raising
+        start_val, end_val = float(equity.equity[0]), float(equity.equity[-1])
+        if days > 0 and start_val > 0 and end_val >= 0:
+            try:
+                cagr = (end_val / start_val) ** (TRADING_DAYS_PER_YEAR / days) - 1
+            except OverflowError:
+                cagr = 0.0
+            if not math.isfinite(cagr):
+                cagr = 0.0
+
+    return AccountStatistics(
+        max_drawdown=float(drawdowns.max()),
+        max_drawdown_pct=float(drawdown_pcts.max()),
+        expectancy=expectancy,
+        profit_factor=profit_factor(net_pnl),
+        long_profit_factor=profit_factor(net_pnl[trades.is_long]),
+        short_profit_factor=profit_factor(net_pnl[~trades.is_long]),
+        reward_to_risk_ratio=reward_to_risk_ratio,
+        sharpe_ratio=sharpe_ratio,
+        sortino_ratio=sortino_ratio,
+        cagr=cagr,
+        win_rate=win_rate,
+        total_trades=total_trades,
+        average_win=avg_win,
+        average_loss=avg_loss,
+        # Break even (net PNL == 0) breaks both streaks
+        max_win_streak=max_run_length(net_pnl > 0),
+        max_loss_streak=max_run_length(net_pnl < 0)
+    )
+
+
+async def compute_account_statistics(session: AsyncSession, account_id: int, start_date: datetime = None) -> AccountStatistics | None:
+    account = await session.get(Account, account_id)
+    if not account:
+        return None
+    trades = await load_trade_arrays(session, account_id, start_date)
+    equity = await load_equity_arrays(session, account_id, start_date)
+    return compute_statistics(trades, equity, account.balance)
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import logging
+import aiohttp
 import websockets
 from app.config import settings
 
@@ -40,6 +41,27 @@ class BinanceWS:
     def stop(self):
         self.running = False
 
+    async def seed_prices(self, session: aiohttp.ClientSession) -> int:
+        """Fill price_cache from one REST snapshot. Prices already streamed are kept."""
+        async with session.get(f"{settings.BINANCE_API_URL}/fapi/v1/ticker/price") as response:
+            response.raise_for_status()
+            tickers = await response.json()
+
+        tracked = {s.upper() for s in self.symbols}
+        seeded = 0
+        for ticker in tickers:
+            symbol = ticker.get("symbol")
+            if symbol not in tracked or symbol in price_cache:
+                continue
+            try:
+                price = float(ticker["price"])
+            except (KeyError, ValueError, TypeError):
+                continue
+            if price > 0:
+                price_cache[symbol] = price
+                seeded += 1
+        return seeded
+
     def _process_message(self, data):
         # Payload example for trade stream:
         # {
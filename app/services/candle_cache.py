@@ -0,0 +1,285 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+import numpy as np
+from app.services.fvg import FVGTracker
+from app.services.indicators import Indicator
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800, "12h": 43200,
+    "1d": 86400, "3d": 259200, "1w": 604800, "1M": 2678400, # 1M: longest month
+}
+
+
+def _public(outputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    return {name: values for name, values in outputs.items() if not name.startswith("_")}
+
+
+def _to_json(values: np.ndarray) -> list:
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _last(outputs: dict[str, np.ndarray]) -> dict[str, float] | None:
+    """Outputs of the newest candle, if the indicator is warmed up there."""
+    last = {name: float(values[-1]) for name, values in outputs.items() if len(values)}
+    return last if len(last) == len(outputs) and all(map(math.isfinite, last.values())) else None
+
+
+class IndicatorValues:
+    """Outputs of one indicator for the first `count` candles of a series version."""
+
+    __slots__ = ("version", "count", "outputs")
+
+    def __init__(self, version: int, outputs: dict[str, np.ndarray]):
+        self.version = version
+        self.count = len(next(iter(outputs.values())))
+        self.outputs = outputs
+
+
+
+class CandleSeries:
+    """
+    Closed candles (open_time_ms, open, high, low, close, volume) of one
+    exchange / symbol / interval, oldest first, plus what is derived from
+    them incrementally. Closed candles never change, so merging is
+    idempotent: every viewer of the same chart feeds the same series.
+    """
+
+    def __init__(self, interval: str):
+        self.step = INTERVAL_SECONDS.get(interval, 3600) * 1000
+        self.candles: list[tuple] = []
+        self.fvg = FVGTracker()
+        # Bumped whenever candles are replaced rather than appended
+        self.version = 0
+        self._bars = np.empty((0, 6))
+        self._bars_version = 0
+        self.indicators: OrderedDict[str, IndicatorValues] = OrderedDict()
+
+    def follows(self, open_time: int) -> bool:
+        """Whether the candle opening at open_time directly follows the cached ones."""
+        # At most one step apart: the gap between month starts varies (1M)
+        return bool(self.candles) and 0 < open_time - self.candles[-1][0] <= self.step
+
+    def merge(self, batch: list[tuple]):
+        """
+        Add a REST page of closed candles (ascending by open time), which is
+        complete as far as the exchange goes (Coinbase omits intervals
+        without trades). Candles are only added next to the cached ones, so
+        FVGs and indicators never see non-adjacent candles as consecutive: a
+        page newer than the cache that does not reach it replaces it, one
+        older than the cache that does not reach it is left out.
+        """
+        if not batch:
+            return
+        limit = settings.CANDLE_CACHE_MAX_CANDLES
+        if not self.candles or batch[0][0] - self.candles[-1][0] > self.step:
+            self.candles = list(batch[-limit:])
+            self._replaced()
+            return
+
+        first, last = self.candles[0][0], self.candles[-1][0]
+        for candle in batch:
+            if candle[0] > last:
+                self._append(candle)
+
+        older = [c for c in batch if c[0] < first]
+        if older and first - batch[-1][0] <= self.step and len(older) + len(self.candles) <= limit:
+            # Gaps near the old edge change, and so may fills: recompute
+            self.candles = older + self.candles
+            self._replaced()
+        self._trim()
+
+    def append(self, candle: tuple) -> bool:
+        """
+        Add one candle closed on a stream. False when it does not follow the
+        cached ones (candles were missed, e.g. while nobody watched the
+        chart): the caller backfills from REST instead.
+        """
+        if self.candles and candle[0] <= self.candles[-1][0]:
+            return True # Already cached
+        if not self.follows(candle[0]):
+            return False
+        self._append(candle)
+        self._trim()
+        return True
+
+    def _append(self, candle: tuple):
+        self.candles.append(candle)
+        self.fvg.append(self.candles, len(self.candles) - 1)
+
+    def _trim(self):
+        limit = settings.CANDLE_CACHE_MAX_CANDLES
+        if len(self.candles) > limit * 1.1:
+            # Trim the oldest in chunks so rebuilds stay rare
+            self.candles = self.candles[-limit:]
+            self._replaced()
+
+    def _replaced(self):
+        self.version += 1
+        self.fvg.rebuild(self.candles)
+
+    def bars(self) -> np.ndarray:
+        """The candles as an (n, 6) array, extended in place of rebuilt when candles were only appended."""
+        if self._bars_version != self.version or len(self._bars) > len(self.candles):
+            self._bars = np.array(self.candles, dtype=np.float64).reshape(-1, 6)
+            self._bars_version = self.version
+        elif len(self._bars) < len(self.candles):
+            new = np.array(self.candles[len(self._bars):], dtype=np.float64)
+            self._bars = np.concatenate((self._bars, new))
+        return self._bars
+
+    def indicator(self, indicator: Indicator) -> dict[str, np.ndarray]:
+        """
+        Outputs of `indicator` for every cached candle. Computed over the
+        whole series once, then only for the candles closed since.
+        """
+        bars = self.bars()
+        cached = self.indicators.get(indicator.key)
+        if cached is not None and cached.version == self.version and cached.count < len(bars):
+            prev = _last(cached.outputs)
+            if prev is None:
+                cached = None # Still warming up: recompute from scratch
+            else:
+                new = indicator.compute(bars[cached.count - indicator.lookback:], prev)
+                cached.outputs = {name: np.concatenate((cached.outputs[name], new[name])) for name in cached.outputs}
+                cached.count = len(bars)
+        if cached is None or cached.version != self.version:
+            if len(bars):
+                outputs = indicator.compute(bars)
+            else:
+                outputs = {name: np.empty(0) for name in indicator.outputs}
+            cached = IndicatorValues(self.version, outputs)
+
+        self.indicators[indicator.key] = cached
+        self.indicators.move_to_end(indicator.key)
+        if len(self.indicators) > settings.CANDLE_CACHE_MAX_INDICATORS:
+            self.indicators.popitem(last=False)
+        return cached.outputs
+
+    def indicator_at(self, indicator: Indicator, candle: tuple) -> dict[str, float | None]:
+        """
+        Outputs of `indicator` at `candle`: a cached one, or the forming one
+        right after them (None when candles are missing in between).
+        """
+        outputs = self.indicator(indicator)
+        bars = self.bars()
+        index = int(np.searchsorted(bars[:, 0], candle[0])) if len(bars) else 0
+        if index < len(bars) and bars[index, 0] == candle[0]:
+            values = {name: float(out[index]) for name, out in outputs.items()}
+        else:
+            # Only right after the cached candles: across missing ones the
+            # recurrence would treat the last cached candle as the previous one
+            prev = _last(outputs) if index == len(bars) and self.follows(candle[0]) else None
+            if prev is None:
+                values = {name: math.nan for name in outputs}
+            else:
+                tail = np.vstack((bars[len(bars) - indicator.lookback:], np.asarray(candle, dtype=np.float64)))
+                values = {name: float(out[0]) for name, out in indicator.compute(tail, prev).items()}
+        return {name: None if math.isnan(v) else v for name, v in values.items() if not name.startswith("_")}
+
+    def covers(self, start: int) -> bool:
+        return bool(self.candles) and self.candles[0][0] <= start
+
+
+class CandleCache:
+    """Least recently used CandleSeries per (exchange, symbol, interval)."""
+
+    def __init__(self):
+        self._series: OrderedDict[tuple, CandleSeries] = OrderedDict()
+
+    def series(self, exchange: str, symbol: str, interval: str) -> CandleSeries:
+        key = (exchange.upper(), symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = CandleSeries(interval)
+            if len(self._series) > settings.CANDLE_CACHE_MAX_SERIES:
+                self._series.popitem(last=False)
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    def get(self, exchange: str, symbol: str, interval: str) -> CandleSeries | None:
+        return self._series.get((exchange.upper(), symbol, interval))
+
+    def merge_klines(self, exchange: str, symbol: str, interval: str, rows: list) -> tuple[CandleSeries, list[tuple]]:
+        """
+        Feed REST klines: Binance rows [open_time, "o", "h", "l", "c", "v", close_time, ...]
+        or our Coinbase rows [open_time, o, h, l, c, v]. The still-forming candle is
+        skipped. Returns the series and the closed candles of `rows`.
+        """
+        series = self.series(exchange, symbol, interval)
+        now_ms = time.time() * 1000
+        closed = []
+        for row in rows:
+            open_time = int(row[0])
+            close_time = int(row[6]) if len(row) > 6 else open_time + series.step - 1
+            if close_time < now_ms:
+                closed.append((open_time, float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])))
+        series.merge(closed)
+        return series, closed
+
+    def fvgs_for_klines(self, exchange: str, symbol: str, interval: str, rows: list) -> list[dict]:
+        """Fair value gaps starting within `rows`, with fills known from all later cached candles."""
+        series, closed = self.merge_klines(exchange, symbol, interval, rows)
+        if not closed:
+            return []
+        start, end = closed[0][0], closed[-1][0]
+        if series.covers(start):
+            return series.fvg.between(start, end)
+
+        # Page older than the cache keeps (scrolled far back): one-off pass
+        tracker = FVGTracker()
+        tracker.rebuild(closed + [c for c in series.candles if c[0] > end])
+        return tracker.between(start, end)
+
+    def indicators_for_klines(self, exchange: str, symbol: str, interval: str, rows: list, indicators: list[Indicator]) -> dict[str, dict[str, list]]:
+        """
+        Outputs of `indicators` aligned with `rows` (None while warming up),
+        from the cached series, which gives the page's first candles their
+        history. The still-forming candle is computed on top of the cache.
+        """
+        series, closed = self.merge_klines(exchange, symbol, interval, rows)
+        forming = [
+            (int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]))
+            for row in rows[len(closed):]
+        ]
+        result = {}
+        for indicator in indicators:
+            if closed and not series.covers(closed[0][0]):
+                # Page older than the cache keeps (scrolled far back): one-off pass
+                outputs = indicator.compute(np.array(closed, dtype=np.float64))
+            elif closed:
+                times = series.bars()[:, 0]
+                index = np.searchsorted(times, [c[0] for c in closed])
+                outputs = {name: out[index] for name, out in series.indicator(indicator).items()}
+            else:
+                outputs = {name: np.empty(0) for name in indicator.outputs}
+
+            values = {name: _to_json(out) for name, out in _public(outputs).items()}
+            for candle in forming:
+                for name, value in series.indicator_at(indicator, candle).items():
+                    values[name].append(value)
+            result[indicator.key] = values
+        return result
+
+    def indicators_for_kline(self, exchange: str, symbol: str, interval: str, k: dict, indicators: list[Indicator]) -> dict[str, dict]:
+        """Outputs of `indicators` at one kline stream candle ({"t", "o", "h", "l", "c", "v"})."""
+        series = self.series(exchange, symbol, interval)
+        candle = (int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]))
+        return {indicator.key: series.indicator_at(indicator, candle) for indicator in indicators}
+
+    def merge_closed_kline(self, exchange: str, symbol: str, interval: str, k: dict) -> bool:
+        """
+        Feed one closed candle from a kline stream ({"t", "o", "h", "l", "c", "v"}).
+        False when it does not follow the cached candles and was not added.
+        """
+        candle = (int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]))
+        return self.series(exchange, symbol, interval).append(candle)
+
+
+candle_cache = CandleCache()
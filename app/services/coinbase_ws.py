@@ -1,6 +1,7 @@
 import asyncio
 import json
 import logging
+import aiohttp
 import websockets
 from app.config import settings
 
@@ -43,6 +44,24 @@ class CoinbaseWS:
     def stop(self):
         self.running = False
 
+    async def seed_prices(self, session: aiohttp.ClientSession) -> int:
+        """Fill price_cache from the REST ticker of each product. Prices already streamed are kept."""
+        async def fetch(product_id: str):
+            async with session.get(f"{settings.COINBASE_API_URL}/products/{product_id}/ticker") as response:
+                response.raise_for_status()
+                return product_id, float((await response.json())["price"])
+
+        seeded = 0
+        for result in await asyncio.gather(*(fetch(p) for p in self.product_ids), return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning(f"Coinbase price snapshot failed: {result}")
+                continue
+            product_id, price = result
+            if product_id not in price_cache and price > 0:
+                price_cache[product_id] = price
+                seeded += 1
+        return seeded
+
     def _process_message(self, data):
         # Data format: { "channel": "ticker", "events": [ { "tickers": [ { "product_id": "BTC-USD", "price": "..." } ] } ] }
         if "events" in data:
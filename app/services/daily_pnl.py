@@ -0,0 +1,110 @@
+import logging
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import primary_session
+from app.models import Account, PnlBucket, PositionHistory
+
+logger = logging.getLogger(__name__)
+
+BUCKET_MINUTES = 15
+
+
+def bucket_start(timestamp: datetime) -> datetime:
+    # Naive timestamps (e.g. from SQLite) are already UTC
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.replace(minute=timestamp.minute - timestamp.minute % BUCKET_MINUTES, second=0, microsecond=0)
+
+
+async def rebuild_pnl_buckets(session: AsyncSession, account_id: int):
+    """Recompute an account's buckets from PositionHistory (caller commits)."""
+    await session.execute(delete(PnlBucket).where(PnlBucket.account_id == account_id))
+
+    stmt = select(PositionHistory.closed_at, PositionHistory.realized_pnl - PositionHistory.total_fee).where(
+        PositionHistory.account_id == account_id
+    )
+    buckets: dict[datetime, PnlBucket] = {}
+    for closed_at, pnl in (await session.execute(stmt)).all():
+        start = bucket_start(closed_at)
+        row = buckets.get(start)
+        if row is None:
+            row = buckets[start] = PnlBucket(account_id=account_id, bucket_start=start, pnl=0.0, trade_count=0)
+        row.pnl += pnl
+        row.trade_count += 1
+    session.add_all(buckets.values())
+    await session.flush()
+    logger.info(f"Rebuilt daily PNL buckets for Account {account_id}")
+
+
+async def _needs_rebuild(session: AsyncSession, account_id: int) -> bool:
+    """
+    Buckets are missing for closed positions recorded before them. Accounts
+    that never closed a position have neither, and need no rebuild.
+    """
+    has_buckets = await session.scalar(select(PnlBucket.id).where(PnlBucket.account_id == account_id).limit(1))
+    if has_buckets is not None:
+        return False
+    has_history = await session.scalar(select(PositionHistory.id).where(PositionHistory.account_id == account_id).limit(1))
+    return has_history is not None
+
+
+async def record_closed_position_pnl(session: AsyncSession, history: PositionHistory, closed_at: datetime = None):
+    """
+    Fold a new PositionHistory row into its bucket (same transaction, under
+    the account lock). Accounts without buckets yet are backfilled first.
+    """
+    closed_at = closed_at or datetime.now(timezone.utc)
+    # The new history row is not flushed yet, so it is not part of the check or the backfill
+    if await _needs_rebuild(session, history.account_id):
+        await rebuild_pnl_buckets(session, history.account_id)
+
+    start = bucket_start(closed_at)
+    stmt = select(PnlBucket).where(PnlBucket.account_id == history.account_id, PnlBucket.bucket_start == start)
+    row = (await session.execute(stmt)).scalar_one_or_none()
+    if row is None:
+        row = PnlBucket(account_id=history.account_id, bucket_start=start, pnl=0.0, trade_count=0)
+        session.add(row)
+    row.pnl += history.realized_pnl - history.total_fee
+    row.trade_count += 1
+
+
+def local_day_bounds(first_day: date, last_day: date, tz: ZoneInfo) -> tuple[datetime, datetime]:
+    """UTC range covering local days first_day..last_day (inclusive)."""
+    start = datetime.combine(first_day, time.min, tzinfo=tz)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+async def read_daily_pnl(session: AsyncSession, account_id: int, tz: ZoneInfo,
+                         first_day: date = None, last_day: date = None) -> list[dict]:
+    """Net PNL per local calendar day in `tz`, optionally limited to first_day..last_day."""
+    if await _needs_rebuild(session, account_id):
+        # Rebuilding writes, so it (and the rest of this read) runs on the primary
+        async with primary_session(session) as primary:
+            # Same lock the matching engine takes before closing positions
+            await primary.execute(select(Account.id).where(Account.id == account_id).with_for_update())
+            await rebuild_pnl_buckets(primary, account_id)
+            await primary.commit()
+            return await _sum_local_days(primary, account_id, tz, first_day, last_day)
+
+    return await _sum_local_days(session, account_id, tz, first_day, last_day)
+
+
+async def _sum_local_days(session: AsyncSession, account_id: int, tz: ZoneInfo,
+                          first_day: date = None, last_day: date = None) -> list[dict]:
+    stmt = select(PnlBucket.bucket_start, PnlBucket.pnl).where(PnlBucket.account_id == account_id)
+    if first_day and last_day:
+        start, end = local_day_bounds(first_day, last_day, tz)
+        stmt = stmt.where(PnlBucket.bucket_start >= start, PnlBucket.bucket_start < end)
+
+    days: dict[date, float] = {}
+    for start, pnl in (await session.execute(stmt)).all():
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        day = start.astimezone(tz).date()
+        days[day] = days.get(day, 0.0) + pnl
+
+    return [{"date": day.strftime("%Y-%m-%d"), "pnl": pnl} for day, pnl in sorted(days.items())]
@@ -0,0 +1,159 @@
+import logging
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# What issued the current statement: a background service name, or the ASGI
+# scope of the request being served (resolved to its route template lazily,
+# since routing happens after the middleware ran)
+query_source: ContextVar = ContextVar("query_source", default="unknown")
+
+
+def current_source() -> str:
+    source = query_source.get()
+    if isinstance(source, dict):
+        route = source.get("route")
+        if route is not None:
+            return f"{source.get('method', 'WS')} {route.path}"
+        return f"{source.get('method', 'WS')} {source.get('path', '?')}"
+    return source
+
+
+class QuerySourceMiddleware:
+    """Tags statements run while serving a request with that request's route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            query_source.set(scope)
+        await self.app(scope, receive, send)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+    def add(self, elapsed: float, slow: bool):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.slow += slow
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "slow": self.slow,
+        }
+
+
+class PoolMetrics:
+    """Checkout waits and usage of one engine's connection pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.checkout_wait = QueryStats()
+        self.peak_checked_out = 0
+
+    def checked_out(self) -> int:
+        checkedout = getattr(self.pool, "checkedout", None)
+        return checkedout() if checkedout else 0
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.peak_checked_out = max(self.peak_checked_out, self.checked_out())
+
+    def status(self) -> dict:
+        pool = self.pool
+        status = {
+            "class": type(pool).__name__,
+            "checked_out": self.checked_out(),
+            "peak_checked_out": self.peak_checked_out,
+            "checkout_wait": self.checkout_wait.to_dict(),
+        }
+        if hasattr(pool, "size") and hasattr(pool, "overflow"):
+            max_overflow = getattr(pool, "_max_overflow", 0)
+            capacity = pool.size() + max_overflow if max_overflow >= 0 else None # -1: unbounded
+            status.update(
+                size=pool.size(),
+                overflow=pool.overflow(),
+                capacity=capacity,
+                saturation=round(status["checked_out"] / capacity, 3) if capacity else None,
+            )
+        return status
+
+
+class DbMetrics:
+    """
+    Per-source statement timings, slow-query log and connection pool
+    checkout waits for the instrumented engines. Counters are
+    process-local and cumulative since startup.
+    """
+
+    def __init__(self):
+        self.queries: dict[str, QueryStats] = {}
+        self.pools: dict[str, PoolMetrics] = {}
+
+    def instrument(self, engine: AsyncEngine, name: str = "primary"):
+        sync_engine = engine.sync_engine
+        pool = self.pools[name] = PoolMetrics(sync_engine.pool)
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+        event.listen(sync_engine, "handle_error", self._on_error)
+        event.listen(pool.pool, "checkout", pool.on_checkout)
+
+        # Pools have no "waiting for a connection" event, so time connect()
+        connect = pool.pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                elapsed = time.perf_counter() - started
+                slow = elapsed * 1000 >= settings.DB_SLOW_QUERY_MS
+                pool.checkout_wait.add(elapsed, slow)
+                if slow:
+                    logger.warning(f"Slow connection checkout ({elapsed * 1000:.1f}ms, {name}, {current_source()}): {pool.status()}")
+
+        pool.pool.connect = timed_connect
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        source = current_source()
+        slow = elapsed * 1000 >= settings.DB_SLOW_QUERY_MS
+        stats = self.queries.get(source)
+        if stats is None:
+            stats = self.queries[source] = QueryStats()
+        stats.add(elapsed, slow)
+        if slow:
+            logger.warning(f"Slow query ({elapsed * 1000:.1f}ms, {source}): {statement[:settings.DB_SLOW_QUERY_LOG_CHARS]}")
+
+    def _on_error(self, context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def snapshot(self) -> dict:
+        queries = sorted(self.queries.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            "slow_query_ms": settings.DB_SLOW_QUERY_MS,
+            "pools": {name: pool.status() for name, pool in self.pools.items()},
+            "queries": {source: stats.to_dict() for source, stats in queries},
+        }
+
+
+db_metrics = DbMetrics()
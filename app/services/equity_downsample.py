@@ -0,0 +1,114 @@
+from datetime import datetime
+from sqlalchemy import select, func, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.equity_rollup import equity_points, RAW
+
+METHODS = ("minmax", "lttb")
+
+
+def _minmax_query(points, limit: int, t_min: float, t_max: float):
+    """
+    Equal-time buckets, keeping the min, max and last point of each.
+    At most 3 points per bucket, so limit // 3 buckets.
+    """
+    buckets = max(1, limit // 3)
+    width = (t_max - t_min) / buckets or 1.0
+
+    pts = points.subquery()
+    bucket = case(
+        (pts.c.t >= t_max, buckets - 1),
+        else_=func.floor((pts.c.t - t_min) / width),
+    )
+    ranked = select(
+        pts.c.timestamp,
+        pts.c.equity,
+        func.row_number().over(partition_by=bucket, order_by=pts.c.equity.asc()).label("rn_min"),
+        func.row_number().over(partition_by=bucket, order_by=pts.c.equity.desc()).label("rn_max"),
+        func.row_number().over(partition_by=bucket, order_by=pts.c.timestamp.desc()).label("rn_last"),
+    ).subquery()
+
+    return select(ranked.c.timestamp, ranked.c.equity).where(
+        or_(ranked.c.rn_min == 1, ranked.c.rn_max == 1, ranked.c.rn_last == 1)
+    ).order_by(ranked.c.timestamp.asc())
+
+
+def _lttb_query(points, limit: int, count: int):
+    """
+    Largest-Triangle-Three-Buckets, evaluated set-wise in SQL.
+
+    First and last points are their own buckets; the rest are split into
+    limit - 2 equal-count buckets. Each bucket keeps the point forming the
+    largest triangle with the *average* points of its neighbouring buckets.
+    (Classic LTTB uses the previously selected point instead of the previous
+    bucket's average, which forces a sequential scan; the difference is
+    not visible on an equity curve.)
+    """
+    ordered = points.subquery()
+    pts = select(
+        ordered,
+        func.row_number().over(order_by=ordered.c.timestamp.asc()).label("i"),
+    ).subquery()
+
+    bucket = case(
+        (pts.c.i == 1, 0),
+        (pts.c.i == count, limit - 1),
+        else_=1 + (pts.c.i - 2) * (limit - 2) // (count - 2),
+    )
+    # CTE: scanned once, read by both the bucket averages and the ranking
+    binned = select(pts.c.timestamp, pts.c.equity, pts.c.t, bucket.label("b")).cte("binned")
+
+    averages = select(
+        binned.c.b,
+        func.avg(binned.c.t).label("avg_t"),
+        func.avg(binned.c.equity).label("avg_y"),
+    ).group_by(binned.c.b).subquery()
+
+    neighbours = select(
+        averages.c.b,
+        func.lag(averages.c.avg_t).over(order_by=averages.c.b).label("prev_t"),
+        func.lag(averages.c.avg_y).over(order_by=averages.c.b).label("prev_y"),
+        func.lead(averages.c.avg_t).over(order_by=averages.c.b).label("next_t"),
+        func.lead(averages.c.avg_y).over(order_by=averages.c.b).label("next_y"),
+    ).subquery()
+
+    # Twice the triangle area (prev avg, point, next avg); NULL for the end buckets
+    area = func.abs(
+        (neighbours.c.prev_t - binned.c.t) * (neighbours.c.next_y - neighbours.c.prev_y)
+        - (neighbours.c.prev_t - neighbours.c.next_t) * (binned.c.equity - neighbours.c.prev_y)
+    )
+    ranked = select(
+        binned.c.timestamp,
+        binned.c.equity,
+        func.row_number().over(
+            partition_by=binned.c.b,
+            order_by=func.coalesce(area, 0.0).desc(),
+        ).label("rn"),
+    ).join_from(binned, neighbours, binned.c.b == neighbours.c.b).subquery()
+
+    return select(ranked.c.timestamp, ranked.c.equity).where(
+        ranked.c.rn == 1
+    ).order_by(ranked.c.timestamp.asc())
+
+
+async def downsample_equity(session: AsyncSession, account_id: int, since: datetime = None,
+                            limit: int = 1000, method: str = "minmax", resolution: str = RAW):
+    """
+    Equity curve with at most `limit` points, downsampled in the database.
+    limit <= 0 returns every point.
+    """
+    points = equity_points(account_id, since, resolution)
+    if limit > 0:
+        bounds = points.subquery()
+        count, t_min, t_max = (await session.execute(
+            select(func.count(), func.min(bounds.c.t), func.max(bounds.c.t))
+        )).one()
+
+    if limit <= 0 or count <= limit:
+        pts = points.subquery()
+        stmt = select(pts.c.timestamp, pts.c.equity).order_by(pts.c.timestamp.asc())
+    elif method == "lttb":
+        stmt = _lttb_query(points, limit, count)
+    else:
+        stmt = _minmax_query(points, limit, t_min, t_max)
+
+    return (await session.execute(stmt)).all()
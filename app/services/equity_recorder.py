@@ -1,63 +1,116 @@
 import asyncio
 import logging
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+import time
+from sqlalchemy import select, insert
 from app.database import AsyncSessionLocal
-from app.models import Account, EquityHistory
-from app.routers.accounts import calculate_account_metrics
+from app.models import Account, Position, EquityHistory
 from app.services.binance_ws import get_current_price
+from app.services.account_stats import record_equity_points
+from app.config import settings
+from app.services.db_metrics import query_source
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 class EquityRecorder:
+    """
+    Writes one equity point per account every minute, skipping accounts
+    whose equity moved less than EQUITY_RECORD_MIN_CHANGE since their last
+    point (at least one point per EQUITY_RECORD_HEARTBEAT is still written).
+
+    Accounts are streamed in id order in chunks of EQUITY_RECORD_CHUNK_SIZE;
+    each chunk is two column selects, a bulk insert and one commit.
+    """
+
     def __init__(self):
         self.running = False
+        # account_id -> (equity, monotonic time) of the last written point
+        self._last_recorded: dict[int, tuple[float, float]] = {}
 
     async def start(self):
         self.running = True
+        query_source.set("equity_recorder")
         logger.info("Equity Recorder started")
         while self.running:
             try:
-                async with AsyncSessionLocal() as session:
-                    await self.record_equity(session)
+                await self.record_equity()
             except Exception as e:
                 logger.error(f"Error in equity recorder: {e}")
-            
+
             await asyncio.sleep(60) # Record every 60 seconds
 
     def stop(self):
         self.running = False
+        # A new leader starts from scratch
+        self._last_recorded.clear()
+
+    async def record_equity(self):
+        now = datetime.now(timezone.utc)
+        started = time.monotonic()
+        last_id = 0
+        written = 0
+
+        while True:
+            async with AsyncSessionLocal() as session:
+                stmt = select(Account.id, Account.balance).where(Account.id > last_id).order_by(Account.id).limit(settings.EQUITY_RECORD_CHUNK_SIZE)
+                accounts = (await session.execute(stmt)).all()
+                if not accounts:
+                    break
+                last_id = accounts[-1].id
+
+                rows = self._changed_points(accounts, await self._load_positions(session, [a.id for a in accounts]))
+                if rows:
+                    for row in rows:
+                        row["timestamp"] = now
+                    await session.execute(insert(EquityHistory), rows)
+                    # Keep statistics aggregates (drawdown, daily returns) in step
+                    await record_equity_points(session, [(r["account_id"], r["equity"]) for r in rows], now)
+                    await session.commit()
+                    written += len(rows)
 
-    async def record_equity(self, session):
-        # Fetch all accounts with positions
-        stmt = select(Account).options(selectinload(Account.positions))
-        result = await session.execute(stmt)
-        accounts = result.scalars().all()
+                    recorded_at = time.monotonic()
+                    for row in rows:
+                        self._last_recorded[row["account_id"]] = (row["equity"], recorded_at)
+
+        elapsed = time.monotonic() - started
+        logger.debug(f"Recorded {written} equity points in {elapsed:.2f}s")
+        if elapsed > 30:
+            logger.warning(f"Equity recording took {elapsed:.1f}s ({written} points)")
+
+    async def _load_positions(self, session, account_ids: list[int]) -> dict[int, list]:
+        stmt = select(Position.account_id, Position.symbol, Position.quantity, Position.entry_price, Position.margin).where(Position.account_id.in_(account_ids))
+        positions: dict[int, list] = {}
+        for row in (await session.execute(stmt)).all():
+            positions.setdefault(row.account_id, []).append(row)
+        return positions
+
+    def _changed_points(self, accounts, positions: dict[int, list]) -> list[dict]:
+        now = time.monotonic()
+        rows = []
 
         for account in accounts:
-            # Check if we have prices for all positions
-            # If any position has no price, skip recording to avoid bad data (PNL=0 spikes)
-            has_missing_price = False
-            for pos in account.positions:
-                if not get_current_price(pos.symbol):
-                    has_missing_price = True
+            # Same formula as calculate_account_metrics: quantity is negative for shorts
+            equity = account.balance
+            for pos in positions.get(account.id, ()):
+                current_price = get_current_price(pos.symbol)
+                if not current_price:
+                    # Skip recording to avoid bad data (PNL=0 spikes)
                     logger.warning(f"Skipping equity record for Account {account.id}: Missing price for {pos.symbol}")
+                    equity = None
                     break
-            
-            if has_missing_price:
+                equity += pos.margin + (current_price - pos.entry_price) * pos.quantity
+
+            if equity is None:
                 continue
 
-            # Calculate current equity
-            # Note: calculate_account_metrics modifies the account object in place with .equity
-            await calculate_account_metrics(account)
-            
-            # Create history record
-            history = EquityHistory(
-                account_id=account.id,
-                equity=account.equity
-            )
-            session.add(history)
-        
-        await session.commit()
+            last = self._last_recorded.get(account.id)
+            if last is not None:
+                last_equity, last_at = last
+                if abs(equity - last_equity) < settings.EQUITY_RECORD_MIN_CHANGE and now - last_at < settings.EQUITY_RECORD_HEARTBEAT:
+                    continue
+
+            rows.append({"account_id": account.id, "equity": equity})
+
+        return rows
 
 equity_recorder = EquityRecorder()
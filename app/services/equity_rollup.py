@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, delete, func, literal, case, cast, extract, Float, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction
+from app.database import AsyncSessionLocal, dialect_insert
+from app.models import EquityHistory, EquityRollup
+from app.services.partitions import is_partitioned
+from app.config import settings
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+RAW = "raw"
+
+# Coarse to fine. Raw step is the equity recorder interval.
+RESOLUTIONS = {
+    "1d": timedelta(days=1),
+    "1h": timedelta(hours=1),
+    RAW: timedelta(minutes=1),
+}
+
+
+class utc_trunc(GenericFunction):
+    """utc_trunc(unit, timestamp): start of the UTC hour / day containing timestamp."""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(utc_trunc, "postgresql")
+def _utc_trunc_postgresql(element, compiler, **kw):
+    unit, timestamp = element.clauses
+    return f"date_trunc({compiler.process(unit, **kw)}, {compiler.process(timestamp, **kw)}, 'UTC')"
+
+
+@compiles(utc_trunc, "sqlite")
+def _utc_trunc_sqlite(element, compiler, **kw):
+    # Timestamps are stored as UTC text in SQLAlchemy's format, which keeps
+    # the truncated value comparable with stored ones
+    unit, timestamp = element.clauses
+    formats = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+    return f"strftime('{formats[unit.value]}', {compiler.process(timestamp, **kw)})"
+
+
+def retention(resolution: str) -> timedelta | None:
+    if resolution == RAW:
+        return timedelta(days=settings.EQUITY_RAW_RETENTION_DAYS)
+    if resolution == "1h":
+        return timedelta(days=settings.EQUITY_HOURLY_RETENTION_DAYS)
+    return None # Daily bars are kept forever
+
+
+def pick_resolution(start: datetime, points_wanted: float, now: datetime = None) -> str:
+    """
+    Coarsest resolution that still gives `points_wanted` points over
+    [start, now] and is retained for the whole range. Falls back to the
+    finest resolution that covers the range.
+    """
+    now = now or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    span = now - start
+
+    covering = [res for res in RESOLUTIONS if retention(res) is None or start >= now - retention(res)]
+    for res in covering:
+        if span / RESOLUTIONS[res] >= points_wanted:
+            return res
+    return covering[-1]
+
+
+def equity_points(account_id: int, since: datetime = None, resolution: str = RAW):
+    """
+    SELECT of (timestamp, equity, t) for one account at a resolution, where
+    t is epoch seconds. Bars are represented by their closing point.
+    """
+    if resolution == RAW:
+        timestamp, equity = EquityHistory.timestamp, EquityHistory.equity
+        stmt = select(timestamp.label("timestamp"), equity.label("equity"), cast(extract("epoch", timestamp), Float).label("t"))
+        stmt = stmt.where(EquityHistory.account_id == account_id)
+    else:
+        timestamp, equity = EquityRollup.close_at, EquityRollup.close
+        stmt = select(timestamp.label("timestamp"), equity.label("equity"), cast(extract("epoch", timestamp), Float).label("t"))
+        stmt = stmt.where(EquityRollup.account_id == account_id, EquityRollup.resolution == resolution)
+    if since:
+        stmt = stmt.where(timestamp >= since)
+    return stmt
+
+
+async def load_equity_replay(session: AsyncSession, account_id: int) -> list[tuple[float, datetime]]:
+    """
+    Full equity history at the finest resolution still available for each
+    period: daily closes, then hourly closes, then raw points.
+    """
+    raw_start = await session.scalar(
+        select(func.min(EquityHistory.timestamp)).where(EquityHistory.account_id == account_id)
+    )
+    hourly_start = await session.scalar(
+        select(func.min(EquityRollup.bucket_start)).where(
+            EquityRollup.account_id == account_id, EquityRollup.resolution == "1h"
+        )
+    )
+
+    points = []
+    for resolution, until in (("1d", hourly_start or raw_start), ("1h", raw_start), (RAW, None)):
+        stmt = equity_points(account_id, resolution=resolution)
+        if until is not None:
+            column = EquityHistory.timestamp if resolution == RAW else EquityRollup.close_at
+            stmt = stmt.where(column < until)
+        stmt = stmt.order_by("timestamp")
+        points.extend((equity, timestamp) for timestamp, equity, _ in (await session.execute(stmt)).all())
+    return points
+
+
+class EquityRollupService:
+    """
+    Compacts equity_history into 1h and 1d OHLC bars and prunes points
+    past their retention window.
+
+    Each pass re-aggregates from the latest existing bar of each resolution,
+    so the open bucket is refreshed and nothing is skipped after downtime.
+    Raw points (and hourly bars) are only deleted once a coarser bar covering
+    them exists; partitioned raw points are left to the partition manager.
+    """
+
+    def __init__(self):
+        self.running = False
+
+    async def start(self):
+        self.running = True
+        query_source.set("equity_rollup")
+        logger.info("Equity Rollup started")
+        while self.running:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await self.rollup(session)
+                    await self.prune(session)
+            except Exception as e:
+                logger.error(f"Error in equity rollup: {e}")
+
+            await asyncio.sleep(settings.EQUITY_ROLLUP_INTERVAL)
+
+    def stop(self):
+        self.running = False
+
+    async def _latest_bucket(self, session: AsyncSession, resolution: str) -> datetime | None:
+        latest = await session.scalar(
+            select(func.max(EquityRollup.bucket_start)).where(EquityRollup.resolution == resolution)
+        )
+        if latest is not None and latest.tzinfo is None:
+            latest = latest.replace(tzinfo=timezone.utc) # SQLite returns naive UTC
+        return latest
+
+    async def _upsert(self, session: AsyncSession, source):
+        columns = ["account_id", "resolution", "bucket_start", "open", "high", "low", "close", "close_at"]
+        stmt = dialect_insert(session)(EquityRollup).from_select(columns, source)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["account_id", "resolution", "bucket_start"],
+            set_={name: stmt.excluded[name] for name in columns[3:]},
+        )
+        await session.execute(stmt)
+
+    def _bars(self, resolution: str, unit: str, account_id, timestamp, open_, high, low, close, close_at, *criteria):
+        """
+        OHLC bars per account and `unit` bucket of the given columns: open is
+        the first `open_` and close the last `close` by timestamp.
+        """
+        bucket = utc_trunc(unit, timestamp)
+        ranked = select(
+            account_id.label("account_id"),
+            bucket.label("bucket"),
+            open_.label("open"),
+            high.label("high"),
+            low.label("low"),
+            close.label("close"),
+            close_at.label("close_at"),
+            func.row_number().over(partition_by=(account_id, bucket), order_by=timestamp.asc()).label("rn_first"),
+            func.row_number().over(partition_by=(account_id, bucket), order_by=timestamp.desc()).label("rn_last"),
+        ).where(*criteria).subquery()
+
+        return select(
+            ranked.c.account_id,
+            literal(resolution),
+            ranked.c.bucket,
+            func.max(case((ranked.c.rn_first == 1, ranked.c.open))),
+            func.max(ranked.c.high),
+            func.min(ranked.c.low),
+            func.max(case((ranked.c.rn_last == 1, ranked.c.close))),
+            func.max(ranked.c.close_at),
+        ).group_by(ranked.c.account_id, ranked.c.bucket)
+
+    async def rollup(self, session: AsyncSession):
+        # Raw points -> 1h bars
+        since = await self._latest_bucket(session, "1h")
+        equity = EquityHistory.equity
+        criteria = [EquityHistory.timestamp >= since] if since else []
+        source = self._bars(
+            "1h", "hour", EquityHistory.account_id, EquityHistory.timestamp,
+            equity, equity, equity, equity, EquityHistory.timestamp, *criteria,
+        )
+        await self._upsert(session, source)
+
+        # 1h bars -> 1d bars
+        since = await self._latest_bucket(session, "1d")
+        criteria = [EquityRollup.resolution == "1h"]
+        if since:
+            criteria.append(EquityRollup.bucket_start >= since)
+        source = self._bars(
+            "1d", "day", EquityRollup.account_id, EquityRollup.bucket_start,
+            EquityRollup.open, EquityRollup.high, EquityRollup.low, EquityRollup.close, EquityRollup.close_at, *criteria,
+        )
+        await self._upsert(session, source)
+
+        await session.commit()
+
+    async def _prune(self, session: AsyncSession, table, timestamp, cutoff: datetime, *criteria) -> int:
+        total = 0
+        while True:
+            batch = select(table.id).where(timestamp < cutoff, *criteria).limit(settings.EQUITY_PRUNE_BATCH_SIZE)
+            result = await session.execute(delete(table).where(table.id.in_(batch)))
+            await session.commit()
+            total += result.rowcount
+            if result.rowcount < settings.EQUITY_PRUNE_BATCH_SIZE:
+                return total
+
+    async def prune(self, session: AsyncSession):
+        now = datetime.now(timezone.utc)
+
+        # Everything before the latest (re-aggregated) bucket is already rolled up.
+        # Partitioned raw points are dropped a month at a time by the partition manager.
+        latest_hour = await self._latest_bucket(session, "1h")
+        if latest_hour and not await is_partitioned(await session.connection(), "equity_history"):
+            cutoff = min(now - retention(RAW), latest_hour)
+            deleted = await self._prune(session, EquityHistory, EquityHistory.timestamp, cutoff)
+            if deleted:
+                logger.info(f"Pruned {deleted} raw equity points before {cutoff}")
+
+        latest_day = await self._latest_bucket(session, "1d")
+        if latest_day:
+            cutoff = min(now - retention("1h"), latest_day)
+            deleted = await self._prune(session, EquityRollup, EquityRollup.bucket_start, cutoff, EquityRollup.resolution == "1h")
+            if deleted:
+                logger.info(f"Pruned {deleted} hourly equity bars before {cutoff}")
+
+
+equity_rollup = EquityRollupService()
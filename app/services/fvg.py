@@ -0,0 +1,78 @@
+import heapq
+
+
+class FairValueGap:
+    __slots__ = ("time", "type", "top", "bottom", "filled_time")
+
+    def __init__(self, time: int, type: str, top: float, bottom: float):
+        self.time = time # Open time (ms) of the first of the three candles
+        self.type = type # "bullish" or "bearish"
+        self.top = top
+        self.bottom = bottom
+        self.filled_time: int | None = None # Open time of the candle whose body closed the gap
+
+    def to_dict(self) -> dict:
+        return {
+            "time": self.time,
+            "type": self.type,
+            "top": self.top,
+            "bottom": self.bottom,
+            "filled_time": self.filled_time,
+        }
+
+
+class FVGTracker:
+    """
+    Fair value gaps of a closed-candle series, maintained as candles are
+    appended:
+
+    - bullish gap at candle i: low[i] > high[i-2], zone high[i-2]..low[i]
+    - bearish gap at candle i: high[i] < low[i-2], zone high[i]..low[i-2]
+
+    A gap is filled by the first later candle whose body (not wick) reaches
+    its far edge. Open gaps sit in heaps ordered by that edge, so each new
+    candle only looks at the gaps it actually fills: O(1) amortized per bar.
+    """
+
+    def __init__(self):
+        self.gaps: list[FairValueGap] = [] # Ordered by time
+        self._open_bullish: list[tuple[float, int, FairValueGap]] = [] # (-bottom, time, gap)
+        self._open_bearish: list[tuple[float, int, FairValueGap]] = [] # (top, time, gap)
+
+    def reset(self):
+        self.gaps.clear()
+        self._open_bullish.clear()
+        self._open_bearish.clear()
+
+    def append(self, candles: list, i: int):
+        """Account for candles[i], the newest closed candle."""
+        t, o, h, l, c = candles[i][:5]
+        body_low, body_high = min(o, c), max(o, c)
+
+        while self._open_bullish and -self._open_bullish[0][0] >= body_low:
+            heapq.heappop(self._open_bullish)[2].filled_time = t
+        while self._open_bearish and self._open_bearish[0][0] <= body_high:
+            heapq.heappop(self._open_bearish)[2].filled_time = t
+
+        if i < 2:
+            return
+        first = candles[i - 2]
+        if l > first[2]:
+            gap = FairValueGap(first[0], "bullish", top=l, bottom=first[2])
+            self.gaps.append(gap)
+            heapq.heappush(self._open_bullish, (-gap.bottom, gap.time, gap))
+        if h < first[3]:
+            gap = FairValueGap(first[0], "bearish", top=first[3], bottom=h)
+            self.gaps.append(gap)
+            heapq.heappush(self._open_bearish, (gap.top, gap.time, gap))
+
+    def rebuild(self, candles: list):
+        self.reset()
+        for i in range(len(candles)):
+            self.append(candles, i)
+
+    def between(self, start: int = None, end: int = None) -> list[dict]:
+        return [
+            gap.to_dict() for gap in self.gaps
+            if (start is None or gap.time >= start) and (end is None or gap.time <= end)
+        ]
@@ -0,0 +1,229 @@
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MS_PER_DAY = 86_400_000
+MAX_PERIOD = 1000
+# Blocks of the vectorized recurrence keep decay ** -length below this, so
+# the scaled cumulative sum loses at most ~6 of float64's 16 digits
+_EWM_MAX_SCALE = 1e6
+
+
+def _ewm(x: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """y[t] = (1 - alpha) * y[t-1] + alpha * x[t] with y[-1] = seed, vectorized per block."""
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return x.astype(np.float64)
+    block = max(1, int(math.log(_EWM_MAX_SCALE) / -math.log(decay)))
+    weights = decay ** np.arange(1, block + 1)
+    out = np.empty(len(x))
+    # y[t] = decay^(t+1) * (seed + alpha * sum(x[k] / decay^(k+1), k <= t)) within a block
+    for lo in range(0, len(x), block):
+        chunk = x[lo:lo + block]
+        w = weights[:len(chunk)]
+        out[lo:lo + len(chunk)] = w * (seed + alpha * np.cumsum(chunk / w))
+        seed = out[lo + len(chunk) - 1]
+    return out
+
+
+def _seeded_ewm(x: np.ndarray, alpha: float, period: int, offset: int = 0) -> np.ndarray:
+    """
+    Moving average of x seeded with the mean of its first `period` values,
+    as an array of len(x) + offset (NaN until the seed).
+    """
+    out = np.full(len(x) + offset, np.nan)
+    if len(x) >= period:
+        seed = out[offset + period - 1] = x[:period].mean()
+        out[offset + period:] = _ewm(x[period:], alpha, seed)
+    return out
+
+
+def _session_cumsum(x: np.ndarray, starts: np.ndarray, carry: float = 0.0) -> np.ndarray:
+    """Cumulative sum of x, continuing from `carry` and restarting at rows where `starts` is True."""
+    total = carry + np.cumsum(x)
+    before = total - x
+    last_start = np.maximum.accumulate(np.where(starts, np.arange(len(x)), -1))
+    return total - np.where(last_start >= 0, before[np.maximum(last_start, 0)], 0.0)
+
+
+class Indicator:
+    """
+    An indicator over candles given as an (n, 6) array of open_time (ms),
+    open, high, low, close, volume rows, oldest first.
+
+    compute(bars) returns every output for every row (NaN while warming
+    up). compute(bars, prev) continues from `prev`, the outputs of the row
+    before bars[lookback]: bars then holds `lookback` earlier rows plus the
+    new ones, and only the new rows are returned. Outputs starting with "_"
+    are internal state.
+    """
+
+    name = ""
+    outputs = ("value",)
+    lookback = 0
+
+    def __init__(self, *params):
+        self.params = params
+
+    @property
+    def key(self) -> str:
+        return ":".join([self.name, *(f"{p:g}" for p in self.params)])
+
+    def compute(self, bars: np.ndarray, prev: dict | None = None) -> dict[str, np.ndarray]:
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    name = "sma"
+
+    def __init__(self, period: int = 20):
+        super().__init__(period)
+        self.period = period
+        self.lookback = period - 1
+
+    def compute(self, bars, prev=None):
+        close = bars[:, 4]
+        value = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            value[self.period - 1:] = sliding_window_view(close, self.period).mean(axis=1)
+        return {"value": value if prev is None else value[self.lookback:]}
+
+
+class EMA(Indicator):
+    name = "ema"
+
+    def __init__(self, period: int = 20):
+        super().__init__(period)
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+
+    def compute(self, bars, prev=None):
+        close = bars[:, 4]
+        if prev is not None:
+            return {"value": _ewm(close, self.alpha, prev["value"])}
+        return {"value": _seeded_ewm(close, self.alpha, self.period)}
+
+
+class RSI(Indicator):
+    """Wilder's RSI: smoothed average gain / loss of closes."""
+
+    name = "rsi"
+    outputs = ("value", "_gain", "_loss")
+    lookback = 1
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.period = period
+
+    def compute(self, bars, prev=None):
+        change = np.diff(bars[:, 4])
+        gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+        alpha = 1.0 / self.period
+        if prev is not None:
+            avg_gain, avg_loss = _ewm(gain, alpha, prev["_gain"]), _ewm(loss, alpha, prev["_loss"])
+        else:
+            avg_gain = _seeded_ewm(gain, alpha, self.period, offset=1)
+            avg_loss = _seeded_ewm(loss, alpha, self.period, offset=1)
+
+        value = np.full(len(avg_gain), np.nan)
+        np.divide(100.0 * avg_gain, avg_gain + avg_loss, out=value, where=(avg_gain + avg_loss) > 0)
+        value[(avg_gain == 0) & (avg_loss == 0)] = 50.0 # Flat market
+        return {"value": value, "_gain": avg_gain, "_loss": avg_loss}
+
+
+class ATR(Indicator):
+    """Wilder's average true range."""
+
+    name = "atr"
+    lookback = 1
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.period = period
+
+    def compute(self, bars, prev=None):
+        high, low, close = bars[:, 2], bars[:, 3], bars[:, 4]
+        prev_close = close[:-1]
+        true_range = np.maximum.reduce([
+            high[1:] - low[1:], np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)
+        ])
+        alpha = 1.0 / self.period
+        if prev is not None:
+            return {"value": _ewm(true_range, alpha, prev["value"])}
+        true_range = np.concatenate((high[:1] - low[:1], true_range))
+        return {"value": _seeded_ewm(true_range, alpha, self.period)}
+
+
+class VWAP(Indicator):
+    """Volume weighted average price, anchored to the UTC day."""
+
+    name = "vwap"
+    outputs = ("value", "_pv", "_v")
+    lookback = 1
+
+    def compute(self, bars, prev=None):
+        day = bars[:, 0] // MS_PER_DAY
+        starts = np.concatenate(([prev is None], day[1:] != day[:-1]))
+        typical = (bars[:, 2] + bars[:, 3] + bars[:, 4]) / 3.0
+        volume = bars[:, 5]
+        if prev is not None:
+            starts, typical, volume = starts[1:], typical[1:], volume[1:]
+        pv = _session_cumsum(typical * volume, starts, prev["_pv"] if prev else 0.0)
+        v = _session_cumsum(volume, starts, prev["_v"] if prev else 0.0)
+        value = typical.copy() # No volume yet in the session
+        np.divide(pv, v, out=value, where=v > 0)
+        return {"value": value, "_pv": pv, "_v": v}
+
+
+class Bollinger(Indicator):
+    name = "bb"
+    outputs = ("middle", "upper", "lower")
+
+    def __init__(self, period: int = 20, mult: float = 2.0):
+        super().__init__(period, mult)
+        self.period = period
+        self.mult = mult
+        self.lookback = period - 1
+
+    def compute(self, bars, prev=None):
+        close = bars[:, 4]
+        middle, deviation = np.full(len(close), np.nan), np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            windows = sliding_window_view(close, self.period)
+            middle[self.period - 1:] = windows.mean(axis=1)
+            deviation[self.period - 1:] = windows.std(axis=1) * self.mult
+        skip = 0 if prev is None else self.lookback
+        middle, deviation = middle[skip:], deviation[skip:]
+        return {"middle": middle, "upper": middle + deviation, "lower": middle - deviation}
+
+
+INDICATORS = {cls.name: cls for cls in (SMA, EMA, RSI, ATR, VWAP, Bollinger)}
+
+
+def parse_indicator(spec: str) -> Indicator:
+    """Indicator from a spec such as "ema:20", "rsi" (default period) or "bb:20:2"."""
+    name, *params = spec.strip().lower().split(":")
+    cls = INDICATORS.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown indicator '{name}', expected one of {', '.join(INDICATORS)}")
+    try:
+        values = [float(p) for p in params]
+        if not all(math.isfinite(v) for v in values):
+            raise ValueError("non-finite parameter")
+        indicator = cls(*(int(v) if i == 0 else v for i, v in enumerate(values)))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid parameters for indicator '{spec}'")
+    period = getattr(indicator, "period", 1)
+    if not 1 <= period <= MAX_PERIOD:
+        raise ValueError(f"Indicator period must be between 1 and {MAX_PERIOD}")
+    return indicator
+
+
+def parse_indicators(specs: str) -> list[Indicator]:
+    """Comma separated indicator specs, duplicates removed."""
+    indicators = {}
+    for spec in specs.split(","):
+        if spec.strip():
+            indicator = parse_indicator(spec)
+            indicators.setdefault(indicator.key, indicator)
+    return list(indicators.values())
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from sqlalchemy import text
+from app.database import engine
+from app.config import settings
+from app.services.matching_engine import matching_engine
+from app.services.equity_recorder import equity_recorder
+from app.services.equity_rollup import equity_rollup
+from app.services.order_archive import order_archiver
+from app.services.partitions import partition_manager
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Runs singleton background services (partition manager, matching engine,
+    equity recorder, equity rollup, order archiver) in exactly one process, using a Postgres
+    session-level advisory lock.
+
+    The lock is held on a dedicated connection for as long as this process is
+    leader. If the leader dies or loses its connection, Postgres releases the
+    lock and one of the standby processes acquires it on its next attempt.
+    """
+
+    def __init__(self, services: list, lock_key: int):
+        self.services = services
+        self.lock_key = lock_key
+        self.running = False
+        self.is_leader = False
+        self._conn = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self.running = True
+        query_source.set("leader_election")
+        logger.info(f"Leader election started (lock key {self.lock_key})")
+        while self.running:
+            try:
+                if self.is_leader:
+                    await self._heartbeat()
+                else:
+                    await self._try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election error, stepping down: {e}")
+                await self._step_down()
+
+            await asyncio.sleep(settings.LEADER_ELECTION_INTERVAL)
+
+        await self._step_down()
+
+    def stop(self):
+        self.running = False
+
+    async def _try_acquire(self):
+        if engine.dialect.name != "postgresql":
+            # No shared lock service available (e.g. a single local process)
+            self._become_leader()
+            return
+
+        if self._conn is None:
+            self._conn = await engine.connect()
+
+        acquired = await self._conn.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+        )
+        # Session-level lock survives the commit; don't sit idle in a transaction
+        await self._conn.commit()
+
+        if acquired:
+            self._become_leader()
+
+    async def _heartbeat(self):
+        # Leader must notice a dropped connection: Postgres has already released
+        # the lock at that point and another process may take over.
+        if self._conn is not None:
+            await self._conn.execute(text("SELECT 1"))
+            await self._conn.commit()
+
+        for task in self._tasks:
+            if task.done():
+                raise RuntimeError("Leader service exited unexpectedly")
+
+    def _become_leader(self):
+        self.is_leader = True
+        logger.info("Acquired leadership, starting singleton services")
+        self._tasks = [asyncio.create_task(service.start()) for service in self.services]
+
+    async def _step_down(self):
+        if self.is_leader:
+            logger.warning("Releasing leadership, stopping singleton services")
+            for service in self.services:
+                service.stop()
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+            self.is_leader = False
+
+        if self._conn is not None:
+            try:
+                await self._conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}
+                )
+                await self._conn.commit()
+            except Exception:
+                pass
+            # Never hand a connection that may still hold the lock back to the pool
+            try:
+                await self._conn.invalidate()
+                await self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+leader_election = LeaderElection(
+    services=[partition_manager, matching_engine, equity_recorder, equity_rollup, order_archiver],
+    lock_key=settings.LEADER_LOCK_KEY,
+)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+from app.config import settings
+from app.services.db_metrics import QueryStats
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 30 # Innermost frames kept per stall
+
+
+def _short_path(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _task_name(task: asyncio.Task | None) -> str | None:
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+class LoopMonitor:
+    """
+    Event loop lag: how much later than asked a periodic sleep wakes up.
+    Every HTTP handler and background service shares the loop, so lag is
+    time during which no fill, price or request was processed.
+
+    By the time the loop is free to measure a stall, whatever blocked it
+    has returned. A watchdog thread therefore notices when the probe is
+    overdue and records the stack running on the loop thread at that
+    moment. Counters are process-local and cumulative since startup.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.lag = QueryStats()
+        self.last_lag = 0.0
+        self.stalls: deque[dict] = deque(maxlen=settings.LOOP_STALL_HISTORY)
+        self.profiling = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = 0.0 # Written by the probe, read by the watchdog
+        self._blocked: tuple[str | None, list[str]] | None = None # (task, stack) seen by the watchdog
+
+    async def start(self):
+        self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        logger.info("Event loop monitor started")
+
+        interval = settings.LOOP_LAG_INTERVAL
+        while self.running:
+            before = time.monotonic()
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.last_lag = lag = max(0.0, now - before - interval)
+            stalled = lag * 1000 >= settings.LOOP_STALL_MS
+            self.lag.add(lag, stalled)
+            if stalled:
+                self._record_stall(lag)
+            self._blocked = None
+
+    def stop(self):
+        self.running = False
+
+    def _watch(self):
+        interval = settings.LOOP_LAG_INTERVAL
+        overdue = interval + settings.LOOP_STALL_MS / 1000
+        captured = None
+        while self.running:
+            time.sleep(interval / 2)
+            heartbeat = self._heartbeat
+            if heartbeat == captured or time.monotonic() - heartbeat < overdue:
+                continue
+            # The probe is late: capture what holds the loop, once per stall
+            captured = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                task = _task_name(asyncio.current_task(self._loop))
+            except RuntimeError:
+                task = None
+            stack = [line.rstrip() for line in traceback.format_stack(frame)[-STACK_DEPTH:]]
+            self._blocked = (task, stack)
+
+    def _record_stall(self, lag: float):
+        task, stack = self._blocked or (None, [])
+        stall = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "lag_ms": round(lag * 1000, 1),
+            "task": task,
+            "stack": stack,
+        }
+        self.stalls.append(stall)
+        detail = "\n".join(stack) if stack else "(ended before the stack could be captured)"
+        logger.warning(f"Event loop blocked for {stall['lag_ms']}ms, task {task}:\n{detail}")
+
+    def snapshot(self) -> dict:
+        return {
+            "interval": settings.LOOP_LAG_INTERVAL,
+            "stall_ms": settings.LOOP_STALL_MS,
+            "current_lag_ms": round(self.last_lag * 1000, 3),
+            "lag": self.lag.to_dict(), # "slow": probes that stalled
+            "stalls": list(self.stalls),
+        }
+
+    async def profile(self, seconds: float, interval: float) -> Counter:
+        """
+        Sample the stack of the loop thread every `interval` seconds for
+        `seconds` from a worker thread, as folded stacks ("outer;...;inner")
+        with their sample counts.
+        """
+        self.profiling = True
+        try:
+            return await asyncio.to_thread(self._sample, threading.get_ident(), seconds, interval)
+        finally:
+            self.profiling = False
+
+    @staticmethod
+    def _sample(thread_id: int, seconds: float, interval: float) -> Counter:
+        folded = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                folded[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return folded
+
+
+loop_monitor = LoopMonitor()
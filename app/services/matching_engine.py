@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from datetime import datetime, timezone
 from decimal import Decimal, getcontext, ROUND_HALF_UP
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,7 +8,11 @@ from app.models import Order, OrderType, OrderSide, OrderStatus, Trade, Account,
 from app.services.binance_ws import get_current_price
 from app.database import AsyncSessionLocal
 from app.config import settings
-from app.services.websocket_manager import manager
+from app.services.notifications import notifier
+from app.services.account_events import AccountDelta
+from app.services.account_stats import record_closed_position
+from app.services.daily_pnl import record_closed_position_pnl
+from app.services.db_metrics import query_source
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,7 @@ class MatchingEngine:
 
     async def start(self):
         self.running = True
+        query_source.set("matching_engine")
         logger.info("Matching Engine started")
         while self.running:
             try:
@@ -58,6 +64,22 @@ class MatchingEngine:
                 await self.execute_trade(session, order, current_price)
 
     async def execute_trade(self, session: AsyncSession, order: Order, price: float):
+        # The order was read without locks, and a deposed leader may still be
+        # filling it for a moment (see leader_election): re-read it under the
+        # account lock, which every writer of the account's orders takes first
+        await session.execute(select(Account.id).where(Account.id == order.account_id).with_for_update())
+        stmt = select(Order).where(Order.id == order.id).with_for_update().execution_options(populate_existing=True)
+        locked = (await session.execute(stmt)).scalar_one_or_none()
+        if locked is None or locked.status not in (OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED):
+            # Nothing is pending here: commit just releases the locks, without
+            # expiring the other orders of this tick like a rollback would
+            await session.commit()
+            logger.info(f"Order {order.id} was filled, canceled or archived meanwhile, skipping")
+            return
+        order = locked
+
+        delta = AccountDelta(order.account_id)
+
         # Use Decimal for calculations
         d_price = Decimal(str(price))
         d_order_qty = Decimal(str(order.quantity))
@@ -81,6 +103,7 @@ class MatchingEngine:
             commission=float(fee)
         )
         session.add(trade)
+        delta.fills.append(trade)
 
         # Update Order
         # Calculate new average price
@@ -101,6 +124,7 @@ class MatchingEngine:
             order.status = OrderStatus.FILLED
         else:
             order.status = OrderStatus.PARTIALLY_FILLED
+        delta.orders.append(order)
         
         # Update Account & Position
         await self.update_account_and_position(
@@ -113,17 +137,21 @@ class MatchingEngine:
             order.leverage, 
             float(fee),
             order.take_profit_price,
-            order.stop_loss_price
+            order.stop_loss_price,
+            delta
         )
         
         await session.commit()
         
-        # Notify Client via WebSocket
-        await manager.send_personal_message({"type": "ACCOUNT_UPDATE"}, order.account_id)
+        # Notify Client via WebSocket (only what changed, no refetch needed)
+        await notifier.publish(delta.to_message(), order.account_id)
         
         logger.info(f"Executed trade for Order {order.id}: {order.side} {fill_qty} {order.symbol} @ {price} Fee: {fee}")
 
-    async def update_account_and_position(self, session: AsyncSession, account_id: int, symbol: str, side: OrderSide, price: float, quantity: float, leverage: int = 1, fee: float = 0.0, take_profit_price: float = None, stop_loss_price: float = None):
+    async def update_account_and_position(self, session: AsyncSession, account_id: int, symbol: str, side: OrderSide, price: float, quantity: float, leverage: int = 1, fee: float = 0.0, take_profit_price: float = None, stop_loss_price: float = None, delta: AccountDelta = None):
+        if delta is None:
+            delta = AccountDelta(account_id)
+
         # Convert inputs to Decimal
         d_price = Decimal(str(price))
         d_qty = Decimal(str(quantity))
@@ -169,6 +197,7 @@ class MatchingEngine:
                 initial_stop_loss_price=stop_loss_price
             )
             session.add(position)
+            delta.positions.append(position)
         else:
             # Existing Position
             d_pos_qty = Decimal(str(position.quantity))
@@ -200,6 +229,7 @@ class MatchingEngine:
                     position.quantity = float(total_qty)
                     position.margin = float(d_pos_margin + margin_required)
                     position.leverage = leverage
+                    delta.positions.append(position)
                 else: # SELL
                     # Close Long
                     close_qty = min(d_qty, d_pos_qty)
@@ -220,6 +250,7 @@ class MatchingEngine:
                     
                     if abs(d_pos_qty) < Decimal("1e-9"):
                         # Closed fully
+                        closed_at = datetime.now(timezone.utc)
                         history = PositionHistory(
                             account_id=account_id,
                             symbol=symbol,
@@ -231,10 +262,19 @@ class MatchingEngine:
                             realized_pnl=position.realized_pnl,
                             total_fee=position.accumulated_fees,
                             initial_stop_loss_price=position.initial_stop_loss_price,
-                            created_at=position.created_at
+                            created_at=position.created_at,
+                            # Set here rather than by the server default: SQLite's
+                            # CURRENT_TIMESTAMP has another text format than the
+                            # datetimes bound for keyset cursors, so they'd misorder
+                            closed_at=closed_at
                         )
                         session.add(history)
+                        await record_closed_position(session, history, closed_at)
+                        await record_closed_position_pnl(session, history, closed_at)
                         await session.delete(position)
+                        delta.closed_positions.append(position)
+                    else:
+                        delta.positions.append(position)
                         
                     if remaining_order_qty > 0:
                         # Open Short
@@ -254,6 +294,7 @@ class MatchingEngine:
                             initial_stop_loss_price=stop_loss_price
                         )
                         session.add(new_pos)
+                        delta.positions.append(new_pos)
             
             elif d_pos_qty < 0: # Currently SHORT
                 abs_qty = abs(d_pos_qty)
@@ -271,6 +312,7 @@ class MatchingEngine:
                     position.quantity = float(-total_qty)
                     position.margin = float(d_pos_margin + margin_required)
                     position.leverage = leverage
+                    delta.positions.append(position)
                 else: # BUY
                     # Close Short
                     close_qty = min(d_qty, abs_qty)
@@ -291,6 +333,7 @@ class MatchingEngine:
                     
                     if abs(d_pos_qty) < Decimal("1e-9"):
                         # Closed fully
+                        closed_at = datetime.now(timezone.utc)
                         history = PositionHistory(
                             account_id=account_id,
                             symbol=symbol,
@@ -302,10 +345,16 @@ class MatchingEngine:
                             realized_pnl=position.realized_pnl,
                             total_fee=position.accumulated_fees,
                             initial_stop_loss_price=position.initial_stop_loss_price,
-                            created_at=position.created_at
+                            created_at=position.created_at,
+                            closed_at=closed_at
                         )
                         session.add(history)
+                        await record_closed_position(session, history, closed_at)
+                        await record_closed_position_pnl(session, history, closed_at)
                         await session.delete(position)
+                        delta.closed_positions.append(position)
+                    else:
+                        delta.positions.append(position)
                         
                     if remaining_order_qty > 0:
                         # Open Long
@@ -324,8 +373,10 @@ class MatchingEngine:
                             stop_loss_price=stop_loss_price
                         )
                         session.add(new_pos)
+                        delta.positions.append(new_pos)
 
         account.balance = float(d_balance)
+        delta.balance = account.balance
 
     async def check_positions_tp_sl(self, session: AsyncSession):
         # Fetch all positions with TP or SL
@@ -362,9 +413,30 @@ class MatchingEngine:
                     close_reason = "SL"
 
             if should_close:
+                # A deposed leader may still be closing this position for a
+                # moment: re-read it under the account lock before ordering
+                await session.execute(select(Account.id).where(Account.id == position.account_id).with_for_update())
+                stmt = select(Position).where(Position.id == position.id).with_for_update().execution_options(populate_existing=True)
+                position = (await session.execute(stmt)).scalar_one_or_none()
+                if position is None or position.quantity == 0:
+                    await session.commit()
+                    continue
+
+                side = OrderSide.SELL if position.quantity > 0 else OrderSide.BUY
+                stmt = select(Order.id).where(
+                    Order.account_id == position.account_id,
+                    Order.symbol == position.symbol,
+                    Order.side == side,
+                    Order.order_type == OrderType.MARKET,
+                    Order.status.in_([OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED]),
+                ).limit(1)
+                if await session.scalar(stmt) is not None:
+                    await session.commit()
+                    logger.info(f"Position {position.id} already has a close order pending, skipping {close_reason}")
+                    continue
+
                 logger.info(f"Triggering {close_reason} for Position {position.id} {position.symbol} @ {current_price}")
                 # Create a Market Order to close the position
-                side = OrderSide.SELL if position.quantity > 0 else OrderSide.BUY
                 
                 # Create Order
                 close_order = Order(
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+from sqlalchemy import text
+from app.database import engine
+from app.config import settings
+from app.services.websocket_manager import manager, RESYNC_MESSAGE
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_PAYLOAD = 7900
+
+
+class AccountNotifier:
+    """
+    Publishes account messages to every API process.
+
+    On Postgres each process LISTENs on ACCOUNT_NOTIFY_CHANNEL and forwards
+    what it receives to its own sockets through `manager`, so a message is
+    published once no matter which process produced it. Without a listener
+    (other databases, or while the LISTEN connection is down) messages are
+    delivered to this process's sockets directly.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.running = False
+        self.listening = False
+        self._forward_tasks: set[asyncio.Task] = set()
+
+    async def start(self):
+        self.running = True
+        query_source.set("notifier")
+        if engine.dialect.name != "postgresql":
+            logger.info("Account notifier using local delivery only")
+            return
+
+        logger.info(f"Account notifier listening on channel '{self.channel}'")
+        while self.running:
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.error(f"Account notifier connection error: {e}")
+            finally:
+                self.listening = False
+
+            if self.running:
+                await asyncio.sleep(5) # Retry delay
+
+    def stop(self):
+        self.running = False
+
+    async def _listen(self):
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            driver_conn = raw.driver_connection
+            try:
+                await driver_conn.add_listener(self.channel, self._on_notify)
+                self.listening = True
+                while self.running:
+                    # Detect a dead connection; notifications arrive in the background
+                    await driver_conn.fetchval("SELECT 1")
+                    await asyncio.sleep(settings.ACCOUNT_NOTIFY_HEARTBEAT_INTERVAL)
+            finally:
+                # Never return a connection with a registered listener to the pool
+                await conn.invalidate()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.error(f"Invalid account notification payload: {payload[:200]}")
+            return
+
+        task = asyncio.create_task(manager.send_personal_message(data["message"], data["account_id"]))
+        self._forward_tasks.add(task)
+        task.add_done_callback(self._forward_tasks.discard)
+
+    async def publish(self, message: dict, account_id: int):
+        if self.listening:
+            payload = json.dumps({"account_id": account_id, "message": message})
+            size = len(payload.encode())
+            if size > NOTIFY_MAX_PAYLOAD:
+                # Too large for NOTIFY: clients refetch instead, and in-process
+                # listeners (the PnL stream) reload the account from the database
+                logger.warning(f"Account {account_id} {message.get('type')} is {size} bytes, sending a resync instead")
+                payload = json.dumps({"account_id": account_id, "message": RESYNC_MESSAGE})
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": self.channel, "payload": payload},
+                    )
+                    await conn.commit()
+                return
+            except Exception as e:
+                logger.error(f"NOTIFY failed, delivering account {account_id} message locally: {e}")
+
+        await manager.send_personal_message(message, account_id)
+
+
+notifier = AccountNotifier(channel=settings.ACCOUNT_NOTIFY_CHANNEL)
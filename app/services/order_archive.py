@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models import Order, OrderArchive, OrderStatus, Trade, TradeArchive
+from app.config import settings
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = (OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED)
+
+
+def _copy(source, target, key, ids: list[int]):
+    columns = [c.name for c in source.__table__.columns]
+    rows = select(*(source.__table__.c[name] for name in columns)).where(key.in_(ids))
+    return insert(target).from_select(columns, rows)
+
+
+class OrderArchiver:
+    """
+    Moves orders that reached a terminal status (and their trades) from the
+    hot orders / trades tables into orders_archive / trades_archive, in
+    batches, once they have not changed for ORDER_ARCHIVE_AFTER seconds.
+    """
+
+    def __init__(self):
+        self.running = False
+
+    async def start(self):
+        self.running = True
+        query_source.set("order_archiver")
+        logger.info("Order Archiver started")
+        while self.running:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await self.archive(session)
+            except Exception as e:
+                logger.error(f"Error in order archiver: {e}")
+
+            await asyncio.sleep(settings.ORDER_ARCHIVE_INTERVAL)
+
+    def stop(self):
+        self.running = False
+
+    async def archive(self, session: AsyncSession) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.ORDER_ARCHIVE_AFTER)
+        total = 0
+        while True:
+            stmt = select(Order.id).where(
+                Order.status.not_in(OPEN_STATUSES),
+                Order.updated_at < cutoff,
+            ).limit(settings.ORDER_ARCHIVE_BATCH_SIZE).with_for_update(skip_locked=True)
+            ids = list((await session.execute(stmt)).scalars().all())
+            if not ids:
+                break
+
+            # Copy orders before their trades, delete trades before their orders (FKs)
+            await session.execute(_copy(Order, OrderArchive, Order.id, ids))
+            await session.execute(_copy(Trade, TradeArchive, Trade.order_id, ids))
+            await session.execute(delete(Trade).where(Trade.order_id.in_(ids)))
+            await session.execute(delete(Order).where(Order.id.in_(ids)))
+            await session.commit()
+            total += len(ids)
+            if len(ids) < settings.ORDER_ARCHIVE_BATCH_SIZE:
+                break
+
+        if total:
+            logger.info(f"Archived {total} orders")
+        return total
+
+
+order_archiver = OrderArchiver()
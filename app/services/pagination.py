@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Response headers carrying the cursors
+NEXT_CURSOR_HEADER = "X-Next-Cursor" # Older rows: pass back as `cursor`
+SINCE_CURSOR_HEADER = "X-Since-Cursor" # Newer / changed rows: pass back as `since`
+
+# Cursor kinds, so one passed to the wrong parameter is rejected
+NEXT = "next"
+SINCE = "since"
+
+
+def encode_cursor(kind: str, row_id: int, timestamp: datetime | None = None) -> str:
+    """Opaque keyset position: (timestamp, id), or just id when timestamp is None."""
+    payload = [kind, timestamp.isoformat() if timestamp else None, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(kind: str, cursor: str) -> tuple[datetime | None, int]:
+    """Inverse of encode_cursor. Raises ValueError on malformed cursors or cursors of another kind."""
+    try:
+        cursor_kind, timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key = (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if cursor_kind != kind:
+        header = SINCE_CURSOR_HEADER if kind == SINCE else NEXT_CURSOR_HEADER
+        raise ValueError(f"Not a {kind} cursor, pass {header} here")
+    return key
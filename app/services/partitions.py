@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, select, func
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database import engine
+from app.models import EquityRollup
+from app.config import settings
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+# Parent table -> partition key column (see the models' postgresql_partition_by)
+PARTITIONED_TABLES = {
+    "equity_history": "timestamp",
+    "position_history": "closed_at",
+}
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(timestamp: datetime, months: int = 0) -> datetime:
+    """First instant (UTC) of the month `months` away from timestamp's month."""
+    index = timestamp.year * 12 + timestamp.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start.year:04d}{start.month:02d}"
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    found = await conn.scalar(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+    )
+    return found is not None
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> dict[str, datetime]:
+    """Attached monthly partitions of `table`: name -> month start."""
+    rows = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+    partitions = {}
+    for (name,) in rows.all():
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions[name] = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+    return partitions
+
+
+async def create_current_partitions(conn: AsyncConnection, now: datetime = None) -> list[str]:
+    """
+    Creates the current month and PARTITION_PREMAKE_MONTHS ahead for every
+    partitioned table. Runs in init_db too, so inserts have somewhere to land
+    before the partition manager's first pass. Returns the partitioned tables.
+    """
+    now = now or datetime.now(timezone.utc)
+    tables = [table for table in PARTITIONED_TABLES if await is_partitioned(conn, table)]
+    for table in tables:
+        existing = await list_partitions(conn, table)
+        for months in range(settings.PARTITION_PREMAKE_MONTHS + 1):
+            start = month_start(now, months)
+            name = partition_name(table, start)
+            if name in existing:
+                continue
+            end = month_start(start, 1)
+            await conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            logger.info(f"Created partition {name}")
+    return tables
+
+
+class PartitionManager:
+    """
+    Maintains the monthly range partitions of equity_history and
+    position_history (Postgres only):
+
+    - rolls the current month and PARTITION_PREMAKE_MONTHS ahead forward
+      (init_db creates them at startup), so inserts always have a partition
+      to land in (there is no default one);
+    - drops whole equity_history months that are past raw retention and
+      already rolled up (see equity_rollup), instead of row-by-row deletes;
+    - detaches position_history months older than
+      POSITION_HISTORY_DETACH_AFTER_MONTHS (0 keeps everything attached).
+      Detached months stay as standalone tables for the operator to dump
+      or drop.
+
+    Tables created before partitioning was introduced are left untouched
+    (see DEPLOY.md for the migration).
+    """
+
+    def __init__(self):
+        self.running = False
+
+    async def start(self):
+        self.running = True
+        query_source.set("partition_manager")
+        logger.info("Partition Manager started")
+        while self.running:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Error in partition manager: {e}")
+
+            await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL)
+
+    def stop(self):
+        self.running = False
+
+    async def maintain(self, now: datetime = None):
+        if engine.dialect.name != "postgresql":
+            return
+        now = now or datetime.now(timezone.utc)
+
+        async with engine.begin() as conn:
+            tables = await create_current_partitions(conn, now)
+            for table in PARTITIONED_TABLES:
+                if table not in tables:
+                    logger.warning(f"{table} is not partitioned, skipping partition maintenance")
+
+        if "equity_history" in tables:
+            await self.drop_rolled_up_equity(now)
+        if "position_history" in tables and settings.POSITION_HISTORY_DETACH_AFTER_MONTHS > 0:
+            await self.detach_old_positions(now)
+
+    async def drop_rolled_up_equity(self, now: datetime):
+        async with engine.connect() as conn:
+            latest_hour = await conn.scalar(
+                select(func.max(EquityRollup.bucket_start)).where(EquityRollup.resolution == "1h")
+            )
+            await conn.rollback()
+        if latest_hour is None:
+            return
+        # Only months entirely past retention and covered by hourly bars
+        cutoff = min(now - timedelta(days=settings.EQUITY_RAW_RETENTION_DAYS), latest_hour)
+        await self._detach("equity_history", cutoff, drop=True)
+
+    async def detach_old_positions(self, now: datetime):
+        cutoff = month_start(now, -settings.POSITION_HISTORY_DETACH_AFTER_MONTHS)
+        await self._detach("position_history", cutoff, drop=False)
+
+    async def _detach(self, table: str, cutoff: datetime, drop: bool):
+        """Detach (and optionally drop) the partitions of `table` that end before cutoff."""
+        async with engine.connect() as conn:
+            # DETACH ... CONCURRENTLY cannot run inside a transaction block
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for name, start in sorted((await list_partitions(conn, table)).items()):
+                if month_start(start, 1) > cutoff:
+                    continue
+                await conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}" CONCURRENTLY'))
+                if drop:
+                    await conn.execute(text(f'DROP TABLE "{name}"'))
+                logger.info(f"{'Dropped' if drop else 'Detached'} partition {name} (before {cutoff})")
+
+
+partition_manager = PartitionManager()
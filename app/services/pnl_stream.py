@@ -0,0 +1,201 @@
+import asyncio
+import logging
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.database import AsyncSessionLocal
+from app.models import Account
+from app.config import settings
+from app.services.binance_ws import get_current_price
+from app.services.websocket_manager import manager, RESYNC_MESSAGE
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+
+class AccountMarkState:
+    """Open positions and balance of one account, kept in memory for mark-to-market."""
+
+    def __init__(self, balance: float):
+        self.balance = balance
+        # position_id -> {"symbol", "quantity", "entry_price", "margin"}
+        self.positions: dict[int, dict] = {}
+        self.last_pushed: dict | None = None
+
+    def set_position(self, position: dict):
+        self.positions[position["id"]] = {
+            "symbol": position["symbol"],
+            "quantity": position["quantity"],
+            "entry_price": position["entry_price"],
+            "margin": position["margin"],
+        }
+
+    def symbols(self) -> set[str]:
+        return {p["symbol"] for p in self.positions.values()}
+
+    def snapshot(self) -> dict:
+        total_unrealized_pnl = 0.0
+        total_margin_used = 0.0
+        positions = []
+
+        for position_id, pos in self.positions.items():
+            total_margin_used += pos["margin"]
+            current_price = get_current_price(pos["symbol"])
+            # Same formula as calculate_account_metrics: quantity is negative for shorts
+            unrealized_pnl = (current_price - pos["entry_price"]) * pos["quantity"] if current_price else 0.0
+            total_unrealized_pnl += unrealized_pnl
+            positions.append({"id": position_id, "symbol": pos["symbol"], "unrealized_pnl": unrealized_pnl})
+
+        return {
+            "balance": self.balance,
+            "equity": self.balance + total_margin_used + total_unrealized_pnl,
+            "unrealized_pnl": total_unrealized_pnl,
+            "margin_used": total_margin_used,
+            "positions": positions,
+        }
+
+
+class PnLStream:
+    """
+    Pushes throttled ACCOUNT_PNL updates (equity, unrealized PnL, margin) to
+    accounts that have an open WebSocket in this process.
+
+    State is loaded from the database once per connected account and then kept
+    current from ACCOUNT_DELTA messages, so a price tick only costs a
+    recomputation for the accounts holding that symbol. An ACCOUNT_UPDATE
+    resync means a delta was dropped, so the account is loaded again.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.accounts: dict[int, AccountMarkState] = {}
+        self.dirty: set[int] = set()
+        self._symbol_index: dict[str, set[int]] = {}
+        self._last_prices: dict[str, float | None] = {}
+        # Messages for accounts whose state is being loaded, applied once it is
+        self._loading: dict[int, list[dict]] = {}
+
+    async def start(self):
+        self.running = True
+        query_source.set("pnl_stream")
+        logger.info("PnL Stream started")
+        while self.running:
+            try:
+                await self.sync_tracked_accounts()
+                await self.push_updates()
+            except Exception as e:
+                logger.error(f"Error in PnL stream: {e}")
+
+            await asyncio.sleep(settings.PNL_PUSH_INTERVAL)
+
+    def stop(self):
+        self.running = False
+
+    def on_account_message(self, message: dict, account_id: int):
+        pending = self._loading.get(account_id)
+        if pending is not None:
+            # The load may have read the database before this change committed
+            pending.append(message)
+            return
+        self._apply(message, account_id)
+
+    def _apply(self, message: dict, account_id: int):
+        if message.get("type") == RESYNC_MESSAGE["type"]:
+            # The delta itself was dropped (e.g. too large for NOTIFY): reload on the next sync
+            if self.accounts.pop(account_id, None) is not None:
+                self._rebuild_symbol_index()
+            return
+
+        state = self.accounts.get(account_id)
+        if state is None or message.get("type") != "ACCOUNT_DELTA":
+            return
+
+        if message.get("balance") is not None:
+            state.balance = message["balance"]
+        for position in message.get("positions", []):
+            state.set_position(position)
+        for position_id in message.get("closed_positions", []):
+            state.positions.pop(position_id, None)
+
+        self.dirty.add(account_id)
+        self._rebuild_symbol_index()
+
+    async def sync_tracked_accounts(self):
+        connected = set(manager.active_connections.keys())
+
+        for account_id in set(self.accounts) - connected:
+            del self.accounts[account_id]
+
+        new_ids = connected - set(self.accounts)
+        if new_ids:
+            self._loading = {account_id: [] for account_id in new_ids}
+            try:
+                await self._load_accounts(new_ids)
+            finally:
+                loading, self._loading = self._loading, {}
+            # Deltas carry absolute values, so replaying one the load already saw is harmless
+            for account_id, messages in loading.items():
+                for message in messages:
+                    self._apply(message, account_id)
+
+        self._rebuild_symbol_index()
+
+    async def _load_accounts(self, account_ids: set[int]):
+        async with AsyncSessionLocal() as session:
+            stmt = select(Account).options(selectinload(Account.positions)).where(Account.id.in_(account_ids))
+            result = await session.execute(stmt)
+            for account in result.scalars().all():
+                state = AccountMarkState(account.balance)
+                for pos in account.positions:
+                    state.set_position({
+                        "id": pos.id,
+                        "symbol": pos.symbol,
+                        "quantity": pos.quantity,
+                        "entry_price": pos.entry_price,
+                        "margin": pos.margin,
+                    })
+                self.accounts[account.id] = state
+                self.dirty.add(account.id)
+
+    async def push_updates(self):
+        affected = set(self.dirty)
+        self.dirty.clear()
+
+        for symbol, account_ids in self._symbol_index.items():
+            price = get_current_price(symbol)
+            if price != self._last_prices.get(symbol):
+                self._last_prices[symbol] = price
+                affected |= account_ids
+
+        for account_id in affected:
+            state = self.accounts.get(account_id)
+            if state is None:
+                continue
+
+            snapshot = state.snapshot()
+            if not self._changed_meaningfully(state.last_pushed, snapshot):
+                continue
+
+            state.last_pushed = snapshot
+            await manager.send_personal_message({"type": "ACCOUNT_PNL", "account_id": account_id, **snapshot}, account_id)
+
+    def _changed_meaningfully(self, last: dict | None, current: dict) -> bool:
+        if last is None:
+            return True
+        if len(last["positions"]) != len(current["positions"]):
+            return True
+        threshold = settings.PNL_PUSH_MIN_CHANGE
+        return any(
+            abs(current[key] - last[key]) >= threshold
+            for key in ("balance", "equity", "unrealized_pnl", "margin_used")
+        )
+
+    def _rebuild_symbol_index(self):
+        index: dict[str, set[int]] = {}
+        for account_id, state in self.accounts.items():
+            for symbol in state.symbols():
+                index.setdefault(symbol, set()).add(account_id)
+        self._symbol_index = index
+
+
+pnl_stream = PnLStream()
+manager.add_listener(pnl_stream.on_account_message)
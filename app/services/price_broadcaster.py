@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+import time
+from fastapi import WebSocket
+from app.config import settings
+from app.services.binance_ws import get_all_prices as get_binance_prices
+from app.services.coinbase_ws import get_all_coinbase_prices
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSubscriber:
+    def __init__(self, websocket: WebSocket, symbols: set[str] | None, max_rate: float):
+        self.websocket = websocket
+        # None = all symbols
+        self.symbols = symbols
+        # 0 = send on every broadcast tick
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        # Symbols whose latest price has not been sent to this client yet
+        self.pending: set[str] = set()
+        self.last_sent = 0.0
+        self.send_task: asyncio.Task | None = None
+
+    def wants(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
+
+class PriceBroadcaster:
+    """
+    Single loop feeding every /market/ws/prices client.
+
+    Each tick it diffs the merged Binance/Coinbase caches against the last
+    broadcast and queues only changed symbols for the clients subscribed to
+    them. Each symbol's JSON fragment is serialized once per change; client
+    payloads are assembled by joining fragments, and clients with the same
+    pending set share one payload string. Clients are throttled to their
+    max rate, with changes batched until their next send.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.subscribers: set[PriceSubscriber] = set()
+        self._last_prices: dict[str, float] = {}
+        # symbol -> '"SYMBOL": price'
+        self._fragments: dict[str, str] = {}
+
+    async def start(self):
+        self.running = True
+        logger.info("Price Broadcaster started")
+        while self.running:
+            try:
+                self.broadcast()
+            except Exception as e:
+                logger.error(f"Error in price broadcaster: {e}")
+
+            await asyncio.sleep(settings.PRICE_BROADCAST_INTERVAL)
+
+    def stop(self):
+        self.running = False
+
+    def subscribe(self, websocket: WebSocket, symbols: list[str] | None = None, max_rate: float | None = None) -> PriceSubscriber:
+        if max_rate is None:
+            max_rate = settings.PRICE_STREAM_MAX_RATE
+        subscriber = PriceSubscriber(websocket, set(symbols) if symbols else None, max_rate)
+        self.subscribers.add(subscriber)
+        # First message is a snapshot of everything the client asked for
+        subscriber.pending = {s for s in self._last_prices if subscriber.wants(s)}
+        return subscriber
+
+    def unsubscribe(self, subscriber: PriceSubscriber):
+        self.subscribers.discard(subscriber)
+        if subscriber.send_task and not subscriber.send_task.done():
+            subscriber.send_task.cancel()
+
+    def update_symbols(self, subscriber: PriceSubscriber, add: list[str] = (), remove: list[str] = ()):
+        if subscriber.symbols is None:
+            # Switching from "all" to an explicit list
+            subscriber.symbols = set()
+            subscriber.pending.clear()
+        subscriber.symbols |= set(add)
+        subscriber.symbols -= set(remove)
+        subscriber.pending -= set(remove)
+        subscriber.pending |= {s for s in add if s in self._last_prices}
+
+    def broadcast(self):
+        merged = {**get_binance_prices(), **get_all_coinbase_prices()}
+        changed = [s for s, p in merged.items() if self._last_prices.get(s) != p]
+        for symbol in changed:
+            price = merged[symbol]
+            self._last_prices[symbol] = price
+            self._fragments[symbol] = f"{json.dumps(symbol)}: {json.dumps(price)}"
+
+        now = time.monotonic()
+        payloads: dict[frozenset, str] = {}
+
+        for subscriber in list(self.subscribers):
+            subscriber.pending.update(s for s in changed if subscriber.wants(s))
+            if not subscriber.pending:
+                continue
+            if now - subscriber.last_sent < subscriber.min_interval:
+                continue
+            if subscriber.send_task and not subscriber.send_task.done():
+                # Previous send still in flight: keep batching
+                continue
+
+            key = frozenset(subscriber.pending)
+            if key not in payloads:
+                payloads[key] = "{" + ", ".join(self._fragments[s] for s in key) + "}"
+
+            subscriber.pending = set()
+            subscriber.last_sent = now
+            subscriber.send_task = asyncio.create_task(self._send(subscriber, payloads[key]))
+
+    async def _send(self, subscriber: PriceSubscriber, payload: str):
+        try:
+            await asyncio.wait_for(subscriber.websocket.send_text(payload), timeout=settings.WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Dropping price subscriber after failed send: {e}")
+            self.subscribers.discard(subscriber)
+            try:
+                await subscriber.websocket.close()
+            except Exception:
+                pass
+
+
+price_broadcaster = PriceBroadcaster()
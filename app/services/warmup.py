@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+import aiohttp
+from sqlalchemy import select, func, text
+from app.database import engine, AsyncSessionLocal
+from app.models import Order, OrderStatus, Position
+from app.config import settings
+from app.routers.market import fetch_klines, COINBASE_INTERVAL_MAP
+from app.services.binance_ws import binance_ws_service, get_current_price
+from app.services.coinbase_ws import coinbase_ws_service
+from app.services.candle_cache import candle_cache
+from app.services.db_metrics import query_source
+
+logger = logging.getLogger(__name__)
+
+COINBASE_MAX_KLINES = 300
+
+
+async def _ping_database():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+class WarmUp:
+    """
+    Startup work that would otherwise land on the first requests:
+
+    - prices: one REST snapshot, so prices exist before the first aggTrade
+    - database: opens the pool's connections and scans the open orders and
+      positions, which the matching engine reads every tick, into the
+      database's cache
+    - klines: the hot chart series (WARMUP_KLINE_INTERVALS of every streamed
+      symbol) into the candle cache
+
+    A failed or timed out step is logged and skipped; it does not block
+    startup. Leader services start once the warm-up finished.
+    """
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.steps: dict[str, str] = {}
+        self.duration: float | None = None
+
+    async def run(self):
+        query_source.set("warmup")
+        started = time.monotonic()
+        timeout = aiohttp.ClientTimeout(total=settings.WARMUP_STEP_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            await asyncio.gather(
+                self._step("prices", self.seed_prices(session)),
+                self._step("database", self.warm_database()),
+                self._step("klines", self.prefetch_klines()),
+            )
+        self.duration = round(time.monotonic() - started, 3)
+        self.done.set()
+        logger.info(f"Warm-up finished in {self.duration}s: {self.steps}")
+
+    async def _step(self, name: str, coro):
+        try:
+            self.steps[name] = await asyncio.wait_for(coro, settings.WARMUP_STEP_TIMEOUT)
+        except Exception as e:
+            self.steps[name] = f"failed: {str(e) or type(e).__name__}"
+            logger.warning(f"Warm-up step {name} failed: {e!r}")
+
+    async def seed_prices(self, session: aiohttp.ClientSession) -> str:
+        results = await asyncio.gather(
+            binance_ws_service.seed_prices(session),
+            coinbase_ws_service.seed_prices(session),
+            return_exceptions=True,
+        )
+        summary = []
+        for feed, result in zip(("binance", "coinbase"), results):
+            if isinstance(result, Exception):
+                logger.warning(f"{feed} price snapshot failed: {result!r}")
+                summary.append(f"{feed} failed")
+            else:
+                summary.append(f"{result} {feed} prices seeded")
+        return ", ".join(summary)
+
+    async def warm_database(self) -> str:
+        # Concurrent checkouts make the pool open its connections now
+        connections = settings.DB_POOL_SIZE if engine.dialect.name == "postgresql" else 1
+        await asyncio.gather(*(_ping_database() for _ in range(connections)))
+
+        async with AsyncSessionLocal() as session:
+            orders = await session.scalar(
+                select(func.count()).select_from(Order).where(
+                    Order.status.in_([OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED])
+                )
+            )
+            positions = await session.scalar(select(func.count()).select_from(Position))
+        return f"{connections} connections, {orders} open orders, {positions} positions"
+
+    async def prefetch_klines(self) -> str:
+        intervals = [i.strip() for i in settings.WARMUP_KLINE_INTERVALS.split(",") if i.strip()]
+        series = [("BINANCE", s.upper(), i, settings.WARMUP_KLINE_LIMIT) for s in binance_ws_service.symbols for i in intervals]
+        series += [
+            ("COINBASE", p, i, min(settings.WARMUP_KLINE_LIMIT, COINBASE_MAX_KLINES))
+            for p in coinbase_ws_service.product_ids for i in intervals if i in COINBASE_INTERVAL_MAP
+        ]
+        semaphore = asyncio.Semaphore(settings.WARMUP_KLINE_CONCURRENCY)
+
+        async def prefetch(exchange: str, symbol: str, interval: str, limit: int):
+            async with semaphore:
+                klines = await fetch_klines(symbol, interval, limit, None, exchange)
+            candle_cache.merge_klines(exchange, symbol, interval, klines)
+
+        results = await asyncio.gather(*(prefetch(*s) for s in series), return_exceptions=True)
+        failed = [s[:3] for s, r in zip(series, results) if isinstance(r, Exception)]
+        if failed:
+            logger.warning(f"Kline prefetch failed for {failed}")
+        return f"{len(series) - len(failed)}/{len(series)} series"
+
+    async def readiness(self) -> dict:
+        """Ready once warmed up, the database answers and every streamed Binance symbol has a price."""
+        checks = {"warmup": self.done.is_set()}
+        try:
+            await asyncio.wait_for(_ping_database(), settings.HEALTH_CHECK_TIMEOUT)
+            checks["database"] = True
+        except Exception as e:
+            checks["database"] = False
+            logger.warning(f"Readiness database check failed: {e!r}")
+
+        # The matching engine and the equity recorder price everything from this feed
+        missing = sorted(s.upper() for s in binance_ws_service.symbols if get_current_price(s) is None)
+        checks["prices"] = not missing
+
+        return {
+            "ready": all(checks.values()),
+            "checks": checks,
+            "missing_prices": missing,
+            "warmup": {"steps": self.steps, "duration": self.duration},
+        }
+
+
+warmup = WarmUp()
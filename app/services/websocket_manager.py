@@ -1,39 +1,115 @@
-from typing import Dict, List
+from typing import Callable, Deque, Dict, List, Tuple
+from collections import deque
 from fastapi import WebSocket
 import asyncio
 import json
+from app.config import settings
+
+# Sent instead of a backlog the client could not keep up with: refetch everything
+RESYNC_MESSAGE = {"type": "ACCOUNT_UPDATE"}
+
+# Snapshot messages where only the newest pending one matters
+COALESCED_TYPES = {"ACCOUNT_PNL"}
+
+class AccountConnection:
+    """
+    One account socket with its own bounded outbound queue, drained by a
+    dedicated writer task, so producers (matching engine, routers) never
+    await a client's network send.
+    """
+
+    def __init__(self, websocket: WebSocket, account_id: int, on_failure: Callable[["AccountConnection"], None]):
+        self.websocket = websocket
+        self.account_id = account_id
+        self.on_failure = on_failure
+        # (message type, serialized message)
+        self.pending: Deque[Tuple[str, str]] = deque()
+        self.wakeup = asyncio.Event()
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def enqueue(self, message_type: str, text: str):
+        if message_type in COALESCED_TYPES:
+            for i, (pending_type, _) in enumerate(self.pending):
+                if pending_type == message_type:
+                    self.pending[i] = (message_type, text)
+                    return
+
+        if len(self.pending) >= settings.WS_SEND_QUEUE_SIZE:
+            # Client is falling behind: collapse the backlog into a single resync
+            self.pending.clear()
+            self.pending.append((RESYNC_MESSAGE["type"], json.dumps(RESYNC_MESSAGE)))
+        else:
+            self.pending.append((message_type, text))
+        self.wakeup.set()
+
+    async def _writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending:
+                    _, text = self.pending.popleft()
+                    await asyncio.wait_for(self.websocket.send_text(text), timeout=settings.WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"WS Error sending to {self.account_id}, evicting client: {e}")
+            self.on_failure(self)
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self.writer_task.cancel()
 
 class AccountWebSocketManager:
     def __init__(self):
-        # account_id -> List[WebSocket]
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        # account_id -> List[AccountConnection]
+        self.active_connections: Dict[int, List[AccountConnection]] = {}
+        # In-process observers of every account message, e.g. the PnL stream
+        # keeping its mark-to-market state in sync with ACCOUNT_DELTA pushes
+        self.listeners: List[Callable[[dict, int], None]] = []
+
+    def add_listener(self, callback: Callable[[dict, int], None]):
+        self.listeners.append(callback)
 
     async def connect(self, websocket: WebSocket, account_id: int):
         await websocket.accept()
         if account_id not in self.active_connections:
             self.active_connections[account_id] = []
-        self.active_connections[account_id].append(websocket)
+        self.active_connections[account_id].append(AccountConnection(websocket, account_id, self._evict))
         print(f"WS: Client connected to account {account_id}. Total clients: {len(self.active_connections[account_id])}")
 
     def disconnect(self, websocket: WebSocket, account_id: int):
-        if account_id in self.active_connections:
-            if websocket in self.active_connections[account_id]:
-                self.active_connections[account_id].remove(websocket)
-            if not self.active_connections[account_id]:
-                del self.active_connections[account_id]
+        for connection in list(self.active_connections.get(account_id, [])):
+            if connection.websocket is websocket:
+                self._remove(connection)
+                connection.close()
         print(f"WS: Client disconnected from account {account_id}")
 
+    def _evict(self, connection: AccountConnection):
+        # Called from the connection's own writer task after a failed send
+        self._remove(connection)
+
+    def _remove(self, connection: AccountConnection):
+        connections = self.active_connections.get(connection.account_id)
+        if connections is None:
+            return
+        if connection in connections:
+            connections.remove(connection)
+        if not connections:
+            del self.active_connections[connection.account_id]
+
     async def send_personal_message(self, message: dict, account_id: int):
+        for listener in self.listeners:
+            listener(message, account_id)
+
         if account_id in self.active_connections:
-            # Broadcast to all connections for this account (e.g. multiple tabs)
-            # We clone the list to avoid issues if a client disconnects during iteration
+            # Serialize once, then hand off to each connection's queue (e.g. multiple tabs).
+            # Never awaits a client send, so a slow tab cannot stall the caller.
+            text = json.dumps(message)
             for connection in list(self.active_connections[account_id]):
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"WS Error sending to {account_id}: {e}")
-                    # Usually disconnect() is called by the endpoint handling the 'receive' loop,
-                    # but if send fails, we might want to clean up too? 
-                    # For now, let the receive loop handle disconnection.
+                connection.enqueue(message.get("type"), text)
 
 manager = AccountWebSocketManager()
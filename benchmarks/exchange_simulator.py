@@ -0,0 +1,382 @@
+"""
+Local stand-in for the Binance Futures and Coinbase endpoints the backend
+uses, so load tests run without network access:
+
+  Binance   WS   /stream?streams=btcusdt@aggTrade/...   combined aggTrade streams
+            WS   /ws/btcusdt@kline_1m                   kline stream
+            REST /fapi/v1/klines, /fapi/v1/ticker/price
+  Coinbase  WS   /coinbase                              ticker channel
+            REST /products/{id}/candles, /products/{id}/ticker
+
+Every symbol follows a deterministic price path (slow waves plus hashed
+noise), so klines are the same across requests and restarts. Trades and
+tickers are sampled from it at --rate / --coinbase-rate messages per
+second, round-robin over the subscribed symbols, or replayed in a loop
+from a CSV of symbol,price,quantity rows (--replay; symbols with a "-"
+go to the Coinbase ticker channel).
+
+Run from the repository root:
+
+    python -m benchmarks.exchange_simulator [--port 9100] [--rate 20000] [--coinbase-rate 1000]
+
+and point the backend at it:
+
+    BINANCE_WS_URL=ws://localhost:9100 BINANCE_API_URL=http://localhost:9100 \\
+    COINBASE_WS_URL=ws://localhost:9100/coinbase COINBASE_API_URL=http://localhost:9100 \\
+    uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import math
+import random
+import time
+import zlib
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800, "12h": 43200,
+    "1d": 86400, "3d": 259200, "1w": 604800,
+}
+BASE_PRICES = {"BTC": 60_000.0, "ETH": 3_000.0, "SOL": 150.0}
+DEFAULT_BINANCE_SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+TICK_BATCH_SECONDS = 0.01
+KLINE_PUSH_SECONDS = 0.25 # Binance pushes kline updates every 250ms
+SAMPLES_PER_CANDLE = 8
+MAX_BINANCE_KLINES = 1500
+MAX_COINBASE_CANDLES = 300
+
+
+def asset_of(symbol: str) -> str:
+    """BTCUSDT, BTC-USD and BTC-PERP all follow the BTC path."""
+    symbol = symbol.upper().split("-")[0]
+    for quote in ("USDT", "USDC", "USD"):
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)]
+    return symbol
+
+
+class PricePath:
+    """Price of one asset at any time, without state: the same inputs give the same candles."""
+
+    def __init__(self, asset: str):
+        self.seed = zlib.crc32(asset.encode())
+        self.base = BASE_PRICES.get(asset, 1.0 + self.seed % 1000)
+        rng = random.Random(self.seed)
+        # (amplitude in log price, period in seconds, phase)
+        self.waves = [(rng.uniform(0.002, 0.03), rng.uniform(600, 7 * 86400), rng.uniform(0, 2 * math.pi)) for _ in range(4)]
+
+    def _noise(self, key: str) -> float:
+        return zlib.crc32(f"{self.seed}:{key}".encode()) / 0xFFFFFFFF - 0.5
+
+    def price(self, t: float) -> float:
+        """Price at epoch second t."""
+        x = sum(a * math.sin(2 * math.pi * t / period + phase) for a, period, phase in self.waves)
+        return round(self.base * math.exp(x + 0.001 * self._noise(str(int(t)))), 4)
+
+    def candle(self, open_ms: int, step_ms: int, until_ms: int | None = None) -> tuple:
+        """(open, high, low, close, volume) of the candle opening at open_ms, up to until_ms if still forming."""
+        end = open_ms + step_ms if until_ms is None else min(until_ms, open_ms + step_ms)
+        prices = [self.price((open_ms + (end - open_ms) * i / SAMPLES_PER_CANDLE) / 1000) for i in range(SAMPLES_PER_CANDLE + 1)]
+        volume = (self._noise(f"v:{open_ms}:{step_ms}") + 0.5) * 100 * step_ms / 60_000 * (end - open_ms) / step_ms
+        return prices[0], max(prices), min(prices), prices[-1], round(volume, 3)
+
+
+class ExchangeSimulator:
+    def __init__(self, rate: float, coinbase_rate: float, replay: list[tuple] | None = None):
+        self.rate = rate
+        self.coinbase_rate = coinbase_rate
+        self.paths: dict[str, PricePath] = {}
+        # Symbol -> sockets subscribed to its aggTrade / ticker stream
+        self.binance_subscribers: dict[str, set[web.WebSocketResponse]] = {}
+        self.coinbase_subscribers: dict[str, set[web.WebSocketResponse]] = {}
+        self.kline_streams = 0
+        self.sent = {"aggTrade": 0, "ticker": 0, "kline": 0, "rest": 0}
+        self._trade_ids = itertools.count(1)
+        self._sequence = itertools.count()
+        binance_rows = [r for r in replay or () if "-" not in r[0]]
+        coinbase_rows = [r for r in replay or () if "-" in r[0]]
+        self._replay_binance = itertools.cycle(binance_rows) if binance_rows else None
+        self._replay_coinbase = itertools.cycle(coinbase_rows) if coinbase_rows else None
+
+    def path(self, symbol: str) -> PricePath:
+        asset = asset_of(symbol)
+        path = self.paths.get(asset)
+        if path is None:
+            path = self.paths[asset] = PricePath(asset)
+        return path
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/stream", self.binance_stream),
+            web.get("/ws/{stream}", self.binance_kline_stream),
+            web.get("/fapi/v1/klines", self.binance_klines),
+            web.get("/fapi/v1/ticker/price", self.binance_ticker_price),
+            web.get("/coinbase", self.coinbase_ws),
+            web.get("/products/{product_id}/candles", self.coinbase_candles),
+            web.get("/products/{product_id}/ticker", self.coinbase_ticker),
+        ])
+        app.on_startup.append(self._start_background)
+        return app
+
+    async def _start_background(self, app: web.Application):
+        app["tasks"] = [
+            asyncio.create_task(self._tick_loop(self.rate, self.binance_subscribers, self._aggtrade, self._replay_binance, "aggTrade")),
+            asyncio.create_task(self._tick_loop(self.coinbase_rate, self.coinbase_subscribers, self._ticker, self._replay_coinbase, "ticker")),
+            asyncio.create_task(self._report()),
+        ]
+
+    # Ticks
+
+    def _aggtrade(self, symbol: str, price: float, quantity: float, now_ms: int) -> str:
+        trade_id = next(self._trade_ids)
+        return (
+            f'{{"stream":"{symbol.lower()}@aggTrade","data":{{"e":"aggTrade","E":{now_ms},"s":"{symbol}",'
+            f'"a":{trade_id},"p":"{price}","q":"{quantity}","f":{trade_id},"l":{trade_id},"T":{now_ms},"m":false}}}}'
+        )
+
+    def _ticker(self, product_id: str, price: float, quantity: float, now_ms: int) -> str:
+        timestamp = datetime.fromtimestamp(now_ms / 1000, timezone.utc).isoformat().replace("+00:00", "Z")
+        return (
+            f'{{"channel":"ticker","client_id":"","timestamp":"{timestamp}","sequence_num":{next(self._sequence)},'
+            f'"events":[{{"type":"update","tickers":[{{"type":"ticker","product_id":"{product_id}","price":"{price}",'
+            f'"volume_24_h":"{quantity}"}}]}}]}}'
+        )
+
+    async def _tick_loop(self, rate: float, subscribers: dict, make_message, replay, kind: str):
+        """Send `rate` messages per second in small batches, round-robin over the subscribed symbols."""
+        owed = 0.0
+        last = time.monotonic()
+        turn = itertools.count()
+        while True:
+            await asyncio.sleep(TICK_BATCH_SECONDS)
+            now = time.monotonic()
+            # At most one second of backlog when sending falls behind
+            owed = min(owed + (now - last) * rate, rate)
+            last = now
+            symbols = [symbol for symbol, sockets in subscribers.items() if sockets]
+            if not symbols or (replay is None and rate <= 0):
+                owed = 0.0
+                continue
+
+            count = int(owed)
+            owed -= count
+            now_ms = int(time.time() * 1000)
+            for _ in range(count):
+                if replay is not None:
+                    symbol, price, quantity = next(replay)
+                else:
+                    symbol = symbols[next(turn) % len(symbols)]
+                    price = round(self.path(symbol).price(now_ms / 1000) * (1 + random.gauss(0, 1e-4)), 4)
+                    quantity = round(random.expovariate(10), 3)
+                message = make_message(symbol, price, quantity, now_ms)
+                for ws in list(subscribers.get(symbol, ())):
+                    try:
+                        await ws.send_str(message)
+                        self.sent[kind] += 1
+                    except ConnectionError:
+                        subscribers[symbol].discard(ws)
+
+    async def _report(self):
+        last = dict(self.sent)
+        while True:
+            await asyncio.sleep(5)
+            rates = {kind: (self.sent[kind] - last[kind]) / 5 for kind in self.sent}
+            last = dict(self.sent)
+            sockets = {
+                "binance": len(set().union(*self.binance_subscribers.values())),
+                "coinbase": len(set().union(*self.coinbase_subscribers.values())),
+                "kline": self.kline_streams,
+            }
+            print(f"sent/s {rates} connections {sockets}", flush=True)
+
+    async def _serve(self, request: web.Request, subscribers: dict, symbols: list[str]) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        for symbol in symbols:
+            subscribers.setdefault(symbol, set()).add(ws)
+        try:
+            async for _ in ws:
+                pass # Pings are answered by aiohttp; nothing else is expected
+        finally:
+            for symbol in symbols:
+                subscribers[symbol].discard(ws)
+        return ws
+
+    # Binance
+
+    async def binance_stream(self, request: web.Request):
+        streams = request.query.get("streams", "").split("/")
+        symbols = [s.split("@")[0].upper() for s in streams if s.endswith("@aggTrade")]
+        return await self._serve(request, self.binance_subscribers, symbols)
+
+    async def binance_kline_stream(self, request: web.Request):
+        symbol, _, interval = request.match_info["stream"].partition("@kline_")
+        if interval not in INTERVAL_SECONDS:
+            raise web.HTTPBadRequest(text=f"Unsupported stream {request.match_info['stream']}")
+        symbol = symbol.upper()
+        step = INTERVAL_SECONDS[interval] * 1000
+        path = self.path(symbol)
+
+        def message(open_ms: int, now_ms: int, closed: bool) -> str:
+            o, h, l, c, v = path.candle(open_ms, step, None if closed else now_ms)
+            return json.dumps({
+                "e": "kline", "E": now_ms, "s": symbol,
+                "k": {
+                    "t": open_ms, "T": open_ms + step - 1, "s": symbol, "i": interval,
+                    "o": str(o), "c": str(c), "h": str(h), "l": str(l), "v": str(v),
+                    "n": 0, "x": closed, "q": str(round(v * c, 2)),
+                },
+            }, separators=(",", ":")) # Compact, like Binance's frames
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.kline_streams += 1
+        try:
+            current = None
+            while not ws.closed:
+                now_ms = int(time.time() * 1000)
+                open_ms = now_ms - now_ms % step
+                if current is not None and open_ms != current:
+                    await ws.send_str(message(current, now_ms, True))
+                current = open_ms
+                await ws.send_str(message(open_ms, now_ms, False))
+                self.sent["kline"] += 1
+                await asyncio.sleep(KLINE_PUSH_SECONDS)
+        except ConnectionError:
+            pass
+        finally:
+            self.kline_streams -= 1
+        return ws
+
+    async def binance_klines(self, request: web.Request):
+        query = request.query
+        interval = query.get("interval", "1h")
+        if interval not in INTERVAL_SECONDS:
+            raise web.HTTPBadRequest(text=f"Invalid interval {interval}")
+        symbol = query.get("symbol", "BTCUSDT").upper()
+        limit = min(int(query.get("limit", 500)), MAX_BINANCE_KLINES)
+        step = INTERVAL_SECONDS[interval] * 1000
+        now_ms = int(time.time() * 1000)
+        end = min(int(query.get("endTime", now_ms)), now_ms)
+        last_open = end - end % step
+        path = self.path(symbol)
+
+        rows = []
+        for open_ms in range(last_open - (limit - 1) * step, last_open + 1, step):
+            forming = open_ms + step > now_ms
+            o, h, l, c, v = path.candle(open_ms, step, now_ms if forming else None)
+            rows.append([
+                open_ms, str(o), str(h), str(l), str(c), str(v), open_ms + step - 1,
+                str(round(v * c, 2)), 0, "0", "0", "0",
+            ])
+        self.sent["rest"] += 1
+        return web.json_response(rows)
+
+    async def binance_ticker_price(self, request: web.Request):
+        symbol = request.query.get("symbol")
+        now_ms = int(time.time() * 1000)
+        symbols = [symbol.upper()] if symbol else sorted(set(DEFAULT_BINANCE_SYMBOLS) | set(self.binance_subscribers))
+        tickers = [{"symbol": s, "price": str(self.path(s).price(now_ms / 1000)), "time": now_ms} for s in symbols]
+        self.sent["rest"] += 1
+        return web.json_response(tickers[0] if symbol else tickers)
+
+    # Coinbase
+
+    async def coinbase_ws(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribed: list[str] = []
+        try:
+            async for msg in ws:
+                try:
+                    data = json.loads(msg.data)
+                except (TypeError, ValueError):
+                    continue
+                if data.get("type") == "subscribe" and data.get("channel") == "ticker":
+                    for product_id in data.get("product_ids", []):
+                        self.coinbase_subscribers.setdefault(product_id, set()).add(ws)
+                        subscribed.append(product_id)
+                    await ws.send_str(json.dumps({
+                        "channel": "subscriptions", "client_id": "", "sequence_num": next(self._sequence),
+                        "events": [{"subscriptions": {"ticker": subscribed}}],
+                    }))
+        finally:
+            for product_id in subscribed:
+                self.coinbase_subscribers[product_id].discard(ws)
+        return ws
+
+    async def coinbase_candles(self, request: web.Request):
+        query = request.query
+        granularity = int(query.get("granularity", 3600))
+        if granularity not in INTERVAL_SECONDS.values():
+            raise web.HTTPBadRequest(text=f"Unsupported granularity {granularity}")
+        step = granularity * 1000
+        now_ms = int(time.time() * 1000)
+
+        def parse(value: str | None, default: int) -> int:
+            if not value:
+                return default
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return int((dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp() * 1000)
+
+        end = min(parse(query.get("end"), now_ms), now_ms)
+        start = max(parse(query.get("start"), end - MAX_COINBASE_CANDLES * step), end - MAX_COINBASE_CANDLES * step)
+        path = self.path(request.match_info["product_id"])
+
+        rows = []
+        open_ms = end - end % step
+        while open_ms >= start:
+            forming = open_ms + step > now_ms
+            o, h, l, c, v = path.candle(open_ms, step, now_ms if forming else None)
+            rows.append([open_ms // 1000, l, h, o, c, v]) # Newest first
+            open_ms -= step
+        self.sent["rest"] += 1
+        return web.json_response(rows)
+
+    async def coinbase_ticker(self, request: web.Request):
+        now = time.time()
+        price = self.path(request.match_info["product_id"]).price(now)
+        self.sent["rest"] += 1
+        return web.json_response({
+            "trade_id": next(self._trade_ids), "price": str(price), "size": "0.01",
+            "bid": str(price), "ask": str(price), "volume": "0",
+            "time": datetime.fromtimestamp(now, timezone.utc).isoformat().replace("+00:00", "Z"),
+        })
+
+
+def load_replay(path: str) -> list[tuple]:
+    rows = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            try:
+                rows.append((row[0].strip(), float(row[1]), float(row[2])))
+            except (IndexError, ValueError):
+                continue # Header or malformed line
+    if not rows:
+        raise SystemExit(f"No symbol,price,quantity rows in {path}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rate", type=float, default=1000, help="Binance aggTrade messages per second")
+    parser.add_argument("--coinbase-rate", type=float, default=100, help="Coinbase ticker messages per second")
+    parser.add_argument("--replay", help="CSV of symbol,price,quantity rows to replay instead of generated ticks")
+    args = parser.parse_args()
+
+    replay = load_replay(args.replay) if args.replay else None
+    simulator = ExchangeSimulator(args.rate, args.coinbase_rate, replay)
+    web.run_app(simulator.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
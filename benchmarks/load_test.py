@@ -0,0 +1,408 @@
+"""
+End-to-end load test with synthetic traders.
+
+Every trader creates (or reuses) an account, keeps the account and price
+WebSockets open like the Chart / Trading pages, and until the end of the
+run:
+
+  * trades: places limit orders far from the market and cancels them,
+    opens small market positions, moves their TP / SL through
+    PATCH /positions/{id} and closes them again
+  * browses: sits on one page at a time and polls what that page polls
+    (trading: account every 2s; equity curve every 5s; history: orders and
+    position history since-cursors every 5s; statistics and calendar once)
+
+Reported at the end, per endpoint: throughput, errors (every 4xx / 5xx
+response and connection failure, broken down by status) and latency
+percentiles; WebSocket delivery lag (order request sent -> ACCOUNT_DELTA
+received, and market order sent -> ACCOUNT_DELTA with it filled); price
+stream message gaps; and database load from /metrics/db (statements run
+during the test, pool saturation).
+
+Run the backend against a local price source first (see
+benchmarks/exchange_simulator.py), then from the repository root:
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 --users 1000 --duration 120 [--json report.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import aiohttp
+import numpy as np
+
+PAGES = {
+    # page: (seconds between polls or None for a one-off load, poll coroutine name)
+    "trading": (2.0, "poll_trading"),
+    "equity": (5.0, "poll_equity"),
+    "history": (5.0, "poll_history"),
+    "statistics": (None, "load_statistics"),
+}
+ORDER_NOTIONAL = 100.0 # USD per market order
+SEEN_TTL = 10.0 # Seconds an unrequested ACCOUNT_DELTA entry (e.g. a cancel echo) waits for its request
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50 * 1000, "p95": p95 * 1000, "p99": p99 * 1000, "max": max(values) * 1000}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        # Endpoint -> HTTP status (0 for a connection failure / timeout) -> count
+        self.error_statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.lags: dict[str, list[float]] = defaultdict(list)
+        self.price_messages = 0
+        self.price_gaps: list[float] = []
+        self.ws_failures = 0
+
+    def error(self, name: str, status: int):
+        self.errors[name] += 1
+        self.error_statuses[name][status] += 1
+
+    def report(self, duration: float) -> dict:
+        endpoints = {
+            name: {
+                "requests": len(latencies) + self.errors[name],
+                "per_second": round(len(latencies) / duration, 2),
+                "errors": self.errors[name],
+                **{k: round(v, 1) if v is not None else None for k, v in percentiles(latencies).items()},
+            }
+            for name, latencies in sorted(self.latencies.items())
+        }
+        for name, errors in self.errors.items():
+            endpoints.setdefault(name, {"requests": errors, "per_second": 0.0, "errors": errors, **percentiles([])})
+        for name, statuses in self.error_statuses.items():
+            endpoints[name]["error_statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+        return {
+            "endpoints": endpoints,
+            "ws_lag_ms": {
+                name: {"count": len(lags), **{k: round(v, 1) if v is not None else None for k, v in percentiles(lags).items()}}
+                for name, lags in self.lags.items()
+            },
+            "price_stream": {
+                "messages_per_second": round(self.price_messages / duration, 2),
+                "gap_ms": {k: round(v, 1) if v is not None else None for k, v in percentiles(self.price_gaps).items()},
+            },
+            "ws_failures": self.ws_failures,
+        }
+
+
+class Trader:
+    def __init__(self, index: int, args, http: aiohttp.ClientSession, stats: Stats):
+        self.index = index
+        self.args = args
+        self.http = http
+        self.stats = stats
+        self.rng = random.Random(index)
+        self.account_id: int | None = None
+        self.price: float | None = None
+        self.positions: dict[int, dict] = {} # id -> position from ACCOUNT_DELTA
+        # Order id -> (request sent, lag name) not seen on the account WebSocket yet
+        self._pending: dict[tuple[int, str], float] = {}
+        # Order id / lag name -> first time seen on the WebSocket before the POST returned
+        self._seen: dict[tuple[int, str], float] = {}
+        self._since: dict[str, str | None] = {}
+
+    async def request(self, method: str, name: str, path: str, **kwargs) -> tuple[int, object, dict]:
+        started = time.perf_counter()
+        try:
+            async with self.http.request(method, self.args.base_url + path, **kwargs) as response:
+                body = await response.json(content_type=None) if response.status != 204 else None
+                elapsed = time.perf_counter() - started
+                if response.status >= 400:
+                    self.stats.error(name, response.status)
+                else:
+                    self.stats.latencies[name].append(elapsed)
+                return response.status, body, dict(response.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            self.stats.error(name, 0)
+            return 0, None, {}
+
+    async def run(self, deadline: float):
+        status, account, _ = await self.request(
+            "POST", "POST /accounts/", "/accounts/",
+            params={"user_id": f"{self.args.user_prefix}-{self.index}", "initial_balance": 100_000},
+        )
+        if status != 200:
+            return
+        self.account_id = account["id"]
+        for position in account.get("positions", []):
+            self.positions[position["id"]] = position
+
+        tasks = [
+            asyncio.create_task(self.account_socket()),
+            asyncio.create_task(self.price_socket()),
+            asyncio.create_task(self.browse(deadline)),
+        ]
+        try:
+            await self.trade(deadline)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # WebSockets
+
+    async def account_socket(self):
+        try:
+            async with self.http.ws_connect(f"{self.args.ws_url}/accounts/ws/{self.account_id}", heartbeat=30) as ws:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    data = json.loads(msg.data)
+                    if data.get("type") != "ACCOUNT_DELTA":
+                        continue
+                    now = time.perf_counter()
+                    for order in data.get("orders", []):
+                        self._observed((order["id"], "order_delta"), now)
+                        if order.get("status") == "FILLED":
+                            self._observed((order["id"], "fill_delta"), now)
+                    for position in data.get("positions", []):
+                        self.positions[position["id"]] = position
+                    for position_id in data.get("closed_positions", []):
+                        self.positions.pop(position_id, None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats.ws_failures += 1
+
+    def _observed(self, key: tuple[int, str], now: float):
+        sent = self._pending.pop(key, None)
+        if sent is not None:
+            self.stats.lags[key[1]].append(now - sent)
+        else:
+            self._seen.setdefault(key, now)
+            # Deltas no request waits for (e.g. cancel echoes) would pile up
+            # otherwise; entries are in the order they were first seen
+            while self._seen:
+                oldest = next(iter(self._seen))
+                if now - self._seen[oldest] <= SEEN_TTL:
+                    break
+                del self._seen[oldest]
+
+    def _expect(self, order_id: int, lag: str, sent: float):
+        seen = self._seen.pop((order_id, lag), None)
+        if seen is not None:
+            self.stats.lags[lag].append(seen - sent)
+        else:
+            self._pending[(order_id, lag)] = sent
+
+    async def price_socket(self):
+        symbol = self.args.symbol
+        try:
+            async with self.http.ws_connect(f"{self.args.ws_url}/market/ws/prices?symbols={symbol}", heartbeat=30) as ws:
+                last = None
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    now = time.perf_counter()
+                    self.stats.price_messages += 1
+                    if last is not None:
+                        self.stats.price_gaps.append(now - last)
+                    last = now
+                    price = json.loads(msg.data).get(symbol)
+                    if price:
+                        self.price = price
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats.ws_failures += 1
+
+    # Trading
+
+    async def think(self):
+        await asyncio.sleep(self.rng.expovariate(1 / self.args.think))
+
+    async def place(self, name: str, order: dict) -> dict | None:
+        sent = time.perf_counter()
+        status, body, _ = await self.request("POST", name, "/orders/", json={"account_id": self.account_id, "symbol": self.args.symbol, **order})
+        if status != 200:
+            return None
+        self._expect(body["id"], "order_delta", sent)
+        if order["order_type"] == "MARKET":
+            self._expect(body["id"], "fill_delta", sent)
+        return body
+
+    async def trade(self, deadline: float):
+        while time.monotonic() < deadline:
+            await self.think()
+            if self.price is None:
+                continue
+
+            if self.positions and self.rng.random() < 0.5:
+                position_id, position = next(iter(self.positions.items()))
+                if self.rng.random() < 0.6:
+                    # Drag TP / SL on the chart
+                    await self.request(
+                        "PATCH", "PATCH /positions/{id}", f"/positions/{position_id}",
+                        json={"take_profit_price": round(self.price * self.rng.uniform(1.02, 1.1), 2),
+                              "stop_loss_price": round(self.price * self.rng.uniform(0.9, 0.98), 2)},
+                    )
+                else:
+                    quantity = abs(position["quantity"])
+                    side = "SELL" if position["quantity"] > 0 else "BUY"
+                    await self.place("POST /orders/ (market)", {"side": side, "order_type": "MARKET", "quantity": quantity})
+            elif self.rng.random() < 0.6:
+                # Resting limit order, cancelled after a while
+                order = await self.place("POST /orders/ (limit)", {
+                    "side": "BUY", "order_type": "LIMIT", "quantity": round(ORDER_NOTIONAL / self.price, 6),
+                    "price": round(self.price * 0.5, 2),
+                })
+                if order:
+                    await self.think()
+                    await self.request("DELETE", "DELETE /orders/{id}", f"/orders/{order['id']}")
+            elif not self.positions:
+                await self.place("POST /orders/ (market)", {
+                    "side": self.rng.choice(["BUY", "SELL"]), "order_type": "MARKET",
+                    "quantity": round(ORDER_NOTIONAL / self.price, 6),
+                })
+
+    # Browsing
+
+    async def browse(self, deadline: float):
+        while time.monotonic() < deadline:
+            page = self.rng.choice(list(PAGES))
+            interval, poll = PAGES[page]
+            leave = time.monotonic() + self.rng.expovariate(1 / self.args.page_dwell)
+            self._since.clear()
+            while True:
+                await getattr(self, poll)()
+                if interval is None:
+                    await asyncio.sleep(max(0.0, leave - time.monotonic()))
+                    break
+                await asyncio.sleep(interval)
+                if time.monotonic() >= leave:
+                    break
+
+    async def poll_trading(self):
+        await self.request("GET", "GET /accounts/{id}", f"/accounts/{self.account_id}")
+
+    async def poll_equity(self):
+        await self.request("GET", "GET /accounts/{id}/equity-history", f"/accounts/{self.account_id}/equity-history", params={"hours": 24})
+
+    async def poll_history(self):
+        for name, path, params in (
+            ("GET /orders/", "/orders/", {"account_id": self.account_id}),
+            ("GET /accounts/{id}/position-history", f"/accounts/{self.account_id}/position-history", {}),
+        ):
+            since = self._since.get(name)
+            if since:
+                params["since"] = since
+            status, _, headers = await self.request("GET", name, path, params=params)
+            if status == 200:
+                self._since[name] = headers.get("X-Since-Cursor", since)
+
+    async def load_statistics(self):
+        today = date.today()
+        await self.request("GET", "GET /accounts/{id}/statistics", f"/accounts/{self.account_id}/statistics", params={"days": 7})
+        await self.request(
+            "GET", "GET /accounts/{id}/daily-pnl", f"/accounts/{self.account_id}/daily-pnl",
+            params={"start_date": str(today - timedelta(days=35)), "end_date": str(today), "tz": "UTC"},
+        )
+
+
+async def fetch_db_metrics(http: aiohttp.ClientSession, base_url: str, token: str | None) -> dict | None:
+    headers = {"X-Metrics-Token": token} if token else None
+    try:
+        async with http.get(f"{base_url}/metrics/db", headers=headers) as response:
+            return await response.json() if response.status == 200 else None
+    except aiohttp.ClientError:
+        return None
+
+
+def db_load(before: dict | None, after: dict | None, duration: float) -> dict | None:
+    """Statements run during the test, busiest sources first, and pool usage at the end."""
+    if not before or not after:
+        return None
+    sources = []
+    for source, stats in after["queries"].items():
+        previous = before["queries"].get(source, {"count": 0, "total_ms": 0.0, "slow": 0})
+        count = stats["count"] - previous["count"]
+        if count:
+            total_ms = stats["total_ms"] - previous["total_ms"]
+            sources.append((source, {
+                "per_second": round(count / duration, 2),
+                "avg_ms": round(total_ms / count, 3),
+                "db_time_share": round(total_ms / 1000 / duration, 3), # Busy connections on average
+                "slow": stats["slow"] - previous["slow"],
+            }))
+    sources.sort(key=lambda item: item[1]["db_time_share"], reverse=True)
+    return {"pools": after["pools"], "queries": dict(sources)}
+
+
+def print_report(report: dict):
+    print(f"\n{report['users']} users, {report['duration']}s\n")
+    print(f"{'endpoint':42} {'req/s':>8} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+    for name, e in report["endpoints"].items():
+        print(f"{name:42} {e['per_second']:8.2f} {e['errors']:7d} {fmt(e['p50'])} {fmt(e['p95'])} {fmt(e['p99'])} {fmt(e['max'])}")
+        if e.get("error_statuses"):
+            statuses = ", ".join(f"{'connection' if status == '0' else status} x{count}" for status, count in e["error_statuses"].items())
+            print(f"  errors by status: {statuses}")
+    print("\nWebSocket delivery lag (ms)")
+    for name, lag in report["ws_lag_ms"].items():
+        print(f"  {name:20} n={lag['count']:<7d} p50={fmt(lag['p50'])} p95={fmt(lag['p95'])} p99={fmt(lag['p99'])} max={fmt(lag['max'])}")
+    price = report["price_stream"]
+    print(f"\nPrice stream: {price['messages_per_second']} msg/s, gap p99 {fmt(price['gap_ms']['p99'])} ms, "
+          f"max {fmt(price['gap_ms']['max'])} ms; WebSocket failures: {report['ws_failures']}")
+    if report["db"]:
+        print("\nDatabase (statements during the test)")
+        for name, pool in report["db"]["pools"].items():
+            print(f"  pool {name}: peak {pool['peak_checked_out']} checked out, capacity {pool.get('capacity')}, "
+                  f"checkout wait avg {pool['checkout_wait']['avg_ms']} ms, max {pool['checkout_wait']['max_ms']} ms")
+        for source, q in itertools.islice(report["db"]["queries"].items(), 15):
+            print(f"  {source:50} {q['per_second']:8.2f}/s avg {q['avg_ms']:7.2f} ms busy {q['db_time_share']:6.3f} slow {q['slow']}")
+
+
+async def main_async(args):
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+        stats = Stats()
+        before = await fetch_db_metrics(http, args.base_url, args.metrics_token)
+        started = time.monotonic()
+        deadline = started + args.duration
+
+        async def start(trader: Trader, delay: float):
+            await asyncio.sleep(delay)
+            await trader.run(deadline)
+
+        traders = [Trader(i, args, http, stats) for i in range(args.users)]
+        await asyncio.gather(*(start(t, args.ramp * i / max(args.users, 1)) for i, t in enumerate(traders)))
+        duration = time.monotonic() - started
+        after = await fetch_db_metrics(http, args.base_url, args.metrics_token)
+
+    report = {"users": args.users, "duration": round(duration, 1), **stats.report(duration), "db": db_load(before, after, duration)}
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds, including the ramp-up")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which users connect")
+    parser.add_argument("--think", type=float, default=5.0, help="Mean seconds between a trader's actions")
+    parser.add_argument("--page-dwell", type=float, default=30.0, help="Mean seconds spent on a page")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--user-prefix", default="loadtest", help="Accounts are <prefix>-<n>, reused across runs")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds per HTTP request")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--metrics-token", help="X-Metrics-Token for /metrics/db, when METRICS_TOKEN is set")
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip("/")
+    args.ws_url = "ws" + args.base_url[len("http"):]
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
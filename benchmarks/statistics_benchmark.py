@@ -0,0 +1,133 @@
+"""
+Benchmark for the full-history statistics path.
+
+Generates one year of minute-level equity (525,600 points) plus a batch of
+closed trades, then times:
+
+  * legacy   - the list/statistics based loops previously inlined in
+               get_account_statistics (per-point Sharpe, pure Python)
+  * columns  - turning DB-style row tuples into NumPy columns
+  * numpy    - app.services.analytics.compute_statistics
+
+Run from the repository root:
+
+    python -m benchmarks.statistics_benchmark [--trades 5000] [--repeat 3]
+"""
+import argparse
+import math
+import statistics
+import time
+
+import numpy as np
+
+from app.services.analytics import TradeArrays, EquityArrays, compute_statistics
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+
+def generate_rows(trade_count: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+
+    start = 1_700_000_000.0
+    timestamps = start + np.arange(MINUTES_PER_YEAR) * 60.0
+    equity = 10_000.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, MINUTES_PER_YEAR)))
+    equity_rows = list(zip(timestamps.tolist(), equity.tolist()))
+
+    net_pnl = rng.normal(5, 50, trade_count)
+    sides = rng.choice(["LONG", "SHORT"], trade_count)
+    entry = rng.uniform(20_000, 60_000, trade_count)
+    initial_sl = np.where(rng.random(trade_count) < 0.7, entry * 0.98, np.nan)
+    quantity = rng.uniform(0.01, 1, trade_count)
+    trade_rows = [
+        (float(p), str(s), float(e), None if math.isnan(sl) else float(sl), float(q))
+        for p, s, e, sl, q in zip(net_pnl, sides, entry, initial_sl, quantity)
+    ]
+    return trade_rows, equity_rows
+
+
+def legacy_statistics(trade_rows, equity_rows):
+    net_pnls = [t[0] for t in trade_rows]
+    wins = [p for p in net_pnls if p > 0]
+    losses = [p for p in net_pnls if p <= 0]
+    avg_win = statistics.mean(wins) if wins else 0.0
+    avg_loss = statistics.mean(losses) if losses else 0.0
+    for side in ("LONG", "SHORT"):
+        side_pnls = [t[0] for t in trade_rows if t[1] == side]
+        sum(p for p in side_pnls if p > 0), abs(sum(p for p in side_pnls if p <= 0))
+
+    r_multiples = []
+    for pnl, _, entry, initial_sl, qty in trade_rows:
+        if initial_sl:
+            risk = abs(entry - initial_sl) * qty
+            if risk > 0:
+                r_multiples.append(pnl / risk)
+    if r_multiples:
+        statistics.mean(r_multiples)
+
+    equity_values = [e for _, e in equity_rows]
+    max_drawdown = max_drawdown_pct = 0.0
+    peak = equity_values[0]
+    for eq in equity_values:
+        peak = max(peak, eq)
+        max_drawdown = max(max_drawdown, peak - eq)
+        max_drawdown_pct = max(max_drawdown_pct, (peak - eq) / peak if peak > 0 else 0.0)
+
+    returns = [(curr - prev) / prev for prev, curr in zip(equity_values, equity_values[1:]) if prev > 0]
+    statistics.mean(returns), statistics.stdev(returns)
+
+    streak = best = 0
+    for pnl in net_pnls:
+        streak = streak + 1 if pnl > 0 else 0
+        best = max(best, streak)
+    return avg_win, avg_loss, max_drawdown
+
+
+def rows_to_arrays(trade_rows, equity_rows):
+    net_pnl, side, entry, initial_sl, quantity = (np.asarray(c) for c in zip(*trade_rows))
+    initial_sl = initial_sl.astype(np.float64)
+    risk = np.abs(entry - initial_sl) * quantity
+    r_multiple = np.full(net_pnl.shape, np.nan)
+    np.divide(net_pnl, risk, out=r_multiple, where=(initial_sl != 0) & (risk > 0))
+    trades = TradeArrays(net_pnl.astype(np.float64), side == "LONG", r_multiple)
+
+    count = len(equity_rows)
+    equity = EquityArrays(
+        np.fromiter((r[0] for r in equity_rows), dtype=np.float64, count=count),
+        np.fromiter((r[1] for r in equity_rows), dtype=np.float64, count=count),
+    )
+    return trades, equity
+
+
+def best_of(repeat: int, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    trade_rows, equity_rows = generate_rows(args.trades)
+    print(f"{len(equity_rows):,} equity points, {len(trade_rows):,} trades (best of {args.repeat})")
+
+    legacy_time, _ = best_of(args.repeat, legacy_statistics, trade_rows, equity_rows)
+    columns_time, (trades, equity) = best_of(args.repeat, rows_to_arrays, trade_rows, equity_rows)
+    numpy_time, stats = best_of(args.repeat, compute_statistics, trades, equity, 10_000.0)
+
+    print(f"legacy  : {legacy_time * 1000:9.1f} ms")
+    print(f"columns : {columns_time * 1000:9.1f} ms")
+    print(f"numpy   : {numpy_time * 1000:9.1f} ms")
+    print(f"speedup : {legacy_time / (columns_time + numpy_time):9.1f}x (incl. column build)")
+    print(f"sharpe={stats.sharpe_ratio:.3f} sortino={stats.sortino_ratio:.3f} "
+          f"max_dd_pct={stats.max_drawdown_pct:.4f} cagr={stats.cagr:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -58,7 +58,9 @@ export default function Calendar() {
       const res = await axios.get(`${API_URL}/accounts/${user.id}/daily-pnl`, {
         params: {
           start_date: startStr,
-          end_date: endStr
+          end_date: endStr,
+          // Group by the user's local calendar days
+          tz: Intl.DateTimeFormat().resolvedOptions().timeZone
         }
       });
       
@@ -8,6 +8,9 @@ import { Pencil, Square, TrendingUp, ArrowUpCircle, ArrowDownCircle, Trash2, Mou
 
 import { TIMEZONE, timeframeToSeconds, toNySeconds, toChartSeconds, toUTCSeconds } from '../utils/time';
 
+// Server drawings per `${accountId}:${symbol}` with their revision, so reopening
+// a chart only fetches changes (or gets a 304)
+const drawingCache = new Map();
 
 export default function Chart({
     chartId = 'default',
@@ -53,6 +56,7 @@ export default function Chart({
     const draggingLineRef = useRef(null);
     const labelsContainerRef = useRef(null); // Container for custom HTML labels
     const allDataRef = useRef([]); // Store all loaded data
+    const fvgsRef = useRef(new Map()); // Server-detected FVGs by `${time}:${type}` (time in ms)
     const isLoadingRef = useRef(false);
     const hasMoreRef = useRef(true);
     const lastViewStateRef = useRef(null); // Store visible range/zoom to restore on next load
@@ -66,6 +70,7 @@ export default function Chart({
     const dragStateRef = useRef(null);
     const isMagnetActiveRef = useRef(false);
     const filledOrdersRef = useRef([]); // Store filled orders for click interaction
+    const overlayStateRef = useRef({ positions: [], orders: [] }); // Latest positions/orders, patched by account deltas
 
     // Signal refs
     const prevClearDrawingsRef = useRef(clearDrawingsTimestamp);
@@ -97,7 +102,7 @@ export default function Chart({
             // Delete all drawings
             (async () => {
                 const drawingsToDelete = drawingsRef.current.filter(d => !String(d.id).startsWith('temp_'));
-                await Promise.all(drawingsToDelete.map(d => deleteDrawing(d.id)));
+                await deleteDrawings(drawingsToDelete.map(d => d.id));
                 drawingsRef.current = [];
                 setDrawings([]);
                 setSelectedDrawingId(null);
@@ -160,74 +165,29 @@ export default function Chart({
 
 
     // Fetch Settings from Backend
-    // FVG Calculation
-    const calculateFVGs = useCallback((data) => {
-        if (!data || data.length < 3) return [];
+    // FVGs are detected on the server (see loadData / refreshFVGs); only the
+    // forming candle, which the server has not seen closed yet, is checked here
+    const activeFVGs = useCallback(() => {
+        const forming = allDataRef.current[allDataRef.current.length - 1];
         const fvgs = [];
-        let filledCount = 0;
-
-        for (let i = 2; i < data.length; i++) {
-            const curr = data[i];
-            const prev2 = data[i - 2];
-
-            // Bullish FVG: Low[i] > High[i-2]
-            if (curr.low > prev2.high) {
-                const top = curr.low;
-                const bottom = prev2.high;
-
-                // Check if filled by SUBSEQUENT candles
-                let filled = false;
-                for (let j = i + 1; j < data.length; j++) {
-                    // Only body can fill FVG
-                    const bodyLow = Math.min(data[j].open, data[j].close);
-                    if (bodyLow <= bottom) {
-                        filled = true;
-                        break;
-                    }
-                }
-
-                if (!filled) {
-                    fvgs.push({
-                        time: prev2.time,
-                        top,
-                        bottom,
-                        type: 'bullish'
-                    });
-                } else {
-                    filledCount++;
-                }
-            }
-
-            // Bearish FVG: High[i] < Low[i-2]
-            if (curr.high < prev2.low) {
-                const top = prev2.low;
-                const bottom = curr.high;
-
-                let filled = false;
-                for (let j = i + 1; j < data.length; j++) {
-                    // Only body can fill FVG
-                    const bodyHigh = Math.max(data[j].open, data[j].close);
-                    if (bodyHigh >= top) {
-                        filled = true;
-                        break;
-                    }
-                }
-
-                if (!filled) {
-                    fvgs.push({
-                        time: prev2.time,
-                        top,
-                        bottom,
-                        type: 'bearish'
-                    });
-                } else {
-                    filledCount++;
-                }
+        fvgsRef.current.forEach(gap => {
+            if (gap.filled_time !== null) return;
+            if (forming && forming.originalTimeMs > gap.time) {
+                // Only body can fill FVG
+                const filled = gap.type === 'bullish'
+                    ? Math.min(forming.open, forming.close) <= gap.bottom
+                    : Math.max(forming.open, forming.close) >= gap.top;
+                if (filled) return;
             }
-        }
-        console.log(`Calculated FVGs: ${fvgs.length} active, ${filledCount} filled`);
+            fvgs.push({
+                time: toChartSeconds(gap.time, timezone),
+                top: gap.top,
+                bottom: gap.bottom,
+                type: gap.type
+            });
+        });
         return fvgs;
-    }, []);
+    }, [timezone]);
 
     // Fetching and Saving Settings is now handled by Parent (MultiChart)
     // Removed local fetch/save effects.
@@ -247,9 +207,8 @@ export default function Chart({
             return;
         }
 
-        const fvgs = calculateFVGs(allDataRef.current);
-        fvgPrimitiveRef.current.setFVGs(fvgs);
-    }, [calculateFVGs]); // Removed showFVG dependency to keep function reference stable for WS
+        fvgPrimitiveRef.current.setFVGs(activeFVGs());
+    }, [activeFVGs]); // Removed showFVG dependency to keep function reference stable for WS
 
     // Update FVGs when toggle changes
     useEffect(() => {
@@ -260,10 +219,32 @@ export default function Chart({
     const fetchDrawings = useCallback(async () => {
         if (!user) return;
         try {
-            const res = await fetch(`/api/drawings/?account_id=${user.id}&symbol=${symbol}`);
-            if (res.ok) {
-                const data = await res.json();
-                const loadedDrawings = data.map(d => ({
+            const key = `${user.id}:${symbol}`;
+            const cached = drawingCache.get(key);
+            const params = new URLSearchParams({ account_id: user.id, symbol });
+            const headers = {};
+            if (cached) {
+                params.set('since_revision', cached.revision);
+                headers['If-None-Match'] = cached.etag;
+            }
+            const res = await fetch(`/api/drawings/?${params}`, { headers });
+
+            let rows = null;
+            if (res.status === 304 && cached) {
+                rows = cached.rows;
+            } else if (res.ok) {
+                // Full list, or the drawings changed since our revision (deleted ones flagged)
+                const byId = new Map((cached ? cached.rows : []).map(d => [d.id, d]));
+                (await res.json()).forEach(d => d.deleted ? byId.delete(d.id) : byId.set(d.id, d));
+                rows = [...byId.values()];
+                drawingCache.set(key, {
+                    revision: Number(res.headers.get('X-Drawings-Revision')),
+                    etag: res.headers.get('ETag'),
+                    rows
+                });
+            }
+            if (rows) {
+                const loadedDrawings = rows.map(d => ({
                     id: d.id,
                     type: d.type,
                     p1: { ...d.data.p1, time: toChartSeconds(d.data.p1.time * 1000, timezone) },
@@ -377,6 +358,21 @@ export default function Chart({
         }
     };
 
+    // Delete many drawings in one request / transaction
+    const deleteDrawings = async (ids) => {
+        if (!user || ids.length === 0) return;
+
+        try {
+            await fetch('/api/drawings/bulk', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ account_id: user.id, symbol, deletes: ids })
+            });
+        } catch (err) {
+            console.error("Failed to delete drawings", err);
+        }
+    };
+
     const pointToLineDistance = (x, y, x1, y1, x2, y2) => {
         const A = x - x1;
         const B = y - y1;
@@ -752,27 +748,12 @@ export default function Chart({
         });
     };
 
-    // Fetch Account & Orders Data
-    const updateOverlayData = useCallback(async () => {
-        if (!user || (draggingLineRef.current)) return; // Don't update if dragging
+    // Draw positions/orders overlay from overlayStateRef
+    const renderOverlayData = useCallback(() => {
+        const accData = { positions: overlayStateRef.current.positions };
+        const ordersData = overlayStateRef.current.orders;
 
         try {
-            // Fetch both Account (Positions) and Orders in parallel to minimize waiting time
-            const [accRes, ordersRes] = await Promise.all([
-                fetch(`/api/accounts/${user.id}`),
-                fetch(`/api/orders/?account_id=${user.id}`)
-            ]);
-
-            let accData = null;
-            let ordersData = null;
-
-            if (accRes.ok) {
-                accData = await accRes.json();
-            }
-            if (ordersRes.ok) {
-                ordersData = await ordersRes.json();
-            }
-
             // Check if chart is still mounted/valid
             if (!seriesRef.current) return;
 
@@ -947,10 +928,73 @@ export default function Chart({
                 }
             }
 
+        } catch (err) {
+            console.error("Failed to render overlay data", err);
+        }
+    }, [symbol, timeframe, timezone]);
+
+    // Fetch Account & Orders Data (full snapshot)
+    const updateOverlayData = useCallback(async () => {
+        if (!user || (draggingLineRef.current)) return; // Don't update if dragging
+
+        try {
+            // Fetch both Account (Positions) and Orders in parallel to minimize waiting time
+            // Orders: every open order (price lines) plus the most recent ones (fill markers)
+            const [accRes, openRes, recentRes] = await Promise.all([
+                fetch(`/api/accounts/${user.id}`),
+                fetch(`/api/orders/?account_id=${user.id}&status=NEW&status=PARTIALLY_FILLED&limit=500`),
+                fetch(`/api/orders/?account_id=${user.id}&limit=500`)
+            ]);
+
+            if (accRes.ok) {
+                const accData = await accRes.json();
+                overlayStateRef.current.positions = Array.isArray(accData.positions) ? accData.positions : [];
+            }
+            if (openRes.ok && recentRes.ok) {
+                const byId = new Map();
+                [...await recentRes.json(), ...await openRes.json()].forEach(order => byId.set(order.id, order));
+                overlayStateRef.current.orders = Array.from(byId.values());
+            }
+
+            renderOverlayData();
         } catch (err) {
             console.error("Failed to fetch overlay data", err);
         }
-    }, [user, symbol, timeframe, timezone]);
+    }, [user, renderOverlayData]);
+
+    // Patch overlay state with an ACCOUNT_DELTA pushed over the account WebSocket
+    const applyAccountDelta = useCallback((delta) => {
+        const state = overlayStateRef.current;
+
+        const upsert = (list, items) => {
+            const byId = new Map(list.map(item => [item.id, item]));
+            items.forEach(item => byId.set(item.id, { ...byId.get(item.id), ...item }));
+            return Array.from(byId.values());
+        };
+
+        if (delta.orders && delta.orders.length) {
+            state.orders = upsert(state.orders, delta.orders);
+        }
+        if (delta.positions && delta.positions.length) {
+            state.positions = upsert(state.positions, delta.positions);
+        }
+        if (delta.closed_positions && delta.closed_positions.length) {
+            const closed = new Set(delta.closed_positions);
+            state.positions = state.positions.filter(p => !closed.has(p.id));
+        }
+
+        if (!draggingLineRef.current) renderOverlayData();
+    }, [renderOverlayData]);
+
+    // Apply server-pushed mark-to-market PnL (ACCOUNT_PNL) to the position labels
+    const applyAccountPnl = useCallback((update) => {
+        const pnlById = new Map((update.positions || []).map(p => [p.id, p.unrealized_pnl]));
+        overlayStateRef.current.positions = overlayStateRef.current.positions.map(pos =>
+            pnlById.has(pos.id) ? { ...pos, unrealized_pnl: pnlById.get(pos.id) } : pos
+        );
+
+        if (!draggingLineRef.current) renderOverlayData();
+    }, [renderOverlayData]);
 
     // Handle Delete Key for Drawings
     useEffect(() => {
@@ -1996,6 +2040,7 @@ export default function Chart({
         // We do NOT clear series data immediately to preserve "ghost" data while loading.
         // However, we reset the internal buffer.
         allDataRef.current = [];
+        fvgsRef.current = new Map();
         hasMoreRef.current = true;
         isLoadingRef.current = false;
         isChartReadyRef.current = false;
@@ -2010,7 +2055,7 @@ export default function Chart({
 
             try {
                 setError(null);
-                let url = `/api/market/klines?symbol=${symbol}&interval=${timeframe}&limit=1000&exchange=${exchange}`;
+                let url = `/api/market/klines?symbol=${symbol}&interval=${timeframe}&limit=1000&exchange=${exchange}&include=fvg`;
                 if (endTime) {
                     url += `&endTime=${endTime}`;
                 }
@@ -2022,12 +2067,14 @@ export default function Chart({
                     throw new Error(`HTTP error! status: ${response.status}`);
                 }
 
-                const data = await response.json();
+                const payload = await response.json();
                 if (isCancelled) return;
 
+                const data = payload.klines;
                 if (!Array.isArray(data)) {
                     throw new Error("Invalid data format");
                 }
+                (payload.fvg || []).forEach(gap => fvgsRef.current.set(`${gap.time}:${gap.type}`, gap));
 
                 const cdata = data.map(d => ({
                     time: toChartSeconds(d[0], timezone),
@@ -2102,6 +2149,25 @@ export default function Chart({
             }
         };
 
+        // Fetch new gaps and fills after a candle closed: only gaps still open can
+        // change, so ask from the oldest open one (or the last few candles)
+        const refreshFVGs = async () => {
+            const last = allDataRef.current[allDataRef.current.length - 1];
+            if (!last) return;
+            let startTime = last.originalTimeMs - 3 * timeframeToSeconds(timeframe) * 1000;
+            fvgsRef.current.forEach(gap => {
+                if (gap.filled_time === null && gap.time < startTime) startTime = gap.time;
+            });
+            try {
+                const res = await fetch(`/api/market/fvg?symbol=${symbol}&interval=${timeframe}&exchange=${exchange}&start_time=${startTime}`);
+                if (!res.ok || isCancelled) return;
+                (await res.json()).forEach(gap => fvgsRef.current.set(`${gap.time}:${gap.type}`, gap));
+                updateFVGs();
+            } catch (err) {
+                console.error("Failed to refresh FVGs", err);
+            }
+        };
+
         // Load Initial Data
         loadData();
 
@@ -2144,6 +2210,8 @@ export default function Chart({
                             allDataRef.current[allDataRef.current.length - 1] = candle;
                         } else if (!lastData || candle.time > lastData.time) {
                             allDataRef.current.push(candle);
+                            // The previous candle closed
+                            if (lastData) refreshFVGs();
                         }
 
                         // Update Price Display
@@ -2193,8 +2261,8 @@ export default function Chart({
 
         chartRef.current.timeScale().subscribeVisibleLogicalRangeChange(handleVisibleRangeChange);
 
-        // Overlay Interval
-        overlayInterval = setInterval(updateOverlayData, 5000);
+        // Overlay Interval (slow resync only; PnL and fills are pushed over the account WebSocket)
+        overlayInterval = setInterval(updateOverlayData, 60000);
 
         return () => {
             isCancelled = true;
@@ -2279,7 +2347,11 @@ export default function Chart({
                     if (isCancelled) return;
                     try {
                         const msg = JSON.parse(event.data);
-                        if (msg.type === 'ACCOUNT_UPDATE') {
+                        if (msg.type === 'ACCOUNT_DELTA') {
+                            applyAccountDelta(msg);
+                        } else if (msg.type === 'ACCOUNT_PNL') {
+                            applyAccountPnl(msg);
+                        } else if (msg.type === 'ACCOUNT_UPDATE') {
                             // console.log("Received ACCOUNT_UPDATE, refreshing data...");
                             updateOverlayData();
                         }
@@ -2316,7 +2388,7 @@ export default function Chart({
                 ws.close();
             }
         };
-    }, [user, updateOverlayData]);
+    }, [user, updateOverlayData, applyAccountDelta, applyAccountPnl]);
 
     return (
         <div
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { useAuth } from '../context/AuthContext';
 
@@ -9,32 +9,72 @@ export default function History() {
   const [orders, setOrders] = useState([]);
   const [positionHistory, setPositionHistory] = useState([]);
   const [orderTab, setOrderTab] = useState('open');
+  // Keyset cursors: next = older page, since = poll for new / changed rows
+  const [ordersNextCursor, setOrdersNextCursor] = useState(null);
+  const [historyNextCursor, setHistoryNextCursor] = useState(null);
+  const ordersSinceRef = useRef(null);
+  const historySinceRef = useRef(null);
 
   useEffect(() => {
     if (user) {
       fetchOrders();
       fetchPositionHistory();
       const interval = setInterval(() => {
-        fetchOrders();
-        fetchPositionHistory();
+        pollOrders();
+        pollPositionHistory();
       }, 5000);
       return () => clearInterval(interval);
     }
   }, [user]);
 
-  const fetchOrders = async () => {
+  // Merge rows by id, newest first
+  const mergeById = (prev, rows, compare) => {
+    const byId = new Map(prev.map(row => [row.id, row]));
+    rows.forEach(row => byId.set(row.id, row));
+    return Array.from(byId.values()).sort(compare);
+  };
+  const byOrderId = (a, b) => b.id - a.id;
+  const byClosedAt = (a, b) => new Date(b.closed_at) - new Date(a.closed_at) || b.id - a.id;
+
+  const fetchOrders = async (cursor = null) => {
+    try {
+      const res = await axios.get(`${API_URL}/orders/`, { params: { account_id: user.id, cursor } });
+      setOrders(prev => cursor ? mergeById(prev, res.data, byOrderId) : res.data);
+      setOrdersNextCursor(res.headers['x-next-cursor'] || null);
+      if (!cursor) ordersSinceRef.current = res.headers['x-since-cursor'] || null;
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
+  const pollOrders = async () => {
+    if (!ordersSinceRef.current) return fetchOrders();
+    try {
+      const res = await axios.get(`${API_URL}/orders/`, { params: { account_id: user.id, since: ordersSinceRef.current } });
+      ordersSinceRef.current = res.headers['x-since-cursor'] || ordersSinceRef.current;
+      if (res.data.length > 0) setOrders(prev => mergeById(prev, res.data, byOrderId));
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
+  const fetchPositionHistory = async (cursor = null) => {
     try {
-      const res = await axios.get(`${API_URL}/orders/?account_id=${user.id}`);
-      setOrders(res.data.sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
+      const res = await axios.get(`${API_URL}/accounts/${user.id}/position-history`, { params: { cursor } });
+      setPositionHistory(prev => cursor ? mergeById(prev, res.data, byClosedAt) : res.data);
+      setHistoryNextCursor(res.headers['x-next-cursor'] || null);
+      if (!cursor) historySinceRef.current = res.headers['x-since-cursor'] || null;
     } catch (error) {
       console.error(error);
     }
   };
 
-  const fetchPositionHistory = async () => {
+  const pollPositionHistory = async () => {
+    if (!historySinceRef.current) return fetchPositionHistory();
     try {
-      const res = await axios.get(`${API_URL}/accounts/${user.id}/position-history`);
-      setPositionHistory(res.data);
+      const res = await axios.get(`${API_URL}/accounts/${user.id}/position-history`, { params: { since: historySinceRef.current } });
+      historySinceRef.current = res.headers['x-since-cursor'] || historySinceRef.current;
+      if (res.data.length > 0) setPositionHistory(prev => mergeById(prev, res.data, byClosedAt));
     } catch (error) {
       console.error(error);
     }
@@ -62,7 +102,7 @@ export default function History() {
       <div className="bg-white p-6 rounded-lg shadow-md">
         <div className="flex justify-between items-center mb-4">
           <h2 className="text-xl font-semibold">Position History</h2>
-          <button onClick={fetchPositionHistory} className="text-sm text-blue-500 hover:underline">Refresh</button>
+          <button onClick={() => fetchPositionHistory()} className="text-sm text-blue-500 hover:underline">Refresh</button>
         </div>
         <div className="overflow-y-auto max-h-96">
           <table className="w-full text-left text-sm">
@@ -102,6 +142,9 @@ export default function History() {
               )}
             </tbody>
           </table>
+          {historyNextCursor && (
+            <button onClick={() => fetchPositionHistory(historyNextCursor)} className="w-full py-2 text-sm text-blue-500 hover:underline">Load more</button>
+          )}
         </div>
       </div>
 
@@ -122,7 +165,7 @@ export default function History() {
               Order History
             </button>
           </div>
-          <button onClick={fetchOrders} className="text-sm text-blue-500 hover:underline">Refresh</button>
+          <button onClick={() => fetchOrders()} className="text-sm text-blue-500 hover:underline">Refresh</button>
         </div>
         <div className="overflow-y-auto max-h-96">
           <table className="w-full text-left text-sm">
@@ -176,6 +219,9 @@ export default function History() {
               )}
             </tbody>
           </table>
+          {ordersNextCursor && (
+            <button onClick={() => fetchOrders(ordersNextCursor)} className="w-full py-2 text-sm text-blue-500 hover:underline">Load more</button>
+          )}
         </div>
       </div>
     </div>
@@ -111,7 +111,7 @@ export default function Statistics() {
         <StatCard 
           title="Sharpe Ratio" 
           value={stats.sharpe_ratio.toFixed(2)}
-          subtext="Risk-adjusted return"
+          subtext={`Sortino: ${(stats.sortino_ratio ?? 0).toFixed(2)} (daily returns)`}
           icon={Activity}
           color="text-purple-500"
         />
@@ -52,8 +52,9 @@ export default function Trading() {
 
       ws.onmessage = (event) => {
         try {
+          // Messages only contain prices that changed since the previous one
           const data = JSON.parse(event.data);
-          setPrices(data);
+          setPrices(prev => ({ ...prev, ...data }));
         } catch (e) {
           console.error('Error parsing price data', e);
         }
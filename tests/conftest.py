@@ -0,0 +1,4 @@
+import os
+
+# The in-process SQLite backend: must be set before app.config is imported
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
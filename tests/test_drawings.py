@@ -0,0 +1,11 @@
+from app.routers.drawings import _etag, _etag_matches
+
+
+def test_if_none_match_uses_weak_comparison_over_every_listed_tag():
+    etag = _etag(7)
+    assert _etag_matches('"7"', etag)
+    assert _etag_matches('W/"7"', etag)
+    assert _etag_matches('"3", W/"7"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"3", W/"6"', etag)
+    assert not _etag_matches(None, etag)
@@ -0,0 +1,19 @@
+import pytest
+from fastapi import HTTPException
+from app.config import settings
+from app.routers.metrics import require_metrics
+
+
+def test_metrics_are_off_by_default():
+    with pytest.raises(HTTPException) as e:
+        require_metrics(None)
+    assert e.value.status_code == 404
+
+
+def test_metrics_token_is_checked_when_set(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    with pytest.raises(HTTPException) as e:
+        require_metrics("wrong")
+    assert e.value.status_code == 403
+    require_metrics("secret")
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from fastapi import HTTPException, Response
+from app.database import AsyncSessionLocal, init_db
+from app.models import Account, Order, OrderSide, OrderType, OrderStatus
+from app.routers.accounts import get_position_history
+from app.services.matching_engine import matching_engine
+from app.services.pagination import NEXT, NEXT_CURSOR_HEADER, encode_cursor
+
+
+async def close_positions(user_id: str, count: int) -> int:
+    """Opens and closes `count` positions through the matching engine, returns the account id."""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        account = Account(user_id=user_id, balance=100_000.0)
+        session.add(account)
+        await session.commit()
+        for _ in range(count):
+            for side in (OrderSide.BUY, OrderSide.SELL):
+                order = Order(
+                    account_id=account.id, symbol="BTCUSDT", side=side, order_type=OrderType.MARKET,
+                    quantity=1.0, price=0.0, leverage=1, status=OrderStatus.NEW,
+                )
+                session.add(order)
+                await session.commit()
+                await matching_engine.execute_trade(session, order, 100.0)
+        return account.id
+
+
+async def walk_pages(account_id: int, limit: int) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        response = Response()
+        async with AsyncSessionLocal() as session:
+            rows = await get_position_history(account_id, response, limit=limit, cursor=cursor, since=None, db=session)
+        ids += [row.id for row in rows]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+        assert len(ids) <= 10 * limit, "pagination does not end"
+
+
+def test_position_history_pages_reach_the_end():
+    async def run():
+        account_id = await close_positions("pager", 5)
+        ids = await walk_pages(account_id, limit=2)
+        assert len(ids) == 5
+        assert len(set(ids)) == len(ids)
+        assert ids == sorted(ids, reverse=True)
+
+    asyncio.run(run())
+
+
+def test_position_history_rejects_cursors_without_timestamp():
+    async def run():
+        account_id = await close_positions("id-cursor", 1)
+        async with AsyncSessionLocal() as session:
+            with pytest.raises(HTTPException) as e:
+                # An /orders cursor: id only
+                await get_position_history(
+                    account_id, Response(), limit=2, cursor=encode_cursor(NEXT, 1), since=None, db=session
+                )
+        assert e.value.status_code == 400
+
+    asyncio.run(run())